@@ -1,13 +1,32 @@
 import json
+import logging
 import os
 import io
 import base64
+import threading
+import time
+from concurrent.futures import wait
 from typing import List, Dict, Optional
 
 import streamlit as st
 import streamlit.components.v1 as components
 
-from src.parser import parse_html_to_A_to_K
+from src.parser import ledger_rows, parse_html_trip
+from src.formatting import idr_to_int, fmt_idr
+from src.ledger import KINDS, ReimburseLedger, import_csv, merge_auto_rows
+from src.state import default_state, recompute_totals
+from src.jobs import QueueFullError, RenderPool
+from src.outputs import OutputStore
+from src.store import DEFAULT_DB_PATH, TripStore, render_key
+from src.layout import load_plan, plan_items_all, plan_templates
+from src.values import session_graph
+from src.recap import recap_csv_bytes, recap_row
+from src.calibration import DEFAULT_STEP as CALIBRATION_STEP, render_calibration
+from src.profiling import PROFILE_ENABLED, bundle as profile_bundle, html_meta, profile_run
+from src.metrics import record_bytes, reset as reset_metrics, span, summary as metrics_summary
+from src.warmup import format_report, warm_up_process
+
+logger = logging.getLogger(__name__)
 
 
 # =========================
@@ -17,545 +36,104 @@ SHOW_OVERLAY_UI_DEFAULT = False
 SHOW_OVERLAY_UI = bool(int(os.getenv("SHOW_OVERLAY_UI", "1" if SHOW_OVERLAY_UI_DEFAULT else "0")))
 SHOW_OVERLAY_UI = st.session_state.get("SHOW_OVERLAY_UI", SHOW_OVERLAY_UI)
 
+# Profil cProfile + tracemalloc per run: STM_PROFILE=1 (semua sesi) atau ?profile=1 (sesi ini)
+PROFILE_RUNS = PROFILE_ENABLED or st.query_params.get("profile") == "1"
 
-# =========================
-# Helpers
-# =========================
-def idr_to_int(s: str) -> int:
-    """'IDR 1.200.000' / '1,200,000' / '1200000' -> 1200000"""
-    if s is None:
-        return 0
-    digits = "".join(ch for ch in str(s) if ch.isdigit())
-    return int(digits) if digits else 0
+# Halaman admin tersembunyi (metrics per tahap, warm-up, antrian)
+SHOW_ADMIN_UI_DEFAULT = False
+SHOW_ADMIN_UI = bool(int(os.getenv("SHOW_ADMIN_UI", "1" if SHOW_ADMIN_UI_DEFAULT else "0")))
 
+# Store SQLite (riwayat trip, NIK tersimpan, cache PDF) dipakai bersama SEMUA sesi:
+# siapa pun bisa melihat/memuat trip & PDF orang lain. Aktifkan hanya untuk instalasi
+# satu pengguna / tim tepercaya (STM_APP_STORE=1; lokasi file lewat STM_DB_PATH).
+APP_STORE_DEFAULT = False
+APP_STORE = bool(int(os.getenv("STM_APP_STORE", "1" if APP_STORE_DEFAULT else "0")))
 
-def fmt_idr(n: int) -> str:
-    s = f"{n:,}".replace(",", ".")
-    return f"IDR {s}"
+# Pool render bersama (lintas sesi): jumlah worker & batas antrian
+RENDER_WORKERS = int(os.getenv("STM_RENDER_WORKERS", "2"))
+RENDER_MAX_PENDING = int(os.getenv("STM_RENDER_MAX_PENDING", "8"))
+RENDER_TIMEOUT = float(os.getenv("STM_RENDER_TIMEOUT", "60"))
 
 
-def fmt_n(n: int) -> str:
-    return f"{n:,}".replace(",", ".")
+@st.cache_resource(show_spinner=False)
+def get_render_pool() -> RenderPool:
+    """Satu pool proses per server; render tidak lagi jalan di thread script."""
+    return RenderPool(workers=RENDER_WORKERS, max_pending=RENDER_MAX_PENDING)
 
 
-def parse_date_or_none(s: Optional[str]):
-    """Coba parse beberapa format tanggal EN; gagal -> None."""
-    if not s:
+@st.cache_resource(show_spinner=False)
+def get_store() -> Optional[TripStore]:
+    """Store SQLite lokal (trip + PDF); hanya bila APP_STORE aktif dan STM_DB_PATH tidak kosong."""
+    if not APP_STORE or not DEFAULT_DB_PATH:
         return None
-    from datetime import datetime
-    for fmt in ("%d %B, %Y", "%d %b, %Y", "%d %B %Y", "%d %b %Y",
-                "%d/%B/%Y", "%d/%b/%Y", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(s.strip(), fmt)
-        except Exception:
-            continue
-    return None
-
-
-def day_diff_inclusive(D: Optional[str], E: Optional[str]) -> Optional[int]:
-    """Hitung (E - D + 1) hari (inklusif): 19..21 -> 3."""
-    d1 = parse_date_or_none(D)
-    d2 = parse_date_or_none(E)
-    if not d1 or not d2:
+    try:
+        return TripStore(DEFAULT_DB_PATH)
+    except Exception:
         return None
-    return (d2.date() - d1.date()).days + 1
 
 
-def today_id_str(prefix_city: str = "Jakarta") -> str:
-    """
-    "Jakarta, 2 Februari 2026" — format tanggal Indonesia dengan zona Asia/Jakarta jika tersedia.
-    """
-    from datetime import datetime
-    try:
-        from zoneinfo import ZoneInfo
-        now = datetime.now(ZoneInfo("Asia/Jakarta"))
-    except Exception:
-        now = datetime.now()
+@st.cache_resource(show_spinner=False)
+def get_output_store() -> OutputStore:
+    """PDF hasil generate di file sementara (budget memori & TTL per proses, lihat src.outputs)."""
+    return OutputStore()
 
-    bulan_id = [
-        "Januari", "Februari", "Maret", "April", "Mei", "Juni",
-        "Juli", "Agustus", "September", "Oktober", "November", "Desember"
-    ]
-    d = now.day
-    m = bulan_id[now.month - 1]
-    y = now.year
-    return f"{prefix_city}, {d} {m} {y}"
 
+@st.cache_resource(show_spinner=False)
+def start_warmup() -> Dict[str, object]:
+    """Warm-up sekali per server di thread latar: proses app (parser, plan, template) + worker render.
 
-# =========================
-# Terbilang (Indonesia) untuk Rupiah
-# =========================
-def _terbilang_lt_1000(n: int) -> str:
-    """Terbilang untuk 0..999 (bahasa Indonesia)."""
-    assert 0 <= n < 1000
-    satuan = ["", "satu", "dua", "tiga", "empat", "lima",
-              "enam", "tujuh", "delapan", "sembilan"]
-
-    if n == 0:
-        return ""
-    if n < 10:
-        return satuan[n]
-    if n < 20:
-        if n == 10:
-            return "sepuluh"
-        if n == 11:
-            return "sebelas"
-        return f"{satuan[n-10]} belas"
-    if n < 100:
-        puluh = n // 10
-        sisa = n % 10
-        bagian = f"{satuan[puluh]} puluh"
-        if sisa:
-            bagian += f" {satuan[sisa]}"
-        return bagian
-    # 100..999
-    ratus = n // 100
-    sisa = n % 100
-    if ratus == 1:
-        bagian = "seratus"
-    else:
-        bagian = f"{satuan[ratus]} ratus"
-    if sisa:
-        bagian += f" {_terbilang_lt_1000(sisa)}"
-    return bagian
-
-
-def terbilang_id(n: int) -> str:
-    """Terbilang angka non-negatif (tanpa 'rupiah')."""
-    if n == 0:
-        return "nol"
-    if n < 0:
-        return f"minus {terbilang_id(-n)}"
-
-    bagian = []
-    scales = [
-        (1_000_000_000_000, "triliun"),
-        (1_000_000_000, "miliar"),
-        (1_000_000, "juta"),
-        (1000, "ribu"),
-        (1, ""),
-    ]
-    sisa = n
-    for skala, nama in scales:
-        if sisa >= skala:
-            hitung = sisa // skala
-            sisa = sisa % skala
-            if skala == 1000 and hitung == 1:
-                bagian.append("seribu")
-            else:
-                kata = _terbilang_lt_1000(hitung) if hitung < 1000 else terbilang_id(hitung)
-                if kata:
-                    bagian.append(f"{kata} {nama}" if nama else kata)
-    return " ".join(bagian).strip()
+    Sesi pertama tidak menunggu; Generate/parse pertama sudah seperti kondisi warm.
+    """
+    pool = get_render_pool()
+    report: Dict[str, object] = {"app": [], "workers": {}, "done": False}
 
+    def run():
+        report["app"] = steps = warm_up_process(render=False)
+        logger.info("%s", format_report(steps, title="warm-up app"))
+        pool.warm_up()
+        report["workers"] = dict(pool.warmup_reports)
+        for pid, wsteps in sorted(pool.warmup_reports.items()):
+            logger.info("%s", format_report(wsteps, title=f"warm-up worker {pid}"))
+        report["done"] = True
 
-def terbilang_rupiah(n: int) -> str:
-    """Terbilang + akhiran 'rupiah'."""
-    return f"{terbilang_id(n)} rupiah"
+    threading.Thread(target=run, name="stm-warmup", daemon=True).start()
+    return report
+
+
+# Worker spawn ikut mengimpor script ini sebagai __mp_main__; warm-up hanya di proses server
+if __name__ == "__main__":
+    start_warmup()
 
 
 # =========================
 # State init
 # =========================
 def ensure_states():
-    if "parsed_AK" not in st.session_state:
-        st.session_state.parsed_AK: Dict[str, str | None] = {}
-    if "reimburse_rows" not in st.session_state:
-        st.session_state.reimburse_rows: List[Dict] = []
-    if "totals_LQ" not in st.session_state:
-        st.session_state.totals_LQ: Dict[str, int] = {k: 0 for k in list("LMNOPQ")}
-    # PDF templates & preview
-    if "bg_template_bytes" not in st.session_state:
-        st.session_state.bg_template_bytes: Optional[bytes] = None
-    if "bg_template2_bytes" not in st.session_state:
-        st.session_state.bg_template2_bytes: Optional[bytes] = None
-    if "preview_pdf" not in st.session_state:
-        st.session_state.preview_pdf: Optional[bytes] = None
-    # Override nilai (opsional)
-    if "val_overrides" not in st.session_state:
-        st.session_state.val_overrides: Dict[str, str] = {}
-
-    # Kontrol tampil R & S per halaman
-    if "SHOW_RS_PAGE1" not in st.session_state:
-        st.session_state.SHOW_RS_PAGE1 = True   # default ON Halaman 1
-    if "SHOW_RS_PAGE2" not in st.session_state:
-        st.session_state.SHOW_RS_PAGE2 = False  # default OFF Halaman 2
-
-    # Koordinat HALAMAN 1 (fixed)
-    if "coord_style" not in st.session_state:
-        st.session_state.coord_style = {
-            "A": {"x": 190.0, "y": 666.0, "size": 9, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": True},
-            "B": {"x": 190.0, "y": 652.5, "size": 9, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": True},
-            "C": {"x": 190.0, "y": 639.0, "size": 9, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": True},
-            "D": {"x": 190.0, "y": 625.5, "size": 9, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": True},
-            "E": {"x": 190.0, "y": 612.0, "size": 9, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": True},
-            "J": {"x": 190.0, "y": 600.0, "size": 9, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": True},
-
-            "F": {"x": 0.0, "y": 0.0, "size": 10, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "left", "locked": False},
-            "G": {"x": 439.0, "y": 78.0, "size": 7, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "center", "locked": True, "max_width": 135.0},
-            "H": {"x": 124.0, "y": 78.0, "size": 7, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "center", "locked": True, "max_width": 135.0},
-            "I": {"x": 124.0, "y": 88.0, "size": 8, "bold": True, "underline": True, "fmt": "raw", "from_right": False, "align": "center", "locked": True},
-
-            "K": {"x": 260.0, "y": 520.0, "size": 9, "bold": False, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-            "L": {"x": 260.0, "y": 313.0, "size": 9, "bold": False, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-            "M": {"x": 260.0, "y": 299.0, "size": 9, "bold": False, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-            "N": {"x": 260.0, "y": 286.0, "size": 9, "bold": False, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-            "O": {"x": 260.0, "y": 273.0, "size": 9, "bold": False, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-            "P": {"x": 260.0, "y": 260.0, "size": 9, "bold": False, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-            "Q": {"x": 260.0, "y": 227.0, "size": 9, "bold": True, "underline": False, "fmt": "number", "from_right": True, "align": "right", "locked": True},
-
-            "R": {"x": 281.0, "y": 88.0, "size": 8, "bold": True, "underline": True, "fmt": "raw", "from_right": False, "align": "center", "locked": True},
-            "S": {"x": 281.0, "y": 78.0, "size": 7, "bold": False, "underline": False, "fmt": "raw", "from_right": False, "align": "center", "locked": True, "max_width": 135.0},
-        }
-
-    # Item duplikasi — halaman 1
-    if "extra_items" not in st.session_state:
-        st.session_state.extra_items = {
-            "K_DUP": {"key": "K", "x": 260.0, "y": 534.0, "size": 9, "bold": False, "underline": False, "from_right": True, "align": "right"},
-            "J_RIGHT": {"key": "J", "x": 120.0, "y": 534.0, "size": 9, "bold": False, "underline": False, "from_right": True, "align": "right"},
-            "A_DUP": {"key": "A", "x": 439.0, "y": 88.0, "size": 8, "bold": True, "underline": True, "from_right": False, "align": "center"},
-            "Q_DUP": {"key": "Q", "x": 260.0, "y": 183.0, "size": 9, "bold": True, "underline": False, "from_right": True, "align": "right"},
-        }
-
-    # Koordinat HALAMAN 2 — (disimpan; editor disembunyikan)
-    if "coord_style_page2" not in st.session_state:
-        cs2 = {}
-
-        # A2 / G2
-        cs2["A2"] = {"x": 167.0, "y": 653.0, "size": 9, "bold": False, "underline": False, "align": "left", "from_right": False, "max_width": 0.0}
-        cs2["G2"] = {"x": 167.0, "y": 641.0, "size": 9, "bold": False, "underline": False, "align": "left", "from_right": False, "max_width": 0.0}
-
-        # K2..Q2 angka (right-anchored)
-        def _right_num(x, y, size=9, bold=False):
-            return {"x": float(x), "y": float(y), "size": int(size), "bold": bool(bold),
-                    "underline": False, "align": "right", "from_right": True, "max_width": 0.0}
-
-        cs2["K2"] = _right_num(118, 432)
-        cs2["L2"] = _right_num(118, 482.5)
-        cs2["M2"] = _right_num(118, 495)
-        cs2["N2"] = _right_num(118, 470)
-        cs2["O2"] = _right_num(118, 457.5)
-        cs2["P2"] = _right_num(118, 445)
-        cs2["Q2"] = _right_num(118, 420)  # Q2 = angka (Q+K)
-
-        # Q2_TB = terbilang (Q+K)
-        cs2["Q2_TB"] = {"x": 133.0, "y": 407.0, "size": 9, "bold": False, "underline": False,
-                        "align": "left", "from_right": False, "max_width": 350.0}
-
-        # DESC2 = kalimat keterangan C/D/E/F
-        cs2["DESC2"] = {"x": 82.0, "y": 370.0, "size": 9, "bold": False, "underline": False,
-                        "align": "left", "from_right": False, "max_width": 420.0}
-
-        # ====== R2 / S2 (DISIMPAN DARI INPUTMU & TIDAK DIEDIT LAGI) ======
-        cs2["R2"] = {
-            "x": 180.0, "y": 225.0,
-            "size": 9,
-            "bold": True,
-            "underline": False,
-            "align": "center",
-            "from_right": True,
-            "max_width": 0.0
-        }
-        cs2["S2"] = {
-            "x": 180.0, "y": 212.0,
-            "size": 9,
-            "bold": False,
-            "underline": False,
-            "align": "center",
-            "from_right": True,
-            "max_width": 135.0
-        }
-
-        # Tambahan custom
-        cs2["CITY_TODAY"] = {
-            "x": 180.0, "y": 300.0, "size": 9, "bold": False, "underline": False,
-            "align": "center", "from_right": True, "max_width": 0.0
-        }
-        cs2["A2_AGAIN"] = {
-            "x": 180.0, "y": 225.0, "size": 9, "bold": True, "underline": True,
-            "align": "center", "from_right": True, "max_width": 0.0
-        }
-        cs2["G2_AGAIN"] = {
-            "x": 180.0, "y": 212.0, "size": 9, "bold": False, "underline": False,
-            "align": "center", "from_right": True, "max_width": 135.0
-        }
-
-        # NIK di halaman 2
-        cs2["NIK2"] = {
-            "x": 167.0, "y": 628.0,
-            "size": 9,
-            "bold": False,
-            "underline": False,
-            "align": "left",
-            "from_right": False,
-            "max_width": 0.0
-        }
-
-        st.session_state.coord_style_page2 = cs2
+    defaults = default_state()
+    for k, v in defaults.items():
+        if k not in st.session_state:
+            st.session_state[k] = v
+    # Preview: hanya handle ke OutputStore (bytes PDF & template tidak disimpan per sesi)
+    if "preview_pdf_handle" not in st.session_state:
+        st.session_state.preview_pdf_handle: Optional[str] = None
+    # Versi data editor reimburse (naik setiap ledger berubah, agar delta editor selalu relatif ke isi terbaru)
+    if "reimburse_editor_ver" not in st.session_state:
+        st.session_state.reimburse_editor_ver = 0
+    # Baris reimburse yang terakhir diisi dari tabel transaksi + trip asalnya (lihat parse)
+    if "reimburse_auto_rows" not in st.session_state:
+        st.session_state.reimburse_auto_rows: List[Dict] = []
+    if "reimburse_trip_key" not in st.session_state:
+        st.session_state.reimburse_trip_key: Optional[tuple] = None
+    # Profil: ukuran/hash HTML terakhir + folder capture terakhir (lihat src.profiling)
+    if "last_html_meta" not in st.session_state:
+        st.session_state.last_html_meta = {}
+    if "profile_capture_dir" not in st.session_state:
+        st.session_state.profile_capture_dir: Optional[str] = None
 
     # Lock editor halaman 2 (force hide editor — untuk berjaga-jaga)
     st.session_state["lock_page2_coords"] = True
 
 
-def recompute_totals():
-    """Hitung ulang total per jenis dan map ke L..Q"""
-    kind_to_letter = {"bensin": "L", "hotel": "M", "toll": "N", "transportasi": "O", "parkir": "P"}
-    totals = {k: 0 for k in kind_to_letter.keys()}
-    for row in st.session_state.reimburse_rows:
-        j = row["jenis"].lower()
-        totals[j] = totals.get(j, 0) + int(row["nominal"])
-    LQ = {letter: totals.get(jenis, 0) for jenis, letter in kind_to_letter.items()}
-    LQ["Q"] = sum(LQ.values())
-    st.session_state.totals_LQ = LQ
-
-
-def get_numeric_value_for_key(key: str) -> int:
-    """Ambil nilai angka murni untuk key."""
-    ak = st.session_state.parsed_AK or {}
-    lq = st.session_state.totals_LQ or {}
-
-    if key == "K":
-        return idr_to_int(ak.get("K"))
-    if key in list("LMNOPQ"):
-        try:
-            return int(lq.get(key, 0))
-        except Exception:
-            return 0
-    raw = ak.get(key, "")
-    try:
-        return idr_to_int(str(raw))
-    except Exception:
-        return 0
-
-
-def get_value_for_key(key: str) -> str:
-    """Ambil nilai final untuk key A..Q + formatting per 'fmt' (0 -> '-')."""
-    ov = st.session_state.val_overrides.get(key)
-    if ov not in (None, ""):
-        if ov.strip().isdigit() and int(ov.strip()) == 0:
-            return "-"
-        return str(ov)
-
-    ak = st.session_state.parsed_AK or {}
-    lq = st.session_state.totals_LQ or {}
-
-    if key in list("ABCDEFGHIJKRS"):
-        raw = ak.get(key)
-        if key == "J" and raw:
-            digits = "".join(ch for ch in str(raw) if ch.isdigit())
-            raw = digits or raw
-    elif key in list("LMNOPQ"):
-        raw = lq.get(key, 0)
-    else:
-        raw = ""
-
-    style = st.session_state.coord_style.get(key, {})
-    fmt_mode = style.get("fmt", "raw")
-
-    if fmt_mode == "number":
-        try:
-            val = idr_to_int(raw) if isinstance(raw, str) else int(raw)
-        except Exception:
-            val = 0
-        return "-" if val == 0 else fmt_n(int(val))
-
-    if fmt_mode == "auto":
-        try:
-            val = idr_to_int(raw) if isinstance(raw, str) else int(raw)
-            return "-" if val == 0 else fmt_n(int(val))
-        except Exception:
-            pass
-        return str(raw or "")
-
-    return str(raw or "")
-
-
-# =========================
-# PDF rendering utils
-# =========================
-def _render_one_page(background_pdf_bytes: bytes, items: List[Dict[str, object]]) -> bytes:
-    """Render satu halaman overlay + merge dengan background."""
-    if not background_pdf_bytes:
-        return b""
-
-    try:
-        from reportlab.pdfgen import canvas
-        from reportlab.pdfbase.pdfmetrics import stringWidth
-        from PyPDF2 import PdfReader, PdfWriter
-    except Exception as e:
-        st.error(f"Dependency PDF belum terpasang: {e}")
-        return b""
-
-    # Baca ukuran halaman template
-    try:
-        base_reader = PdfReader(io.BytesIO(background_pdf_bytes))
-        base_page = base_reader.pages[0]
-        page_w = float(base_page.mediabox.width)
-        page_h = float(base_page.mediabox.height)
-    except Exception as e:
-        st.error(f"Gagal membaca template PDF: {e}")
-        return b""
-
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=(page_w, page_h))
-
-    def wrap_text_by_space(text: str, font_name: str, font_size: float, max_width: float) -> List[str]:
-        """Bungkus teks per spasi agar tiap baris <= max_width."""
-        words = text.split()
-        if not words:
-            return []
-        lines: List[str] = []
-        current = ""
-
-        def w(s: str) -> float:
-            from reportlab.pdfbase.pdfmetrics import stringWidth
-            return stringWidth(s, font_name, font_size)
-
-        for word in words:
-            candidate = word if not current else f"{current} {word}"
-            if w(candidate) <= max_width:
-                current = candidate
-            else:
-                if current:
-                    lines.append(current)
-                    current = word
-                    while w(current) > max_width and len(current) > 1:
-                        cut = len(current)
-                        while cut > 1 and w(current[:cut]) > max_width:
-                            cut -= 1
-                        lines.append(current[:cut])
-                        current = current[cut:]
-                else:
-                    tmp = word
-                    while w(tmp) > max_width and len(tmp) > 1:
-                        cut = len(tmp)
-                        while cut > 1 and w(tmp[:cut]) > max_width:
-                            cut -= 1
-                        lines.append(tmp[:cut])
-                        tmp = tmp[cut:]
-                    current = tmp
-        if current:
-            lines.append(current)
-        return lines
-
-    def draw_underlined_text(text: str, x_anchor: float, y: float, align: str, font_name: str, font_size: float):
-        """Garis underline di bawah teks sesuai alignment."""
-        from reportlab.pdfbase.pdfmetrics import stringWidth
-        width = stringWidth(text, font_name, font_size)
-        if align == "right":
-            x0 = x_anchor - width
-        elif align == "center":
-            x0 = x_anchor - width / 2.0
-        else:
-            x0 = x_anchor
-        y_line = y - max(1.0, font_size * 0.15)
-        c.setLineWidth(0.6)
-        c.line(x0, y_line, x0 + width, y_line)
-
-    for it in items:
-        text = str(it.get("text") or "").strip()
-        if not text:
-            continue
-
-        x_in = float(it.get("x", 0))  # untuk from_right=True, ini jarak dari sisi kanan
-        y = float(it.get("y", 0))
-        size = int(it.get("size", 10))
-        bold = bool(it.get("bold", False))
-        underline = bool(it.get("underline", False))
-        from_right = bool(it.get("from_right", False))
-        align = (it.get("align") or "left").lower()
-        max_width = float(it.get("max_width", 0.0))
-
-        font = "Helvetica-Bold" if bold else "Helvetica"
-        try:
-            c.setFont(font, size)
-        except Exception:
-            c.setFont("Helvetica", 10)
-            font = "Helvetica"
-            size = 10
-
-        # Anchor X
-        x_anchor = (page_w - x_in) if from_right else x_in
-
-        # Wrapping generic
-        if max_width > 0:
-            lines = wrap_text_by_space(text, font, size, max_width)
-            line_height = size * 1.2
-            y_cursor = y
-            for ln in lines:
-                if align == "right":
-                    c.drawRightString(x_anchor, y_cursor, ln)
-                    if underline:
-                        draw_underlined_text(ln, x_anchor, y_cursor, "right", font, size)
-                elif align == "center":
-                    c.drawCentredString(x_anchor, y_cursor, ln)
-                    if underline:
-                        draw_underlined_text(ln, x_anchor, y_cursor, "center", font, size)
-                else:
-                    c.drawString(x_anchor, y_cursor, ln)
-                    if underline:
-                        draw_underlined_text(ln, x_anchor, y_cursor, "left", font, size)
-                y_cursor -= line_height
-        else:
-            if align == "right":
-                c.drawRightString(x_anchor, y, text)
-            elif align == "center":
-                c.drawCentredString(x_anchor, y, text)
-            else:
-                c.drawString(x_anchor, y, text)
-            if underline:
-                draw_underlined_text(text, x_anchor, y, align, font, size)
-
-    c.showPage()
-    c.save()
-    overlay_pdf = buf.getvalue()
-
-    # Merge overlay ke base
-    try:
-        from PyPDF2 import PdfReader, PdfWriter
-        overlay_reader = PdfReader(io.BytesIO(overlay_pdf))
-        overlay_page = overlay_reader.pages[0]
-        base_page.merge_page(overlay_page)  # pypdf >= 3
-    except Exception:
-        try:
-            base_page.mergePage(overlay_page)  # legacy
-        except Exception as e:
-            st.error(f"Gagal merge overlay: {e}")
-            return overlay_pdf
-
-    writer = PdfWriter()
-    writer.add_page(base_page)
-    out_buf = io.BytesIO()
-    writer.write(out_buf)
-    return out_buf.getvalue()
-
-
-def build_pdf_multi_pages(background_pages: List[bytes], items_per_page: List[List[Dict[str, object]]]) -> bytes:
-    """Render tiap halaman dan gabungkan ke satu PDF."""
-    from PyPDF2 import PdfReader, PdfWriter
-    writer = PdfWriter()
-    any_page = False
-    for idx, bg in enumerate(background_pages):
-        if not bg:
-            continue
-        items = items_per_page[idx] if idx < len(items_per_page) else []
-        page_pdf = _render_one_page(bg, items)
-        try:
-            reader = PdfReader(io.BytesIO(page_pdf))
-            page = reader.pages[0]
-            writer.add_page(page)
-            any_page = True
-        except Exception as e:
-            st.error(f"Gagal merakit halaman #{idx+1}: {e}")
-
-    if not any_page:
-        return b""
-
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
-
-
 # =========================
 # UI
 # =========================
@@ -594,11 +172,22 @@ with tab1:
 with tab2:
     uploaded = st.file_uploader("Unggah file .html", type=["html", "htm"])
     if uploaded is not None:
-        html_text = uploaded.read().decode("utf-8", errors="ignore")
+        raw_html = uploaded.read()
+        with span("html.decode"):
+            html_text = raw_html.decode("utf-8", errors="ignore")
 
 parse_btn = st.button("🔎 Parse HTML", type="primary", use_container_width=True, key="btn_parse_html")
 
 # ===== Parse A–K =====
+def _trip_key(parsed_AK: Dict) -> tuple:
+    """Identitas trip untuk ledger reimburse: karyawan, rute, tanggal."""
+    return tuple(parsed_AK.get(k) for k in "ABCDE")
+
+
+def _auto_rows_text(rows: List[Dict]) -> str:
+    return ", ".join(f"{r['jenis']} {fmt_idr(r['nominal'])}" for r in rows)
+
+
 if parse_btn:
     if not html_text or not html_text.strip():
         st.error("Silakan tempel atau unggah HTML terlebih dahulu.")
@@ -606,14 +195,50 @@ if parse_btn:
     old_r = (st.session_state.parsed_AK or {}).get("R")
     old_s = (st.session_state.parsed_AK or {}).get("S")
     old_nik = (st.session_state.parsed_AK or {}).get("NIK")  # pertahankan NIK
-    st.session_state.parsed_AK = parse_html_to_A_to_K(html_text)
+    record_bytes("html_in", len(html_text.encode("utf-8")))
+    if PROFILE_RUNS:
+        st.session_state.last_html_meta = html_meta(html_text)
+        with profile_run("parse", st.session_state.last_html_meta) as capture:
+            parsed = parse_html_trip(html_text)
+        st.session_state.profile_capture_dir = capture["dir"]
+    else:
+        with span("parse.total"):
+            parsed = parse_html_trip(html_text)
+    st.session_state.parsed_AK = parsed["parsed_AK"]
+    # Reimburse dari tabel transaksi, satu kali update ledger + total L–Q:
+    # trip lain -> ledger dikosongkan dulu; trip yang sama -> baris manual dipertahankan
+    auto_rows = ledger_rows(parsed["transactions"])
+    trip_key = _trip_key(parsed["parsed_AK"])
+    # None: belum ada trip di sesi ini -> baris yang sudah diketik dianggap milik trip ini
+    same_trip = st.session_state.reimburse_trip_key in (None, trip_key)
+    if same_trip:
+        rows = merge_auto_rows(st.session_state.reimburse_rows, st.session_state.reimburse_auto_rows, auto_rows)
+        dropped = 0
+    else:
+        rows = list(auto_rows)
+        dropped = len(st.session_state.reimburse_rows)
+    st.session_state.reimburse_rows = ReimburseLedger(rows)
+    st.session_state.reimburse_auto_rows = auto_rows
+    st.session_state.reimburse_trip_key = trip_key
+    st.session_state.reimburse_editor_ver += 1
+    recompute_totals(st.session_state)
     if old_r:
         st.session_state.parsed_AK["R"] = old_r
     if old_s:
         st.session_state.parsed_AK["S"] = old_s
     if old_nik:
         st.session_state.parsed_AK["NIK"] = old_nik
+    elif get_store() is not None:
+        # NIK terakhir untuk karyawan ini (dari riwayat lokal)
+        saved_nik = get_store().nik_for_employee(st.session_state.parsed_AK.get("A"))
+        if saved_nik:
+            st.session_state.parsed_AK["NIK"] = saved_nik
     st.success("HTML berhasil diparse.")
+    if dropped:
+        st.info(f"Trip baru: {dropped} baris reimburse trip sebelumnya dikosongkan.")
+    if auto_rows:
+        st.info("Reimburse diisi otomatis dari tabel transaksi: " + _auto_rows_text(auto_rows)
+                + (f" (+{len(rows) - len(auto_rows)} baris manual dipertahankan)." if len(rows) > len(auto_rows) else "."))
 
 # ===== Data Karyawan (NIK) — collapsible =====
 with st.expander("🪪 Nomor Induk Karyawan (Required)", expanded=False):
@@ -631,386 +256,407 @@ with st.expander("🪪 Nomor Induk Karyawan (Required)", expanded=False):
             st.success("NIK disimpan.")
 
 # ===== Reimburse — collapsible =====
-with st.expander("🧾 Reimburse (Opsional)", expanded=False):
-    with st.form("reimburse_form", clear_on_submit=True):
-        jenis = st.selectbox("Jenis biaya", options=["bensin", "hotel", "toll", "transportasi", "parkir"], index=0)
-        nominal_text = st.text_input("Nominal (contoh: 1200000 atau IDR 1.200.000)", value="")
-        submitted = st.form_submit_button("➕ Tambah", use_container_width=True)
-        if submitted:
-            nominal_val = idr_to_int(nominal_text)
-            if nominal_val <= 0:
-                st.warning("Nominal harus lebih dari 0.")
-            else:
-                st.session_state.reimburse_rows.append({"jenis": jenis, "nominal": nominal_val})
-                recompute_totals()
-                st.success(f"Berhasil menambah {jenis} sebesar {fmt_idr(nominal_val)}")
-
-    # Tabel Reimburse
-    st.markdown("### Tabel Reimburse")
-    if not st.session_state.reimburse_rows:
-        st.info("Belum ada data reimburse.")
-    else:
-        header_cols = st.columns([0.7, 3, 3, 2])
-        header_cols[0].markdown("**No.**")
-        header_cols[1].markdown("**Jenis**")
-        header_cols[2].markdown("**Nominal**")
-        header_cols[3].markdown("**Aksi**")
-
-        for idx, row in enumerate(st.session_state.reimburse_rows, start=1):
-            c1, c2, c3, c4 = st.columns([0.7, 3, 3, 2])
-            c1.write(idx)
-            c2.write(row["jenis"].capitalize())
-            c3.write(fmt_idr(int(row["nominal"])))
-            if c4.button("Hapus", key=f"del_{idx}", use_container_width=True):
-                del st.session_state.reimburse_rows[idx - 1]
-                recompute_totals()
-                st.rerun()
-
-    # Total L–Q
-    recompute_totals()
-    totals = st.session_state.totals_LQ
-    st.markdown("### Total per Jenis (tersimpan ke value **L–Q**)")
-    tcols = st.columns(6)
-    tcols[0].metric("**Bensin**", fmt_idr(totals["L"]))
-    tcols[1].metric("**Hotel**", fmt_idr(totals["M"]))
-    tcols[2].metric("**Toll**", fmt_idr(totals["N"]))
-    tcols[3].metric("**Transportasi**", fmt_idr(totals["O"]))
-    tcols[4].metric("**Parkir**", fmt_idr(totals["P"]))
-    tcols[5].metric("**Total Semua**", fmt_idr(totals["Q"]))
+# Panel opsional = st.fragment: klik di dalamnya hanya me-rerun panel itu, bukan seluruh script
+def _apply_reimburse_edits(editor_key: str):
+    """Callback data editor: terapkan delta ke ledger, lalu reset editor ke isi ledger terbaru."""
+    delta = st.session_state.get(editor_key) or {}
+    errors = st.session_state.reimburse_rows.apply_editor_delta(delta)
+    recompute_totals(st.session_state)
+    st.session_state.reimburse_editor_ver += 1
+    if errors:
+        st.session_state.reimburse_editor_errors = errors
+
+
+@st.fragment
+def reimburse_panel():
+    with st.expander("🧾 Reimburse (Opsional)", expanded=False):
+        with st.form("reimburse_form", clear_on_submit=True):
+            jenis = st.selectbox("Jenis biaya", options=list(KINDS), index=0)
+            nominal_text = st.text_input("Nominal (contoh: 1200000 atau IDR 1.200.000)", value="")
+            submitted = st.form_submit_button("➕ Tambah", use_container_width=True)
+            if submitted:
+                nominal_val = idr_to_int(nominal_text)
+                if nominal_val <= 0:
+                    st.warning("Nominal harus lebih dari 0.")
+                else:
+                    st.session_state.reimburse_rows.add(jenis, nominal_val)
+                    recompute_totals(st.session_state)
+                    st.success(f"Berhasil menambah {jenis} sebesar {fmt_idr(nominal_val)}")
+
+        # Impor CSV (kolom: jenis,nominal; header opsional)
+        csv_file = st.file_uploader("Impor CSV reimburse (kolom: jenis,nominal)", type=["csv"], key=f"reimburse_csv_{st.session_state.reimburse_editor_ver}")
+        if csv_file is not None and st.button("📥 Impor CSV", use_container_width=True, key="btn_import_csv"):
+            added, errors = import_csv(st.session_state.reimburse_rows, csv_file)
+            recompute_totals(st.session_state)
+            st.session_state.reimburse_editor_ver += 1
+            if added:
+                st.success(f"Berhasil mengimpor {added} baris reimburse.")
+            for msg in errors[:10]:
+                st.warning(msg)
+            if len(errors) > 10:
+                st.warning(f"... dan {len(errors) - 10} baris lain tidak valid.")
+
+        # Tabel Reimburse (satu data editor; ubah/hapus/tambah baris langsung di tabel)
+        st.markdown("### Tabel Reimburse")
+        if st.session_state.reimburse_auto_rows:
+            st.caption("🔄 Diisi dari tabel transaksi HTML: " + _auto_rows_text(st.session_state.reimburse_auto_rows))
+        if not len(st.session_state.reimburse_rows):
+            st.info("Belum ada data reimburse.")
+        else:
+            editor_key = f"reimburse_editor_{st.session_state.reimburse_editor_ver}"
+            st.data_editor(
+                st.session_state.reimburse_rows.rows(),
+                key=editor_key,
+                num_rows="dynamic",
+                hide_index=False,
+                use_container_width=True,
+                column_config={
+                    "jenis": st.column_config.SelectboxColumn("Jenis", options=list(KINDS), required=True),
+                    "nominal": st.column_config.NumberColumn("Nominal (IDR)", min_value=1, step=1, format="%d", required=True),
+                },
+                on_change=_apply_reimburse_edits,
+                args=(editor_key,),
+            )
+            for msg in st.session_state.pop("reimburse_editor_errors", []):
+                st.warning(msg)
+
+        # Total L–Q
+        recompute_totals(st.session_state)
+        totals = st.session_state.totals_LQ
+        st.markdown("### Total per Jenis (tersimpan ke value **L–Q**)")
+        tcols = st.columns(6)
+        tcols[0].metric("**Bensin**", fmt_idr(totals["L"]))
+        tcols[1].metric("**Hotel**", fmt_idr(totals["M"]))
+        tcols[2].metric("**Toll**", fmt_idr(totals["N"]))
+        tcols[3].metric("**Transportasi**", fmt_idr(totals["O"]))
+        tcols[4].metric("**Parkir**", fmt_idr(totals["P"]))
+        tcols[5].metric("**Total Semua**", fmt_idr(totals["Q"]))
+
+
+reimburse_panel()
 
 # ===== Data Atasan (R & S) — collapsible =====
-with st.expander("👤 Data Manager (Opsional)", expanded=False):
-    # Checklist kemunculan R & S per halaman
-    c1, c2 = st.columns(2)
-    show_rs_p1 = c1.checkbox(
-        "**Halaman 1**",
-        value=st.session_state.get("SHOW_RS_PAGE1", True),
-        help="Centang agar Nama & Jabatan Atasan muncul di Halaman 1."
-    )
-    show_rs_p2 = c2.checkbox(
-        "**Halaman 2**",
-        value=st.session_state.get("SHOW_RS_PAGE2", False),
-        help="Centang agar Nama & Jabatan Atasan muncul di Halaman 2."
-    )
-    # Simpan ke state
-    st.session_state.SHOW_RS_PAGE1 = bool(show_rs_p1)
-    st.session_state.SHOW_RS_PAGE2 = bool(show_rs_p2)
-
-    st.markdown("---")
-
-    # Form input nilai R & S
-    with st.form("atasan_form", clear_on_submit=False):
-        r_input = st.text_input("Nama atasan", value=(st.session_state.parsed_AK.get("R") or ""), placeholder="nama atasan")
-        s_input = st.text_input("Jabatan atasan", value=(st.session_state.parsed_AK.get("S") or ""), placeholder="jabatan atasan")
-        submit_rs = st.form_submit_button("💾 Simpan Data", use_container_width=True)
-        if submit_rs:
-            st.session_state.parsed_AK["R"] = r_input.strip()
-            st.session_state.parsed_AK["S"] = s_input.strip()
-            st.success("Data atasan disimpan (R & S).")
-
-# (Editor koordinat/style Halaman 2 untuk R/S DISENGAJA DIHILANGKAN dari UI)
-
-# ===== Override H & I — collapsible =====
-with st.expander("✏️ Override Data VP (Opsional)", expanded=False):
-    # Ambil nilai saat ini: prioritas dari override, fallback ke parsed_AK
-    current_h = st.session_state.val_overrides.get("H", (st.session_state.parsed_AK or {}).get("H", ""))
-    current_i = st.session_state.val_overrides.get("I", (st.session_state.parsed_AK or {}).get("I", ""))
-
-    with st.form("override_hi_form", clear_on_submit=False):
-        i_input = st.text_input(
-            "Nama VP",
-            value=str(current_i),
-            placeholder="contoh: Nama VP",
-            help="Isi untuk menimpa nilai I hasil parsing. Kosongkan untuk memakai nilai dari HTML."
+@st.fragment
+def manager_panel():
+    with st.expander("👤 Data Manager (Opsional)", expanded=False):
+        # Checklist kemunculan R & S per halaman
+        c1, c2 = st.columns(2)
+        show_rs_p1 = c1.checkbox(
+            "**Halaman 1**",
+            value=st.session_state.get("SHOW_RS_PAGE1", True),
+            help="Centang agar Nama & Jabatan Atasan muncul di Halaman 1."
         )
-        h_input = st.text_input(
-            "Jabatan VP",
-            value=str(current_h),
-            placeholder="contoh: Vice President .....",
-            help="Isi untuk menimpa nilai H hasil parsing. Kosongkan untuk memakai nilai dari HTML."
+        show_rs_p2 = c2.checkbox(
+            "**Halaman 2**",
+            value=st.session_state.get("SHOW_RS_PAGE2", False),
+            help="Centang agar Nama & Jabatan Atasan muncul di Halaman 2."
         )
+        # Simpan ke state
+        st.session_state.SHOW_RS_PAGE1 = bool(show_rs_p1)
+        st.session_state.SHOW_RS_PAGE2 = bool(show_rs_p2)
 
-        c1, c2 = st.columns(2)
-        save_override = c1.form_submit_button("💾 Simpan Override", use_container_width=True)
-        clear_override = c2.form_submit_button("🧹 Hapus Override", use_container_width=True)
-
-        if save_override:
-            # Simpan ke val_overrides; "" kita artikan sebagai 'hapus override' agar fallback ke parsed_AK
-            if h_input is not None:
-                if h_input.strip() == "":
-                    st.session_state.val_overrides.pop("H", None)
-                else:
-                    st.session_state.val_overrides["H"] = h_input.strip()
+        st.markdown("---")
 
-            if i_input is not None:
-                if i_input.strip() == "":
-                    st.session_state.val_overrides.pop("I", None)
-                else:
-                    st.session_state.val_overrides["I"] = i_input.strip()
+        # Form input nilai R & S
+        with st.form("atasan_form", clear_on_submit=False):
+            r_input = st.text_input("Nama atasan", value=(st.session_state.parsed_AK.get("R") or ""), placeholder="nama atasan")
+            s_input = st.text_input("Jabatan atasan", value=(st.session_state.parsed_AK.get("S") or ""), placeholder="jabatan atasan")
+            submit_rs = st.form_submit_button("💾 Simpan Data", use_container_width=True)
+            if submit_rs:
+                st.session_state.parsed_AK["R"] = r_input.strip()
+                st.session_state.parsed_AK["S"] = s_input.strip()
+                st.success("Data atasan disimpan (R & S).")
 
-            st.success("Override H & I disimpan.")
 
-        if clear_override:
-            st.session_state.val_overrides.pop("H", None)
-            st.session_state.val_overrides.pop("I", None)
-            st.success("Override H & I dihapus (kembali memakai nilai dari HTML).")
+manager_panel()
 
-    # Indikator sederhana bila override sedang aktif
-    if ("H" in st.session_state.val_overrides) or ("I" in st.session_state.val_overrides):
-        st.caption("⚙️ Saat ini kolom H/I sedang menggunakan **override**.")
+# (Editor koordinat/style Halaman 2 untuk R/S DISENGAJA DIHILANGKAN dari UI)
 
-# =========================
-# Template PDF (auto-load)
-# =========================
-DEFAULT_BG_PATH = os.environ.get("SPJ_BG_PATH", "assets/spj_blank.pdf")
-if not st.session_state.bg_template_bytes:
-    try:
-        if os.path.exists(DEFAULT_BG_PATH):
-            with open(DEFAULT_BG_PATH, "rb") as f:
-                st.session_state.bg_template_bytes = f.read()
-    except Exception:
-        pass
+# ===== Override H & I — collapsible =====
+@st.fragment
+def override_vp_panel():
+    with st.expander("✏️ Override Data VP (Opsional)", expanded=False):
+        # Ambil nilai saat ini: prioritas dari override, fallback ke parsed_AK
+        current_h = st.session_state.val_overrides.get("H", (st.session_state.parsed_AK or {}).get("H", ""))
+        current_i = st.session_state.val_overrides.get("I", (st.session_state.parsed_AK or {}).get("I", ""))
+
+        with st.form("override_hi_form", clear_on_submit=False):
+            i_input = st.text_input(
+                "Nama VP",
+                value=str(current_i),
+                placeholder="contoh: Nama VP",
+                help="Isi untuk menimpa nilai I hasil parsing. Kosongkan untuk memakai nilai dari HTML."
+            )
+            h_input = st.text_input(
+                "Jabatan VP",
+                value=str(current_h),
+                placeholder="contoh: Vice President .....",
+                help="Isi untuk menimpa nilai H hasil parsing. Kosongkan untuk memakai nilai dari HTML."
+            )
+
+            c1, c2 = st.columns(2)
+            save_override = c1.form_submit_button("💾 Simpan Override", use_container_width=True)
+            clear_override = c2.form_submit_button("🧹 Hapus Override", use_container_width=True)
+
+            if save_override:
+                # Simpan ke val_overrides; "" kita artikan sebagai 'hapus override' agar fallback ke parsed_AK
+                if h_input is not None:
+                    if h_input.strip() == "":
+                        st.session_state.val_overrides.pop("H", None)
+                    else:
+                        st.session_state.val_overrides["H"] = h_input.strip()
+
+                if i_input is not None:
+                    if i_input.strip() == "":
+                        st.session_state.val_overrides.pop("I", None)
+                    else:
+                        st.session_state.val_overrides["I"] = i_input.strip()
+
+                st.success("Override H & I disimpan.")
+
+            if clear_override:
+                st.session_state.val_overrides.pop("H", None)
+                st.session_state.val_overrides.pop("I", None)
+                st.success("Override H & I dihapus (kembali memakai nilai dari HTML).")
+
+        # Indikator sederhana bila override sedang aktif
+        if ("H" in st.session_state.val_overrides) or ("I" in st.session_state.val_overrides):
+            st.caption("⚙️ Saat ini kolom H/I sedang menggunakan **override**.")
+
+
+override_vp_panel()
+
+# ===== Riwayat trip (SQLite lokal) — collapsible =====
+def _load_trip_into_session(trip_id: int):
+    """Callback: muat trip tersimpan ke sesi (parsed_AK, reimburse, override, flag R/S)."""
+    record = get_store().load_trip(trip_id)
+    if not record:
+        return
+    st.session_state.parsed_AK = record["parsed_AK"]
+    st.session_state.reimburse_rows = ReimburseLedger(record["reimburse_rows"])
+    st.session_state.reimburse_auto_rows = []
+    st.session_state.reimburse_trip_key = ("riwayat", trip_id)  # parse berikutnya = trip baru
+    st.session_state.val_overrides = record["val_overrides"]
+    st.session_state.SHOW_RS_PAGE1 = record["SHOW_RS_PAGE1"]
+    st.session_state.SHOW_RS_PAGE2 = record["SHOW_RS_PAGE2"]
+    st.session_state.reimburse_editor_ver += 1
+    recompute_totals(st.session_state)
+
+
+@st.fragment
+def history_panel():
+    store = get_store()
+    with st.expander("🗂️ Riwayat Trip (Opsional)", expanded=False):
+        c1, c2 = st.columns(2)
+        q_nik = c1.text_input("Cari NIK", value="", key="hist_nik")
+        q_name = c2.text_input("Cari nama karyawan", value="", key="hist_name")
+        trips = store.find_trips(nik=q_nik or None, employee_name=q_name or None, limit=50)
+        if not trips:
+            st.info("Belum ada trip tersimpan.")
+            return
+        labels = {
+            t["id"]: f"{t['employee_name'] or '-'} · {t['trip_from'] or '-'} → {t['trip_to'] or '-'} · {t['depart_date'] or '-'} s/d {t['return_date'] or '-'}"
+            for t in trips
+        }
+        trip_id = st.selectbox("Trip", options=list(labels), format_func=labels.get, key="hist_trip")
+        c1, c2 = st.columns(2)
+        if c1.button("📂 Muat Trip", use_container_width=True, key="btn_hist_load",
+                     on_click=_load_trip_into_session, args=(trip_id,)):
+            st.rerun()
+        if store.has_document(trip_id):
+            c2.download_button("⬇️ PDF Terakhir", data=lambda: store.latest_document(trip_id) or b"",
+                               file_name="SPJ_A_to_Q_overlay_2hal.pdf", mime="application/pdf",
+                               use_container_width=True, key="dl_hist_pdf")
 
-DEFAULT_BG2_PATH = os.environ.get("SPJ_BG2_PATH", "assets/spj_blank2.pdf")
-if not st.session_state.bg_template2_bytes:
-    try:
-        if os.path.exists(DEFAULT_BG2_PATH):
-            with open(DEFAULT_BG2_PATH, "rb") as f:
-                st.session_state.bg_template2_bytes = f.read()
-        else:
-            fallback = "assets/spj_blank2"
-            if os.path.exists(fallback):
-                with open(fallback, "rb") as f:
-                    st.session_state.bg_template2_bytes = f.read()
-    except Exception:
-        pass
 
+if get_store() is not None:
+    history_panel()
 
 # =========================
-# Items builders
+# Generate & Download — single flow
 # =========================
-def _items_page1_from_state() -> List[Dict[str, object]]:
-    items: List[Dict[str, object]] = []
-    cs = st.session_state.coord_style
-    ak = st.session_state.parsed_AK or {}
-
-    # 1) A–E, J kiri
-    for k in ["A", "B", "C", "D", "E", "J"]:
-        style = cs[k]
-        x, y = style["x"], style["y"]
-        size, bold, align, ul = style["size"], style["bold"], style["align"], style["underline"]
-
-        if k == "J":
-            val = day_diff_inclusive(ak.get("D"), ak.get("E"))
-            if val is None or val <= 0:
-                raw = ak.get("J")
-                digits = "".join(ch for ch in str(raw or "") if ch.isdigit())
-                val = int(digits) if digits else ""
-            text = "-" if (isinstance(val, int) and val == 0) or str(val).strip() == "" else str(val)
-
-
-        
-        elif k == "A":
-            base_a = (get_value_for_key("A") or "").strip()
-            raw_nik = (st.session_state.parsed_AK or {}).get("NIK", "")
-            nik_text = str(raw_nik).strip()  # tampilkan apa adanya, termasuk huruf/simbol
-            if base_a or nik_text:
-                text = f"{base_a}  "
-                if nik_text:
-                    text += f"  ({nik_text})"
-            else:
-                text = ""  # keduanya kosong: jangan cetak apa-apa
-
-        else:
-            text = get_value_for_key(k)
-
-        if str(text).strip():
-            items.append({
-                "key": k,
-                "text": str(text),
-                "x": x,
-                "y": y,
-                "size": size,
-                "bold": bold,
-                "underline": ul,
-                "from_right": False,
-                "align": align
-            })
-
-    # 2) F–I
-    for k in ["F", "G", "H", "I"]:
-        style = cs[k]
-        x, y = style["x"], style["y"]
-        size, bold, fr, align, ul = style["size"], style["bold"], style["from_right"], style["align"], style["underline"]
-        txt = get_value_for_key(k).strip()
-        if k == "F" and (x == 0 and y == 0):
-            continue
-        if txt:
-            item = {"key": k, "text": txt, "x": x, "y": y, "size": size, "bold": bold, "underline": ul, "from_right": fr, "align": align}
-            if k in ["G", "H"]:
-                item["max_width"] = float(style.get("max_width", 135.0))
-            items.append(item)
-
-    # 2b) R & S (hormati checklist Halaman 1)
-    if st.session_state.get("SHOW_RS_PAGE1", True):
-        r_style = cs["R"]; r_txt = (ak.get("R") or "").strip()
-        if r_txt:
-            items.append({
-                "key": "R", "text": r_txt,
-                "x": r_style["x"], "y": r_style["y"],
-                "size": r_style["size"], "bold": r_style["bold"],
-                "underline": r_style["underline"],
-                "from_right": r_style["from_right"], "align": r_style["align"]
-            })
-        s_style = cs["S"]; s_txt = (ak.get("S") or "").strip()
-        if s_txt:
-            items.append({
-                "key": "S", "text": s_txt,
-                "x": s_style["x"], "y": s_style["y"],
-                "size": s_style["size"], "bold": s_style["bold"],
-                "underline": s_style["underline"],
-                "from_right": s_style["from_right"], "align": s_style["align"],
-                "max_width": float(s_style.get("max_width", 135.0))
-            })
-
-    # 3) K–Q kanan
-    for k in ["K", "L", "M", "N", "O", "P", "Q"]:
-        style = cs[k]
-        x, y = style["x"], style["y"]
-        size, bold, fr, align, ul = style["size"], style["bold"], style["from_right"], style["align"], style["underline"]
-        txt = get_value_for_key(k).strip()
-        if txt:
-            items.append({"key": k, "text": txt, "x": x, "y": y, "size": size, "bold": bold, "underline": ul, "from_right": fr, "align": align})
-
-    # 4) Extra: K_DUP, J_RIGHT, A_DUP, Q_DUP (Q + K)
-    extras = st.session_state.extra_items
-
-    kd = extras["K_DUP"]; text_k = get_value_for_key(kd["key"]).strip()
-    if text_k:
-        items.append({"key": kd["key"], "text": text_k, "x": kd["x"], "y": kd["y"], "size": kd["size"], "bold": kd["bold"], "underline": kd["underline"], "from_right": kd["from_right"], "align": kd["align"]})
-
-    jr = extras["J_RIGHT"]; raw_j = (st.session_state.parsed_AK or {}).get("J")
-    j_digits = "".join(ch for ch in str(raw_j or "") if ch.isdigit())
-    j_text = "-" if (j_digits == "" or (j_digits.isdigit() and int(j_digits) == 0)) else j_digits
-    if j_text:
-        items.append({"key": jr["key"], "text": j_text, "x": jr["x"], "y": jr["y"], "size": jr["size"], "bold": jr["bold"], "underline": jr["underline"], "from_right": jr["from_right"], "align": jr["align"]})
-
-    ad = extras["A_DUP"]; a_text = get_value_for_key(ad["key"]).strip()
-    if a_text:
-        items.append({"key": ad["key"], "text": a_text, "x": ad["x"], "y": ad["y"], "size": ad["size"], "bold": ad["bold"], "underline": ad["underline"], "from_right": ad["from_right"], "align": ad["align"]})
-
-    qd = extras["Q_DUP"]; q_num = get_numeric_value_for_key("Q"); k_num = get_numeric_value_for_key("K")
-    sum_qk = int(q_num) + int(k_num)
-    qd_text = "-" if sum_qk == 0 else fmt_n(sum_qk)
-    items.append({"key": qd["key"], "text": qd_text, "x": qd["x"], "y": qd["y"], "size": qd["size"], "bold": qd["bold"], "underline": qd["underline"], "from_right": qd["from_right"], "align": qd["align"]})
-
-    return items
-
-
-def _items_page2_from_state() -> List[Dict[str, object]]:
-    """
-    Halaman 2:
-    - Q2 = ANGKA (Q + K) -> "-" jika 0
-    - Q2_TB = TERBILANG (Q + K) + " rupiah"
-    - DESC2 = "Telah sesuai ... ke [C], tanggal [D] s/d [E] dalam rangka [F]."
-    - CITY_TODAY = "Jakarta, [tanggal hari ini]"
-    - A2_AGAIN = value A
-    - G2_AGAIN = value G
-    - NIK2 = value NIK (digits-only prefer)
-    - R2/S2 = value R & S, hanya jika checklist Halaman 2 dicentang
-    """
-    items: List[Dict[str, object]] = []
-    cs2 = st.session_state.coord_style_page2
-
-    for key, style in cs2.items():
-        x = float(style["x"]); y = float(style["y"])
-        if x == 0.0 and y == 0.0:
-            continue
-
-        # Hanya tampilkan R2 & S2 jika checklist Halaman 2 dicentang
-        if key in ("R2", "S2") and not st.session_state.get("SHOW_RS_PAGE2", False):
-            continue
-
-        if key == "Q2":
-            q_num = get_numeric_value_for_key("Q"); k_num = get_numeric_value_for_key("K")
-            total = int(q_num) + int(k_num)
-            text = "-" if total == 0 else fmt_n(total)
-        elif key == "Q2_TB":
-            q_num = get_numeric_value_for_key("Q"); k_num = get_numeric_value_for_key("K")
-            total = int(q_num) + int(k_num)
-            text = terbilang_rupiah(total) if total != 0 else "nol rupiah"
-        elif key == "DESC2":
-            C = (get_value_for_key("C") or "").strip()
-            D = (get_value_for_key("D") or "").strip()
-            E = (get_value_for_key("E") or "").strip()
-            F = (get_value_for_key("F") or "").strip()
-            text = f"Telah sesuai sebagaimana adanya digunakan dalam rangka keperluan perjalanan dinas ke {C}, tanggal {D} s/d {E} dalam rangka {F}."
-            text = text.strip()
-        elif key == "CITY_TODAY":
-            text = today_id_str("Jakarta")
-        elif key == "A2_AGAIN":
-            text = (get_value_for_key("A") or "").strip()
-        elif key == "G2_AGAIN":
-            text = (get_value_for_key("G") or "").strip()
-            
-        elif key == "NIK2":
-            raw_nik = (st.session_state.parsed_AK or {}).get("NIK", "")
-            text = str(raw_nik).strip().upper()  # tampilkan apa adanya
-        else:
-            base_key = key[:-1].upper() if key.endswith("2") else key.upper()
-            if base_key in list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"):
-                text = get_value_for_key(base_key).strip()
-            else:
-                text = ""
+st.divider()
+st.subheader("📄 Generate & Download PDF")
 
-        if not text:
-            continue
+btn_generate = st.button("⚙️ Generate PDF", use_container_width=True, key="btn_generate_pdf")
 
-        items.append({
-            "key": key,
-            "text": text,
-            "x": x,
-            "y": y,
-            "size": int(style["size"]),
-            "bold": bool(style["bold"]),
-            "underline": bool(style["underline"]),
-            "from_right": bool(style["from_right"]),
-            "align": str(style["align"]),
-            "max_width": float(style.get("max_width", 0.0)),
-        })
 
-    return items
+def _render_in_pool() -> bytes:
+    """Render state sesi di pool proses bersama; tampilkan spinner + kedalaman antrian."""
+    pool = get_render_pool()
+    try:
+        if PROFILE_RUNS:
+            job = pool.submit_render_state_profiled(st.session_state, st.session_state.last_html_meta)
+        else:
+            # Nilai di-resolve di sini dengan graph sesi (hanya node yang inputnya berubah sejak
+            # Generate/preview terakhir dihitung ulang); worker cukup menggambar
+            with span("values"):
+                items = plan_items_all(load_plan(), st.session_state, session_graph(st.session_state))
+            job = pool.submit_render_items(items)
+    except QueueFullError:
+        st.warning(f"Server sedang sibuk (antrian render: {pool.depth()}). Coba lagi sebentar.")
+        return b""
 
+    with st.spinner("Membuat PDF..."):
+        queue_info = st.empty()
+        t0 = time.monotonic()
+        while not job.done() and time.monotonic() - t0 < RENDER_TIMEOUT:
+            queue_info.caption(f"⏳ Antrian render saat ini: {pool.depth()} job")
+            wait([job], timeout=0.25)
+        queue_info.empty()
 
-# =========================
-# Generate & Download — single flow
-# =========================
-st.divider()
-st.subheader("📄 Generate & Download PDF")
+    if not job.done():
+        st.warning("Render terlalu lama. Coba lagi.")
+        return b""
+    try:
+        if PROFILE_RUNS:
+            (pdf_bytes, errors), st.session_state.profile_capture_dir = job.result()
+        else:
+            pdf_bytes, errors = job.result()
+    except Exception as e:
+        pdf_bytes, errors = b"", [f"Worker render gagal: {e}"]
+    for msg in errors:
+        st.error(msg)
+    return pdf_bytes
 
-btn_generate = st.button("⚙️ Generate PDF", use_container_width=True, key="btn_generate_pdf")
 
 if btn_generate:
-    bg1 = st.session_state.bg_template_bytes
-    bg2 = st.session_state.bg_template2_bytes
-    if not bg1 or not bg2:
+    # Template PDF: cache per proses (path + mtime), bukan salinan per sesi
+    plan = load_plan()
+    if not all(plan_templates(plan)):
         st.error("Template PDF belum tersedia. Pastikan file ada di `assets/spj_blank.pdf` dan `assets/spj_blank2.pdf`.")
     else:
-        items1 = _items_page1_from_state()
-        items2 = _items_page2_from_state()
-        pdf_bytes = build_pdf_multi_pages([bg1, bg2], [items1, items2])
+        # Input render sama persis dengan yang pernah digenerate -> ambil dari store, tanpa render ulang
+        store = get_store()
+        with span("generate.total"):
+            cache_key = render_key(st.session_state, plan)
+            pdf_bytes = store.cached_render(cache_key) if store is not None else None
+            if not pdf_bytes:
+                pdf_bytes = _render_in_pool()
+                if pdf_bytes and store is not None:
+                    store.save_render(cache_key, pdf_bytes, store.save_trip(st.session_state))
         if pdf_bytes:
-            st.session_state.preview_pdf = pdf_bytes
+            st.session_state.preview_pdf_handle = get_output_store().put(pdf_bytes)
+            st.session_state.preview_recap_row = recap_row(st.session_state, pdf_bytes=pdf_bytes, source="app",
+                                                          graph=session_graph(st.session_state))
             st.success("PDF berhasil digenerate. Silakan download.")
         else:
             st.warning("Gagal membuat PDF. Pastikan template & data sudah valid.")
 
-if st.session_state.get("preview_pdf"):
+preview_handle = st.session_state.get("preview_pdf_handle")
+if preview_handle:
+    outputs = get_output_store()
+    if outputs.exists(preview_handle):
+        st.download_button(
+            "⬇️ Download PDF",
+            data=outputs.reader(preview_handle),  # dibaca dari disk saat diklik
+            file_name="SPJ_A_to_Q_overlay_2hal.pdf",
+            mime="application/pdf",
+            use_container_width=True,
+            key="dl_pdf_single"
+        )
+        recap = st.session_state.get("preview_recap_row")
+        if recap:
+            st.download_button(
+                "📊 Download Rekap (CSV)",
+                data=lambda: recap_csv_bytes([recap]),
+                file_name="SPJ_rekap.csv",
+                mime="text/csv",
+                use_container_width=True,
+                key="dl_recap_single"
+            )
+    else:
+        st.info("PDF sebelumnya sudah kedaluwarsa. Klik **Generate PDF** lagi.")
+
+capture_dir = st.session_state.get("profile_capture_dir")
+if PROFILE_RUNS and capture_dir and os.path.isdir(capture_dir):
     st.download_button(
-        "⬇️ Download PDF",
-        data=st.session_state.preview_pdf,
-        file_name="SPJ_A_to_Q_overlay_2hal.pdf",
-        mime="application/pdf",
+        "🔬 Download Profil (cProfile + tracemalloc)",
+        data=lambda: profile_bundle(capture_dir),
+        file_name=f"{os.path.basename(capture_dir)}.zip",
+        mime="application/zip",
         use_container_width=True,
-        key="dl_pdf_single"
+        key="dl_profile"
     )
+
+
+# =========================
+# Kalibrasi layout (SHOW_OVERLAY_UI=1)
+# =========================
+@st.fragment
+def calibration_panel():
+    with st.expander("🎯 Kalibrasi Layout (grid + anchor)", expanded=False):
+        st.caption("Grid koordinat (pt, origin kiri bawah) + kotak anchor tiap item layout. "
+                   "Edit file layout lalu render ulang: hanya field yang berubah yang digambar ulang.")
+        c1, c2 = st.columns(2)
+        step = c1.selectbox("Jarak grid (pt)", [10, 25, CALIBRATION_STEP, 100], index=2, key="calibration_step")
+        use_data = c2.checkbox("Ukuran kotak dari data sesi", value=bool(st.session_state.parsed_AK),
+                               key="calibration_use_data")
+        if st.button("🎯 Render Grid", use_container_width=True, key="btn_calibration"):
+            t0 = time.perf_counter()
+            pdf_bytes = render_calibration(load_plan(), st.session_state if use_data else None, int(step),
+                                           graph=session_graph(st.session_state) if use_data else None)
+            if pdf_bytes:
+                st.session_state.calibration_handle = get_output_store().put(pdf_bytes)
+                st.caption(f"Dirender dalam {(time.perf_counter() - t0) * 1000:.0f} ms")
+            else:
+                st.warning("Template PDF belum tersedia.")
+        handle = st.session_state.get("calibration_handle")
+        if handle and get_output_store().exists(handle):
+            st.download_button(
+                "⬇️ Download PDF Kalibrasi",
+                data=get_output_store().reader(handle),
+                file_name="SPJ_kalibrasi_layout.pdf",
+                mime="application/pdf",
+                use_container_width=True,
+                key="dl_calibration"
+            )
+
+
+if SHOW_OVERLAY_UI:
+    calibration_panel()
+
+
+# =========================
+# Admin (SHOW_ADMIN_UI=1)
+# =========================
+def _summary_rows(stats: Dict[str, Dict[str, float]], unit: str) -> List[Dict[str, object]]:
+    rows = []
+    for name, st_ in stats.items():
+        row = {"tahap": name, "n": int(st_["count"])}
+        for k in ("p50", "p95", "p99", "max"):
+            row[f"{k} ({unit})"] = round(st_[k], 1)
+        rows.append(row)
+    return rows
+
+
+@st.fragment
+def admin_panel():
+    st.divider()
+    st.subheader("🛠️ Admin · Metrics")
+    c1, c2 = st.columns(2)
+    c1.button("🔄 Refresh", use_container_width=True, key="btn_admin_refresh")
+    if c2.button("🧹 Reset Metrics", use_container_width=True, key="btn_admin_reset"):
+        reset_metrics()
+
+    stats = metrics_summary()
+    st.caption(f"Jendela bergulir per tahap; antrian render saat ini: {get_render_pool().depth()} job")
+    if stats["ms"]:
+        st.dataframe(_summary_rows(stats["ms"], "ms"), use_container_width=True, hide_index=True)
+    else:
+        st.info("Belum ada data. Jalankan Parse / Generate dulu.")
+    if stats["bytes"]:
+        st.dataframe(_summary_rows(stats["bytes"], "B"), use_container_width=True, hide_index=True)
+
+    warm = start_warmup()
+    with st.expander("⏱️ Warm-up", expanded=False):
+        if not warm["done"]:
+            st.caption("Warm-up masih berjalan...")
+        if warm["app"]:
+            st.code(format_report(warm["app"], title="warm-up app"), language=None)
+        for pid, steps in sorted(warm["workers"].items()):
+            st.code(format_report(steps, title=f"warm-up worker {pid}"), language=None)
+
+
+if SHOW_ADMIN_UI:
+    admin_panel()
@@ -0,0 +1,244 @@
+"""
+Benchmark jalur render (tanpa Streamlit):
+
+    python stm.py bench -o bench.json                  # semua skenario -> file hasil
+    python stm.py bench --filter page --iterations 10  # subset
+    python stm.py bench -o baru.json --compare lama.json
+
+Skenario:
+- format: satu kolom nominal (fmt_n + terbilang) lewat API batch;
+- wrap_text_by_space: teks pendek, DESC2, terbilang, paragraf panjang;
+- render_one_page: kedua template x jumlah item x panjang teks x gaya (polos/underline/wrap);
+- build_pdf_multi_pages: item layout asli (2 halaman) untuk beberapa ukuran batch.
+
+Per skenario: ops/detik, p50/p95 (ms), peak memori (tracemalloc, run terpisah supaya
+tidak memengaruhi waktu) dan ukuran output. File hasil (JSON) memuat commit git &
+versi library, jadi bisa dibandingkan antar commit.
+"""
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from src.formatting import fmt_n_many, terbilang_rupiah, terbilang_rupiah_many
+
+SHORT_TEXT = "Budi Santoso"
+DESC2_TEXT = ("Telah sesuai sebagaimana adanya digunakan dalam rangka keperluan perjalanan dinas ke "
+              "Surabaya, tanggal 19 Januari 2026 s/d 21 Januari 2026 dalam rangka Audit operasional "
+              "dan pendampingan implementasi sistem di kantor wilayah.")
+TERBILANG_TEXT = terbilang_rupiah(987_654_321)
+PARAGRAPH_TEXT = " ".join([DESC2_TEXT] * 5)
+
+TEXTS = {"pendek": SHORT_TEXT, "desc2": DESC2_TEXT, "terbilang": TERBILANG_TEXT}
+ITEM_COUNTS = (1, 20, 80)
+STYLES = ("polos", "underline", "wrap")
+BATCH_SIZES = (1, 5, 20)
+# Kolom nominal untuk skenario format (campuran ribuan s/d miliaran)
+AMOUNT_COLUMN = [((i * 7919) % 97 + 1) * 10 ** (3 + i % 7) + i * 500 for i in range(200)]
+
+# Record contoh (sintetis) untuk item layout asli
+SAMPLE_RECORD = {
+    "parsed_AK": {
+        "A": "Budi Santoso", "B": "Jakarta", "C": "Surabaya",
+        "D": "19 Jan 2026", "E": "21 Jan 2026",
+        "F": "Audit operasional dan pendampingan implementasi sistem di kantor wilayah",
+        "G": "Senior Auditor", "H": "VP Internal Audit", "I": "Siti Rahmawati",
+        "J": "3", "K": "IDR 1.350.000", "R": "Andi Wijaya", "S": "Manager Audit",
+    },
+    "reimburse_rows": [
+        {"jenis": "bensin", "nominal": 450000},
+        {"jenis": "hotel", "nominal": 2400000},
+        {"jenis": "toll", "nominal": 185000},
+    ],
+    "val_overrides": {},
+    "SHOW_RS_PAGE1": True,
+    "SHOW_RS_PAGE2": True,
+}
+
+
+class BenchResult(NamedTuple):
+    name: str
+    group: str
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    peak_kib: float
+    output_bytes: int
+
+
+def _size(out) -> int:
+    if isinstance(out, (bytes, bytearray)):
+        return len(out)
+    if isinstance(out, list):
+        return sum(len(x) for x in out)
+    return 0
+
+
+def run_case(name: str, group: str, fn: Callable[[], object], iterations: int,
+             warmup: int = 2, ops_per_call: int = 1) -> BenchResult:
+    for _ in range(warmup):
+        fn()
+    times: List[float] = []
+    out = None
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    p95 = times[max(0, min(len(times) - 1, math.ceil(0.95 * len(times)) - 1))]
+    total = sum(times)
+    return BenchResult(
+        name=name, group=group, iterations=iterations,
+        ops_per_sec=round(iterations * ops_per_call / total, 2) if total else 0.0,
+        p50_ms=round(statistics.median(times) * 1000.0, 3),
+        p95_ms=round(p95 * 1000.0, 3),
+        peak_kib=round(peak / 1024.0, 1),
+        output_bytes=_size(out),
+    )
+
+
+def _synthetic_items(n: int, text: str, style: str) -> List[Dict[str, object]]:
+    """n item tersebar di halaman A4 (3 kolom), align bergantian."""
+    items = []
+    for i in range(n):
+        col, row = divmod(i, 30)
+        item = {"text": text, "x": 40.0 + (col % 3) * 180.0, "y": 780.0 - row * 24.0, "size": 9,
+                "align": "left", "bold": i % 2 == 1}
+        if style == "underline":
+            item["underline"] = True
+        elif style == "wrap":
+            item["max_width"] = 160.0
+        items.append(item)
+    return items
+
+
+def _scenarios(iterations: int, name_filter: Optional[str]):
+    from src.layout import load_plan, plan_items_all, plan_templates
+    from src.render import build_pdf_multi_pages, render_one_page, wrap_text_by_space
+    from src.state import state_from_record
+
+    def wanted(name: str) -> bool:
+        return not name_filter or name_filter in name
+
+    # wrap_text_by_space & format: murah, jadi iterasi lebih banyak
+    wrap_iter = iterations * 100
+    for n in (20, 200):
+        name = f"format/kolom{n}"
+        if wanted(name):
+            col = AMOUNT_COLUMN[:n]
+            yield lambda c=col, nm=name: run_case(
+                nm, "format", lambda: (fmt_n_many(c), terbilang_rupiah_many(c)), wrap_iter)
+
+    for label, text in list(TEXTS.items()) + [("paragraf", PARAGRAPH_TEXT)]:
+        for width in (135.0, 420.0):
+            name = f"wrap/{label}/w{int(width)}"
+            if wanted(name):
+                yield lambda t=text, w=width, nm=name: run_case(
+                    nm, "wrap", lambda: wrap_text_by_space(t, "Helvetica", 9, w), wrap_iter)
+
+    plan = load_plan()
+    templates = plan_templates(plan)
+    for page_idx, bg in enumerate(templates, 1):
+        if not bg:
+            continue
+        for n in ITEM_COUNTS:
+            for label, text in TEXTS.items():
+                for style in STYLES:
+                    name = f"page{page_idx}/{n}item/{label}/{style}"
+                    if wanted(name):
+                        items = _synthetic_items(n, text, style)
+                        yield lambda b=bg, it=items, nm=name: run_case(
+                            nm, "page", lambda: render_one_page(b, it), iterations)
+
+    state = state_from_record(SAMPLE_RECORD, nik="108123456")
+    items_per_page = plan_items_all(plan, state)
+    for batch in BATCH_SIZES:
+        name = f"multi/layout/batch{batch}"
+        if wanted(name) and all(templates):
+            yield lambda bs=batch, nm=name: run_case(
+                nm, "multi",
+                lambda: [build_pdf_multi_pages(templates, items_per_page) for _ in range(bs)],
+                max(1, iterations // bs), warmup=1, ops_per_call=bs)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _meta() -> Dict[str, object]:
+    import PyPDF2
+    import reportlab
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "reportlab": reportlab.Version,
+        "PyPDF2": PyPDF2.__version__,
+    }
+
+
+def run_benchmarks(iterations: int = 10, name_filter: Optional[str] = None,
+                   progress: Optional[Callable[[BenchResult], None]] = None) -> Dict[str, object]:
+    """Jalankan semua skenario -> {"meta": ..., "results": [BenchResult._asdict()]}."""
+    results = []
+    for case in _scenarios(iterations, name_filter):
+        res = case()
+        results.append(res._asdict())
+        if progress is not None:
+            progress(res)
+    return {"meta": _meta(), "results": results}
+
+
+def format_result(r: BenchResult) -> str:
+    return (f"{r.name:<34} {r.ops_per_sec:>10.1f} op/s  p50 {r.p50_ms:>8.2f} ms  "
+            f"p95 {r.p95_ms:>8.2f} ms  peak {r.peak_kib:>8.1f} KiB  out {r.output_bytes:>8d} B")
+
+
+def compare(new: Dict[str, object], old: Dict[str, object]) -> List[str]:
+    """Baris perbandingan ops/detik & p95 per skenario yang ada di kedua hasil."""
+    old_by_name = {r["name"]: r for r in old.get("results", [])}
+    head = f"{old.get('meta', {}).get('commit') or '?'} -> {new.get('meta', {}).get('commit') or '?'}"
+    lines = [f"perbandingan {head}"]
+    for r in new.get("results", []):
+        o = old_by_name.get(r["name"])
+        if not o or not o["ops_per_sec"]:
+            continue
+        d_ops = (r["ops_per_sec"] / o["ops_per_sec"] - 1.0) * 100.0
+        d_p95 = (r["p95_ms"] / o["p95_ms"] - 1.0) * 100.0 if o["p95_ms"] else 0.0
+        lines.append(f"  {r['name']:<34} op/s {d_ops:+7.1f}%   p95 {d_p95:+7.1f}%   "
+                     f"out {r['output_bytes'] - o['output_bytes']:+d} B")
+    return lines
+
+
+def main(output: Optional[str], iterations: int, name_filter: Optional[str],
+         compare_path: Optional[str] = None) -> int:
+    report = run_benchmarks(iterations, name_filter,
+                            progress=lambda r: print(format_result(r), flush=True))
+    if not report["results"]:
+        print("Tidak ada skenario yang cocok / template belum tersedia.", file=sys.stderr)
+        return 1
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            print("\n".join(compare(report, json.load(f))))
+    return 0
@@ -0,0 +1,203 @@
+"""
+Mode kalibrasi layout: grid koordinat + kotak anchor berlabel per item di atas template.
+
+    python stm.py calibrate -o grid.pdf                   # label = id item
+    python stm.py calibrate trip.html -o grid.pdf         # ukuran kotak dari nilai asli
+
+Dua lapis cache per proses:
+- halaman grid (template + grid + font label), per (template, versi, jarak grid);
+- content stream penanda tiap item, per (PlanItem, teks, lebar halaman).
+Menggeser satu field di file layout hanya membuat ulang penanda field itu; sisanya
+tinggal digabung ke halaman grid yang sudah jadi (tanpa overlay/merge reportlab).
+"""
+import io
+import threading
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from src.layout import PlanItem, RenderPlan
+from src.templates import read_template, template_version
+
+DEFAULT_STEP = 50
+# Nama resource font untuk label penanda (ditambahkan ke halaman grid)
+_LABEL_FONT = "/STMCal"
+_LINE_HEIGHT = 1.2  # sama dengan render_one_page
+
+# (template_path, versi, step) -> bytes PDF satu halaman
+_GRID_CACHE: Dict[Tuple[str, Optional[str], int], bytes] = {}
+_GRID_LOCK = threading.Lock()
+
+
+# =========================
+# Grid per template
+# =========================
+def _grid_overlay(page_w: float, page_h: float, step: int) -> bytes:
+    """Grid: garis tipis tiap step/5, garis tebal + label tiap step (pt, origin kiri bawah)."""
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(page_w, page_h))
+    minor = max(1, step // 5)
+    c.setFont("Helvetica", 5)
+    for axis_len, other_len, vertical in ((page_w, page_h, True), (page_h, page_w, False)):
+        pos = 0
+        while pos <= axis_len:
+            major = pos % step == 0
+            c.setStrokeColorRGB(0.2, 0.5, 0.9, alpha=0.45 if major else 0.15)
+            c.setLineWidth(0.4 if major else 0.2)
+            if vertical:
+                c.line(pos, 0, pos, other_len)
+            else:
+                c.line(0, pos, other_len, pos)
+            if major:
+                c.setFillColorRGB(0.2, 0.5, 0.9)
+                if vertical:
+                    c.drawString(pos + 1, 2, str(pos))
+                    c.drawString(pos + 1, page_h - 7, str(pos))
+                else:
+                    c.drawString(2, pos + 1, str(pos))
+                    c.drawRightString(page_w - 2, pos + 1, str(pos))
+            pos += minor
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def grid_page(template_path: str, step: int = DEFAULT_STEP) -> Optional[bytes]:
+    """PDF satu halaman: template + grid (cache per template/versi/step); None bila template tidak ada."""
+    key = (template_path, template_version(template_path), int(step))
+    with _GRID_LOCK:
+        hit = _GRID_CACHE.get(key)
+    if hit is not None:
+        return hit
+
+    bg = read_template(template_path)
+    if not bg:
+        return None
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.generic import DictionaryObject, NameObject
+
+    page = PdfReader(io.BytesIO(bg)).pages[0]
+    page_w, page_h = float(page.mediabox.width), float(page.mediabox.height)
+    page.merge_page(PdfReader(io.BytesIO(_grid_overlay(page_w, page_h, int(step)))).pages[0])
+    resources = page["/Resources"]
+    fonts = resources.get("/Font")
+    if fonts is None:
+        fonts = DictionaryObject()
+        resources[NameObject("/Font")] = fonts
+    fonts.get_object()[NameObject(_LABEL_FONT)] = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+        NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+    })
+    writer = PdfWriter()
+    writer.add_page(page)
+    buf = io.BytesIO()
+    writer.write(buf)
+    data = buf.getvalue()
+    with _GRID_LOCK:
+        # versi lama template yang sama tidak dipakai lagi
+        for k in [k for k in _GRID_CACHE if k[0] == template_path and k[1] != key[1]]:
+            del _GRID_CACHE[k]
+        _GRID_CACHE[key] = data
+    return data
+
+
+# =========================
+# Penanda per item
+# =========================
+def _pdf_text(s: str) -> str:
+    s = s.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+@lru_cache(maxsize=4096)
+def marker_ops(item: PlanItem, text: str, page_w: float) -> bytes:
+    """Content stream penanda satu item: kotak area teks, silang di anchor, label id & x/y/from_right dari JSON."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from src.fonts import font_for_text
+    from src.render import wrap_text_by_space
+
+    font = font_for_text(item.font, text) or "Helvetica"
+    x = (page_w - item.x) if item.from_right else item.x
+    if item.max_width > 0:
+        width = item.max_width
+        lines = max(1, len(wrap_text_by_space(text, font, item.size, item.max_width)))
+    else:
+        width = stringWidth(text, font, item.size)
+        lines = 1
+    if item.align == "right":
+        x0 = x - width
+    elif item.align == "center":
+        x0 = x - width / 2.0
+    else:
+        x0 = x
+    descent = item.size * 0.25
+    y0 = item.y - descent - (lines - 1) * item.size * _LINE_HEIGHT
+    height = item.size + descent + (lines - 1) * item.size * _LINE_HEIGHT
+    raw_x = item.x if item.raw_x is None else item.raw_x
+    label = f"{item.id} ({raw_x:g},{item.y:g}){' R' if item.raw_from_right or item.from_right else ''}{' ' + item.align if item.align != 'left' else ''}"
+    ops = [
+        "q",
+        "0.85 0.1 0.1 RG 0.5 w",
+        f"{x0:.2f} {y0:.2f} {width:.2f} {height:.2f} re S",
+        f"{x - 3:.2f} {item.y:.2f} m {x + 3:.2f} {item.y:.2f} l {x:.2f} {item.y - 3:.2f} m {x:.2f} {item.y + 3:.2f} l S",
+        "0.85 0.1 0.1 rg",
+        f"BT {_LABEL_FONT} 4.5 Tf {x0:.2f} {y0 + height + 1:.2f} Td {_pdf_text(label)} Tj ET",
+        "Q",
+    ]
+    return ("\n".join(ops) + "\n").encode("latin-1")
+
+
+def _item_texts(plan: RenderPlan, state: Optional[Mapping], graph=None) -> List[Dict[str, str]]:
+    """Teks per item per halaman: nilai asli dari state bila ada, selain itu id item."""
+    if state is None:
+        return [{} for _ in plan.pages]
+    from src.layout import plan_items_all
+    return [{it["key"]: str(it["text"]) for it in page} for page in plan_items_all(plan, state, graph)]
+
+
+# =========================
+# Render
+# =========================
+def render_calibration(plan: RenderPlan, state: Optional[Mapping] = None,
+                       step: int = DEFAULT_STEP, graph=None) -> bytes:
+    """PDF kalibrasi semua halaman plan (b"" bila tidak ada template sama sekali).
+    `graph`: ValueGraph yang sudah sinkron dengan `state` (opsional)."""
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.generic import ArrayObject, DecodedStreamObject, NameObject
+
+    writer = PdfWriter()
+    texts = _item_texts(plan, state, graph)
+    for page_plan, page_texts in zip(plan.pages, texts):
+        grid = grid_page(page_plan.template_path, step) if page_plan.template_path else None
+        if grid is None:
+            continue
+        writer.add_page(PdfReader(io.BytesIO(grid)).pages[0])
+        page = writer.pages[-1]
+        page_w = float(page.mediabox.width)
+        ops = b"".join(marker_ops(it, page_texts.get(it.id) or it.id, page_w) for it in page_plan.items)
+
+        def stream(data: bytes):
+            obj = DecodedStreamObject()
+            obj.set_data(data)
+            return writer._add_object(obj)
+
+        current = page.raw_get("/Contents")
+        contents = ArrayObject([stream(b"q\n")])
+        resolved = current.get_object()
+        contents.extend(resolved if isinstance(resolved, ArrayObject) else [current])
+        contents.append(stream(b"Q\n" + ops))
+        page[NameObject("/Contents")] = contents
+    if not writer.pages:
+        return b""
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def clear_cache() -> None:
+    with _GRID_LOCK:
+        _GRID_CACHE.clear()
+    marker_ops.cache_clear()
@@ -0,0 +1,335 @@
+"""
+CLI STM (tanpa Streamlit), untuk cron job & worker:
+
+    python stm.py parse trip.html                     -> JSON A–K
+    python stm.py render trip.html --nik 108... -o out.pdf
+    python stm.py serve --port 8765 --workers 2      -> HTTP /parse & /render
+    python stm.py warmup                              -> laporan waktu warm-up per tahap
+    python stm.py bench -o bench.json                 -> benchmark jalur render
+    python stm.py loadtest --sessions 20              -> load test app Streamlit (proses AppTest paralel)
+    python stm.py compile-templates                   -> template PDF ringkas di assets/compiled
+    python stm.py recap trips/*.html -o rekap.csv     -> rekap A–K, L–Q, Q+K, sha256 PDF
+    python stm.py calibrate -o grid.pdf               -> grid koordinat + anchor item layout
+    python stm.py batch trips/*.html -o out/          -> pipeline batch (parse/render/tulis paralel)
+    python stm.py optimize arsip.pdf -o kecil.pdf     -> kompres + dedup PDF, ukuran sebelum/sesudah
+
+Cold start hanya mengimpor bs4/lxml (parse) dan reportlab/PyPDF2 (render).
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from src.ledger import ReimburseLedger, import_csv, validate_row
+
+
+def _read_html(path: str) -> str:
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", errors="ignore")
+
+
+def _build_ledger(values: List[str], csv_path: Optional[str], rows=()) -> ReimburseLedger:
+    """--reimburse 'bensin=150000' / 'hotel=IDR 1.200.000' (+ --reimburse-csv, + `rows` awal) -> ledger."""
+    ledger = ReimburseLedger(rows)
+    for v in values or []:
+        jenis, sep, nominal = v.partition("=")
+        try:
+            if not sep:
+                raise ValueError("format: jenis=nominal")
+            ledger.add(*validate_row(jenis, nominal))
+        except ValueError as e:
+            raise SystemExit(f"Reimburse tidak valid: {v!r} ({e})")
+    if csv_path:
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            _, errors = import_csv(ledger, f)
+        if errors:
+            raise SystemExit("CSV reimburse tidak valid:\n" + "\n".join(errors))
+    return ledger
+
+
+def cmd_parse(args) -> int:
+    from src.parser import parse_html_trip
+    result = parse_html_trip(_read_html(args.html))
+    parsed = dict(result["parsed_AK"], transactions=result["transactions"]) if args.transactions else result["parsed_AK"]
+    json.dump(parsed, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+def cmd_render(args) -> int:
+    from src.parser import ledger_rows, parse_html_trip
+    from src.render import render_spj_pdf
+    from src.layout import load_plan, plan_templates
+    from src.state import state_from_record
+
+    result = parse_html_trip(_read_html(args.html))
+    parsed = result["parsed_AK"]
+    if args.manager_name:
+        parsed["R"] = args.manager_name
+    if args.manager_title:
+        parsed["S"] = args.manager_title
+
+    overrides = {}
+    if args.vp_name:
+        overrides["I"] = args.vp_name
+    if args.vp_title:
+        overrides["H"] = args.vp_title
+
+    state = state_from_record({
+        "parsed_AK": parsed,
+        "reimburse_rows": _build_ledger(args.reimburse, args.reimburse_csv,
+                                        ledger_rows(result["transactions"]) if args.reimburse_from_html else ()),
+        "val_overrides": overrides,
+        "SHOW_RS_PAGE1": not args.hide_rs_page1,
+        "SHOW_RS_PAGE2": args.show_rs_page2,
+    }, nik=args.nik)
+
+    plan = load_plan(args.layout, (args.bg, args.bg2))
+    if not all(plan_templates(plan)):
+        print("Template PDF belum tersedia (cek --bg/--bg2 atau SPJ_BG_PATH/SPJ_BG2_PATH).", file=sys.stderr)
+        return 2
+
+    store = None
+    if args.store:
+        from src.store import TripStore, render_key
+        store = TripStore(args.db)
+        cache_key = render_key(state, plan)
+        pdf_bytes = store.cached_render(cache_key)
+    if store is None or not pdf_bytes:
+        pdf_bytes = render_spj_pdf(state, plan, on_error=lambda m: print(m, file=sys.stderr))
+        if not pdf_bytes:
+            print("Gagal membuat PDF.", file=sys.stderr)
+            return 1
+        if store is not None:
+            store.save_render(cache_key, pdf_bytes, store.save_trip(state))
+    with open(args.output, "wb") as f:
+        f.write(pdf_bytes)
+    return 0
+
+
+def cmd_trips(args) -> int:
+    from src.store import TripStore
+    trips = TripStore(args.db).find_trips(nik=args.nik, employee_name=args.name,
+                                          date_from=args.date_from, date_to=args.date_to, limit=args.limit)
+    for t in trips:
+        print("\t".join(str(t[k] or "-") for k in ("id", "nik", "employee_name", "trip_from", "trip_to",
+                                                 "depart_date", "return_date")))
+    return 0
+
+
+def cmd_serve(args) -> int:
+    import logging
+    from src.service import serve
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve(host=args.host, port=args.port, workers=args.workers, max_concurrency=args.max_concurrency,
+          timeout=args.timeout, layout_path=args.layout, template_paths=(args.bg, args.bg2))
+    return 0
+
+
+def cmd_warmup(args) -> int:
+    from src.warmup import all_ok, format_report, warm_up_process
+    steps = warm_up_process(args.layout, (args.bg, args.bg2), render=not args.no_render)
+    print(format_report(steps))
+    return 0 if all_ok(steps) else 1
+
+
+def cmd_bench(args) -> int:
+    from src.bench import main as bench_main
+    return bench_main(args.output, args.iterations, args.filter, args.compare)
+
+
+def cmd_loadtest(args) -> int:
+    from src.loadtest import main as loadtest_main
+    return loadtest_main(args.sessions, args.concurrency, args.html, args.output, args.timeout)
+
+
+def cmd_compile_templates(args) -> int:
+    from src.template_compiler import compile_all, format_manifest
+    manifest = compile_all(args.layout, args.template or None, args.out_dir)
+    print(format_manifest(manifest))
+    return 0 if manifest["templates"] else 1
+
+
+def cmd_recap(args) -> int:
+    from src.recap import main as recap_main
+    if not args.html and not args.from_store:
+        raise SystemExit("Beri file HTML atau --from-store.")
+    return recap_main(args.html, args.output, args.format, args.from_store, args.db,
+                      args.nik, args.render, args.layout)
+
+
+def cmd_calibrate(args) -> int:
+    from src.calibration import render_calibration
+    from src.layout import load_plan
+    from src.parser import parse_html_to_A_to_K
+    from src.state import state_from_record
+
+    state = None
+    if args.html:
+        state = state_from_record({"parsed_AK": parse_html_to_A_to_K(_read_html(args.html))}, nik=args.nik)
+    pdf_bytes = render_calibration(load_plan(args.layout, (args.bg, args.bg2)), state, args.step)
+    if not pdf_bytes:
+        print("Template PDF belum tersedia (cek --bg/--bg2 atau SPJ_BG_PATH/SPJ_BG2_PATH).", file=sys.stderr)
+        return 2
+    with open(args.output, "wb") as f:
+        f.write(pdf_bytes)
+    return 0
+
+
+def cmd_batch(args) -> int:
+    from src.pipeline import main as pipeline_main
+    return pipeline_main(args.html, args.output, args.workers, args.queue, args.nik,
+                         args.layout, (args.bg, args.bg2), args.recap)
+
+
+def cmd_optimize(args) -> int:
+    from src.pdf_optimize import optimize_pdf
+    with open(args.pdf, "rb") as f:
+        pdf_bytes, stats = optimize_pdf(f.read())
+    if stats is None:
+        print("Bukan PDF yang valid.", file=sys.stderr)
+        return 1
+    with open(args.output, "wb") as f:
+        f.write(pdf_bytes)
+    print(f"{stats.bytes_before} -> {stats.bytes_after} B ({stats.saved_pct:.0f}% lebih kecil), "
+          f"{stats.streams_compressed} content stream dikompres, {stats.objects_deduplicated} objek identik "
+          f"disatukan, {stats.resources_removed} resource dibuang")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="stm", description="STM Generator (headless)")
+    ap.add_argument("--metrics-log", default=None, metavar="PATH",
+                    help="Tulis span metrics (JSON per baris) ke file, '-' untuk stderr (sama dengan STM_METRICS_LOG)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("parse", help="Parse HTML Trip Detail -> JSON A–K")
+    p.add_argument("html", help="file .html ('-' untuk stdin)")
+    p.add_argument("--transactions", action="store_true",
+                   help="Sertakan semua baris tabel transaksi (label, total, jenis reimburse)")
+    p.set_defaults(func=cmd_parse)
+
+    r = sub.add_parser("render", help="Parse HTML + render PDF SPJ 2 halaman")
+    r.add_argument("html", help="file .html ('-' untuk stdin)")
+    r.add_argument("--nik", default=None, help="Nomor Induk Karyawan")
+    r.add_argument("-o", "--output", required=True, help="path PDF keluaran")
+    r.add_argument("--manager-name", default=None, help="Nama atasan (R)")
+    r.add_argument("--manager-title", default=None, help="Jabatan atasan (S)")
+    r.add_argument("--vp-name", default=None, help="Override nama VP (I)")
+    r.add_argument("--vp-title", default=None, help="Override jabatan VP (H)")
+    r.add_argument("--reimburse", action="append", default=[], metavar="JENIS=NOMINAL",
+                   help="Baris reimburse, boleh berulang (mis. --reimburse bensin=150000)")
+    r.add_argument("--reimburse-csv", default=None, metavar="CSV",
+                   help="File CSV reimburse (kolom: jenis,nominal; header opsional)")
+    r.add_argument("--reimburse-from-html", action=argparse.BooleanOptionalAction, default=True,
+                   help="Isi reimburse dari tabel transaksi HTML (hotel, toll, transport, ...) sebelum --reimburse; "
+                        "default aktif seperti batch/recap")
+    r.add_argument("--hide-rs-page1", action="store_true", help="Jangan tampilkan R & S di halaman 1")
+    r.add_argument("--show-rs-page2", action="store_true", help="Tampilkan R & S di halaman 2")
+    r.add_argument("--bg", default=None, help="Template halaman 1 (default: SPJ_BG_PATH / assets/spj_blank.pdf)")
+    r.add_argument("--bg2", default=None, help="Template halaman 2 (default: SPJ_BG2_PATH / assets/spj_blank2.pdf)")
+    r.add_argument("--layout", default=None, help="File layout overlay (default: SPJ_LAYOUT_PATH / assets/layouts/spj_v1.json)")
+    r.add_argument("--store", action="store_true",
+                   help="Simpan trip + PDF ke store SQLite; input yang sama dipakai ulang tanpa render")
+    r.add_argument("--db", default=None, help="Path SQLite (default: STM_DB_PATH / data/stm.sqlite3)")
+    r.set_defaults(func=cmd_render)
+
+    t = sub.add_parser("trips", help="Cari trip tersimpan di store SQLite")
+    t.add_argument("--nik", default=None)
+    t.add_argument("--name", default=None, help="Awalan nama karyawan")
+    t.add_argument("--date-from", default=None, help="Tanggal berangkat >= (YYYY-MM-DD)")
+    t.add_argument("--date-to", default=None, help="Tanggal berangkat <= (YYYY-MM-DD)")
+    t.add_argument("--limit", type=int, default=50)
+    t.add_argument("--db", default=None, help="Path SQLite (default: STM_DB_PATH / data/stm.sqlite3)")
+    t.set_defaults(func=cmd_trips)
+
+    s = sub.add_parser("serve", help="HTTP service lokal: POST /parse & POST /render")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--workers", type=int, default=2, help="Jumlah proses worker (pre-forked)")
+    s.add_argument("--max-concurrency", type=int, default=4, help="Batas request yang diproses bersamaan")
+    s.add_argument("--timeout", type=float, default=30.0, help="Timeout antrian & render (detik)")
+    s.add_argument("--bg", default=None, help="Template halaman 1")
+    s.add_argument("--bg2", default=None, help="Template halaman 2")
+    s.add_argument("--layout", default=None, help="File layout overlay")
+    s.set_defaults(func=cmd_serve)
+
+    w = sub.add_parser("warmup", help="Jalankan warm-up proses & tampilkan waktu per tahap")
+    w.add_argument("--bg", default=None, help="Template halaman 1")
+    w.add_argument("--bg2", default=None, help="Template halaman 2")
+    w.add_argument("--layout", default=None, help="File layout overlay")
+    w.add_argument("--no-render", action="store_true", help="Lewati render kosong")
+    w.set_defaults(func=cmd_warmup)
+
+    b = sub.add_parser("bench", help="Benchmark render (wrap, satu halaman, multi halaman)")
+    b.add_argument("-o", "--output", default=None, help="File hasil JSON (untuk dibandingkan antar commit)")
+    b.add_argument("--iterations", type=int, default=10, help="Iterasi per skenario (wrap: x100)")
+    b.add_argument("--filter", default=None, help="Hanya skenario yang namanya mengandung teks ini")
+    b.add_argument("--compare", default=None, metavar="JSON", help="Bandingkan dengan file hasil sebelumnya")
+    b.set_defaults(func=cmd_bench)
+
+    lt = sub.add_parser("loadtest", help="Load test app.py: sesi AppTest dibagi ke beberapa proses")
+    lt.add_argument("--sessions", type=int, default=20, help="Jumlah sesi simulasi")
+    lt.add_argument("--concurrency", type=int, default=4,
+                    help="Jumlah proses AppTest paralel (sesi dalam satu proses berurutan)")
+    lt.add_argument("--html", action="append", default=[], metavar="HTML",
+                    help="Fixture HTML, boleh berulang (default: assets/samples/*.html)")
+    lt.add_argument("--timeout", type=float, default=120.0, help="Timeout per run script (detik)")
+    lt.add_argument("-o", "--output", default=None, help="File laporan JSON")
+    lt.set_defaults(func=cmd_loadtest)
+
+    ct = sub.add_parser("compile-templates", help="Kompilasi template PDF (tanpa metadata/resource tak terpakai)")
+    ct.add_argument("--layout", default=None, help="File layout (template diambil dari sini)")
+    ct.add_argument("--template", action="append", default=[], metavar="PDF",
+                    help="Template tertentu saja, boleh berulang")
+    ct.add_argument("--out-dir", default="assets/compiled", help="Folder artefak + manifest.json")
+    ct.set_defaults(func=cmd_compile_templates)
+
+    rc = sub.add_parser("recap", help="Ekspor rekap trip (CSV/Parquet) untuk rekonsiliasi")
+    rc.add_argument("html", nargs="*", help="File HTML Trip Detail")
+    rc.add_argument("-o", "--output", required=True, help="File rekap (.csv / .parquet; '-' = stdout CSV)")
+    rc.add_argument("--format", choices=("csv", "parquet"), default=None, help="Default: dari ekstensi output")
+    rc.add_argument("--from-store", action="store_true", help="Ambil semua trip dari store SQLite")
+    rc.add_argument("--db", default=None, help="Path SQLite (default: STM_DB_PATH / data/stm.sqlite3)")
+    rc.add_argument("--nik", default=None, help="NIK untuk semua file HTML")
+    rc.add_argument("--render", action="store_true", help="Render PDF tiap trip untuk kolom pdf_sha256")
+    rc.add_argument("--layout", default=None, help="File layout overlay (untuk --render)")
+    rc.set_defaults(func=cmd_recap)
+
+    cb = sub.add_parser("calibrate", help="PDF kalibrasi: grid koordinat + kotak anchor tiap item layout")
+    cb.add_argument("html", nargs="?", default=None, help="File HTML (opsional): ukuran kotak dari nilai asli")
+    cb.add_argument("-o", "--output", required=True, help="path PDF keluaran")
+    cb.add_argument("--step", type=int, default=50, help="Jarak garis grid utama (pt)")
+    cb.add_argument("--nik", default=None, help="Nomor Induk Karyawan")
+    cb.add_argument("--bg", default=None, help="Template halaman 1")
+    cb.add_argument("--bg2", default=None, help="Template halaman 2")
+    cb.add_argument("--layout", default=None, help="File layout overlay")
+    cb.set_defaults(func=cmd_calibrate)
+
+    bt = sub.add_parser("batch", help="Pipeline batch: banyak HTML -> PDF per file (tahap paralel)")
+    bt.add_argument("html", nargs="+", help="File HTML Trip Detail (boleh .html.gz)")
+    bt.add_argument("-o", "--output", required=True, help="Folder PDF keluaran")
+    bt.add_argument("--workers", type=int, default=2, help="Proses worker parse/render")
+    bt.add_argument("--queue", type=int, default=8, help="Ukuran antrian antar tahap")
+    bt.add_argument("--nik", default=None, help="NIK untuk semua file")
+    bt.add_argument("--recap", default=None, metavar="FILE", help="Tulis juga rekap (.csv / .parquet)")
+    bt.add_argument("--bg", default=None, help="Template halaman 1")
+    bt.add_argument("--bg2", default=None, help="Template halaman 2")
+    bt.add_argument("--layout", default=None, help="File layout overlay")
+    bt.set_defaults(func=cmd_batch)
+
+    op = sub.add_parser("optimize", help="Optimasi PDF (kompres content stream, dedup objek, buang resource)")
+    op.add_argument("pdf", help="PDF masukan")
+    op.add_argument("-o", "--output", required=True, help="PDF keluaran")
+    op.set_defaults(func=cmd_optimize)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.metrics_log:
+        from src.metrics import enable_log
+        enable_log(args.metrics_log)
+    return args.func(args)
@@ -0,0 +1,111 @@
+"""
+Helper tanggal (tanpa Streamlit):
+- parse_date_or_none / parse_dates (batch) / day_diff_inclusive
+- format_date_id / today_id_str
+
+Parser satu lintasan: string dipecah jadi token angka & kata, nama bulan dicari
+di tabel EN + ID (halaman STM bisa ter-lokalisasi), nama hari diabaikan.
+Bentuk yang dikenali:
+    "19 January, 2026"  "19 Jan 2026"  "19/Jan/2026"  "Senin, 19 Januari 2026"
+    "2026-01-19"        "19/01/2026" (hari/bulan/tahun)
+Tahun wajib 4 digit ("19/01/26" tidak ditebak -> None), sama dengan parser lama.
+Hasil di-memo per string; string tak dikenal dilaporkan sekali lewat logging.
+"""
+import logging
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BULAN_ID = (
+    "Januari", "Februari", "Maret", "April", "Mei", "Juni",
+    "Juli", "Agustus", "September", "Oktober", "November", "Desember",
+)
+_MONTHS_EN = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+
+# token lowercase -> nomor bulan (nama lengkap + singkatan EN/ID)
+MONTHS = {}
+for _i, (_en, _id) in enumerate(zip(_MONTHS_EN, BULAN_ID), 1):
+    for _name in (_en, _id):
+        MONTHS[_name.lower()] = _i
+        MONTHS[_name[:3].lower()] = _i
+MONTHS.update({"sept": 9, "agt": 8, "ags": 8, "nop": 11, "pebruari": 2, "peb": 2})
+
+# Nama hari (EN/ID) yang boleh mendahului tanggal
+WEEKDAYS = frozenset((
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "mon", "tue", "tues", "wed", "thu", "thur", "thurs", "fri", "sat", "sun",
+    "senin", "selasa", "rabu", "kamis", "jumat", "sabtu", "minggu", "ahad",
+))
+
+_TOKEN_RE = re.compile(r"\d+|[^\W\d_]+")
+MEMO_SIZE = 1024
+
+
+def _build(year: int, month: int, day: int) -> Optional[datetime]:
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _parse(s: str) -> Optional[datetime]:
+    tokens = [t for t in _TOKEN_RE.findall(s) if t.lower() not in WEEKDAYS]
+    result = None
+    if len(tokens) == 3:
+        a, b, c = tokens
+        if a.isdigit() and c.isdigit() and len(c) == 4:
+            if b.isdigit():
+                result = _build(int(c), int(b), int(a))           # 19/01/2026
+            elif b.lower() in MONTHS:
+                result = _build(int(c), MONTHS[b.lower()], int(a))  # 19 Jan 2026
+        elif a.isdigit() and len(a) == 4 and b.isdigit() and c.isdigit():
+            result = _build(int(a), int(b), int(c))               # 2026-01-19
+    if result is None:
+        logger.warning("Tanggal tidak dikenali: %r", s)
+    return result
+
+
+def parse_date_or_none(s: Optional[str]) -> Optional[datetime]:
+    """Parse tanggal EN/ID (lihat docstring modul); gagal -> None."""
+    if not s:
+        return None
+    s = s.strip()
+    return _parse(s) if s else None
+
+
+def parse_dates(values: Iterable[Optional[str]]) -> List[Optional[datetime]]:
+    """Versi batch parse_date_or_none (satu kolom tanggal)."""
+    return [parse_date_or_none(v) for v in values]
+
+
+def day_diff_inclusive(D: Optional[str], E: Optional[str]) -> Optional[int]:
+    """Hitung (E - D + 1) hari (inklusif): 19..21 -> 3."""
+    d1 = parse_date_or_none(D)
+    d2 = parse_date_or_none(E)
+    if not d1 or not d2:
+        return None
+    return (d2.date() - d1.date()).days + 1
+
+
+def format_date_id(d) -> str:
+    """date/datetime -> "2 Februari 2026"."""
+    return f"{d.day} {BULAN_ID[d.month - 1]} {d.year}"
+
+
+def today_id_str(prefix_city: str = "Jakarta") -> str:
+    """
+    "Jakarta, 2 Februari 2026" — format tanggal Indonesia dengan zona Asia/Jakarta jika tersedia.
+    """
+    try:
+        from zoneinfo import ZoneInfo
+        now = datetime.now(ZoneInfo("Asia/Jakarta"))
+    except Exception:
+        now = datetime.now()
+    return f"{prefix_city}, {format_date_id(now)}"
@@ -0,0 +1,124 @@
+"""
+Font overlay: font standard PDF (Helvetica dkk.) + TrueType dari assets/fonts.
+
+Helvetica hanya punya glyph WinAnsi (cp1252); nama karyawan/tempat di luar itu
+(mis. "Łukasz", "Nguyễn") jadi kotak hitam. `font_for_text` mengganti font
+standard dengan padanan TTF (subset ter-embed) hanya untuk teks seperti itu,
+sehingga PDF untuk teks biasa tetap seukuran versi Helvetica.
+
+Parsing file TTF & tabel lebar glyph (TTFontFace) dilakukan sekali per proses;
+hasil subset per kumpulan glyph juga di-cache, sehingga render berulang / batch
+tidak membaca atau men-subset ulang file font.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.templates import resolve_path
+
+logger = logging.getLogger(__name__)
+
+FONT_DIR = os.environ.get("STM_FONT_DIR", "assets/fonts")
+
+# nama font reportlab -> file TTF (relatif FONT_DIR)
+TTF_FONTS: Dict[str, str] = {
+    "DejaVuSans": "DejaVuSans.ttf",
+    "DejaVuSans-Bold": "DejaVuSans-Bold.ttf",
+}
+
+# Font standard -> padanan TTF untuk teks di luar cp1252
+UNICODE_FALLBACK: Dict[str, str] = {
+    "Helvetica": "DejaVuSans",
+    "Helvetica-Bold": "DejaVuSans-Bold",
+}
+
+# Batas entri cache subset (per font, kumpulan glyph -> bytes font subset)
+SUBSET_CACHE_SIZE = 64
+
+_LOCK = threading.Lock()
+# nama -> True (terdaftar) / False (gagal, tidak dicoba lagi)
+_REGISTERED: Dict[str, bool] = {}
+_SUBSETS: "OrderedDict[Tuple[str, Tuple[int, ...]], bytes]" = OrderedDict()
+_STATS = {"subset_hits": 0, "subset_misses": 0}
+
+
+def _cache_subsets(name: str, face) -> None:
+    """Bungkus face.makeSubset dengan cache LRU proses-wide."""
+    make_subset = face.makeSubset
+
+    def cached(subset):
+        key = (name, tuple(subset))
+        with _LOCK:
+            data = _SUBSETS.get(key)
+            if data is not None:
+                _SUBSETS.move_to_end(key)
+                _STATS["subset_hits"] += 1
+                return data
+        data = make_subset(subset)
+        with _LOCK:
+            _STATS["subset_misses"] += 1
+            _SUBSETS[key] = data
+            while len(_SUBSETS) > SUBSET_CACHE_SIZE:
+                _SUBSETS.popitem(last=False)
+        return data
+
+    face.makeSubset = cached
+
+
+def ensure_font(name: str) -> bool:
+    """Pastikan font siap dipakai canvas: standard/terdaftar -> True; TTF didaftarkan sekali per proses."""
+    with _LOCK:
+        known = _REGISTERED.get(name)
+    if known is not None:
+        return known
+
+    from reportlab.pdfbase import pdfmetrics
+
+    ok = False
+    if name in TTF_FONTS:
+        try:
+            from reportlab.pdfbase.ttfonts import TTFont
+            font = TTFont(name, resolve_path(os.path.join(FONT_DIR, TTF_FONTS[name])))
+            _cache_subsets(name, font.face)
+            pdfmetrics.registerFont(font)
+            ok = True
+        except Exception as e:
+            logger.warning("Font %s gagal didaftarkan: %s", name, e)
+    else:
+        try:
+            pdfmetrics.getFont(name)
+            ok = True
+        except Exception:
+            ok = False
+    with _LOCK:
+        _REGISTERED[name] = ok
+    return ok
+
+
+def _needs_unicode(text: str) -> bool:
+    try:
+        text.encode("cp1252")
+        return False
+    except UnicodeEncodeError:
+        return True
+
+
+def font_for_text(font: str, text: str) -> Optional[str]:
+    """Font yang dipakai untuk `text`: font layout, atau padanan TTF bila glyph-nya tidak ada; None bila tidak tersedia."""
+    fallback = UNICODE_FALLBACK.get(font)
+    if fallback and _needs_unicode(text) and ensure_font(fallback):
+        return fallback
+    return font if ensure_font(font) else None
+
+
+def register_all() -> Dict[str, bool]:
+    """Daftarkan semua TTF (untuk warm-up); nama -> berhasil."""
+    return {name: ensure_font(name) for name in TTF_FONTS}
+
+
+def stats() -> Dict[str, int]:
+    with _LOCK:
+        return dict(_STATS, subsets=len(_SUBSETS),
+                    registered=sum(1 for ok in _REGISTERED.values() if ok))
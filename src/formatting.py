@@ -0,0 +1,123 @@
+"""
+Helper angka & teks Rupiah (tanpa Streamlit):
+- idr_to_int / fmt_idr / fmt_n
+- terbilang_id / terbilang_rupiah
+- versi batch (*_many) untuk satu kolom nominal sekaligus
+
+Terbilang memakai tabel kata 0..999 yang dihitung sekali saat import, lalu
+angka dipecah per 3 digit (ribu, juta, miliar, triliun). Hasil semua fungsi
+di-memo (LRU) karena nominal yang sama diformat berulang kali per render
+(Q2, Q2_TB, Q_DUP, K–Q).
+"""
+from functools import lru_cache
+from typing import Iterable, List
+
+# Ukuran memo per fungsi (nominal terakhir yang diformat)
+MEMO_SIZE = 4096
+
+
+# =========================
+# Angka & IDR
+# =========================
+@lru_cache(maxsize=MEMO_SIZE)
+def _digits_to_int(s: str) -> int:
+    digits = "".join(ch for ch in s if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+def idr_to_int(s: str) -> int:
+    """'IDR 1.200.000' / '1,200,000' / '1200000' -> 1200000"""
+    if s is None:
+        return 0
+    return _digits_to_int(str(s))
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def fmt_n(n: int) -> str:
+    return f"{n:,}".replace(",", ".")
+
+
+def fmt_idr(n: int) -> str:
+    return f"IDR {fmt_n(n)}"
+
+
+# =========================
+# Terbilang (Indonesia) untuk Rupiah
+# =========================
+_SATUAN = ("", "satu", "dua", "tiga", "empat", "lima",
+           "enam", "tujuh", "delapan", "sembilan")
+
+
+def _build_lt_1000() -> tuple:
+    """Tabel terbilang 0..999 ('' untuk 0)."""
+    lt_100 = list(_SATUAN) + ["sepuluh", "sebelas"] + [f"{_SATUAN[d]} belas" for d in range(2, 10)]
+    for n in range(20, 100):
+        puluh, sisa = divmod(n, 10)
+        lt_100.append(f"{_SATUAN[puluh]} puluh" + (f" {_SATUAN[sisa]}" if sisa else ""))
+    words = list(lt_100)
+    for n in range(100, 1000):
+        ratus, sisa = divmod(n, 100)
+        head = "seratus" if ratus == 1 else f"{_SATUAN[ratus]} ratus"
+        words.append(f"{head} {lt_100[sisa]}" if sisa else head)
+    return tuple(words)
+
+
+_LT_1000 = _build_lt_1000()
+# Nama skala per kelompok 3 digit, dari kanan
+_SCALES = ("", "ribu", "juta", "miliar", "triliun")
+_TRILIUN = 1_000_000_000_000
+
+
+def _chunks_to_words(n: int) -> List[str]:
+    """0 <= n < 1000 triliun -> kata per kelompok 3 digit (kelompok 0 dilewati)."""
+    parts: List[str] = []
+    idx = 0
+    while n:
+        n, chunk = divmod(n, 1000)
+        if chunk:
+            if idx == 1 and chunk == 1:
+                parts.append("seribu")
+            else:
+                parts.append(f"{_LT_1000[chunk]} {_SCALES[idx]}" if idx else _LT_1000[chunk])
+        idx += 1
+    parts.reverse()
+    return parts
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def terbilang_id(n: int) -> str:
+    """Terbilang angka non-negatif (tanpa 'rupiah')."""
+    if n == 0:
+        return "nol"
+    if n < 0:
+        return f"minus {terbilang_id(-n)}"
+    if n >= 1000 * _TRILIUN:
+        # di atas 999 triliun: "<terbilang> triliun ..." (tidak ada skala lebih besar)
+        triliun, sisa = divmod(n, _TRILIUN)
+        return " ".join([f"{terbilang_id(triliun)} triliun"] + _chunks_to_words(sisa))
+    return " ".join(_chunks_to_words(n))
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def terbilang_rupiah(n: int) -> str:
+    """Terbilang + akhiran 'rupiah'."""
+    return f"{terbilang_id(n)} rupiah"
+
+
+# =========================
+# Batch (satu kolom nominal)
+# =========================
+def idr_to_int_many(values: Iterable[str]) -> List[int]:
+    return [idr_to_int(v) for v in values]
+
+
+def fmt_n_many(amounts: Iterable[int]) -> List[str]:
+    return [fmt_n(n) for n in amounts]
+
+
+def fmt_idr_many(amounts: Iterable[int]) -> List[str]:
+    return [f"IDR {s}" for s in fmt_n_many(amounts)]
+
+
+def terbilang_rupiah_many(amounts: Iterable[int]) -> List[str]:
+    return [terbilang_rupiah(n) for n in amounts]
@@ -0,0 +1,214 @@
+"""
+Pool proses render bersama (dipakai app Streamlit & HTTP service).
+
+Render reportlab/PyPDF2 adalah kerja CPU; dijalankan di proses worker supaya
+thread script Streamlit (dan sesi lain) tidak ikut tertahan GIL. Worker di-warm
+sekali lewat initializer (impor modul berat, font, render plan, template; lihat src.warmup).
+
+Admission dibatasi `max_pending` (job berjalan + antre); submit saat penuh
+melempar `QueueFullError`, dan `depth()` melaporkan jumlah job saat ini.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Layout & override template milik proses worker (diisi sekali oleh initializer)
+_WORKER_LAYOUT: Dict[str, object] = {"path": None, "templates": ()}
+# Laporan warm-up proses worker (lihat src.warmup)
+_WORKER_WARMUP: List = []
+
+# Key state yang perlu dikirim ke worker (session_state tidak bisa di-pickle)
+STATE_KEYS = ("parsed_AK", "reimburse_rows", "totals_LQ", "val_overrides",
+              "SHOW_RS_PAGE1", "SHOW_RS_PAGE2")
+
+
+class QueueFullError(Exception):
+    """Antrian render penuh (job berjalan + antre >= batas)."""
+
+
+# =========================
+# Sisi worker
+# =========================
+def _worker_init(layout_path: Optional[str], template_paths: Tuple[Optional[str], ...]) -> None:
+    """Impor modul berat, font, render plan & template + satu render kosong, sekali per proses worker."""
+    from src.warmup import warm_up_process
+
+    _WORKER_LAYOUT["path"] = layout_path
+    _WORKER_LAYOUT["templates"] = tuple(template_paths)
+    _WORKER_WARMUP[:] = warm_up_process(layout_path, tuple(template_paths), render=True)
+
+
+def _worker_plan():
+    """Render plan dari cache proses (dikompilasi ulang otomatis bila layout/template berubah)."""
+    from src.layout import load_plan
+    return load_plan(_WORKER_LAYOUT["path"], _WORKER_LAYOUT["templates"])
+
+
+def _worker_ping(_: int = 0) -> Tuple[int, bool, List]:
+    """(pid, template lengkap?, laporan warm-up worker)."""
+    from src.layout import plan_templates
+    return os.getpid(), all(plan_templates(_worker_plan())), list(_WORKER_WARMUP)
+
+
+def _worker_parse(html: str) -> Dict[str, Optional[str]]:
+    from src.parser import parse_html_to_A_to_K
+    return parse_html_to_A_to_K(html)
+
+
+def _worker_parse_record(html: str) -> Dict[str, object]:
+    """HTML -> record (parsed_AK + reimburse_rows dari tabel transaksi)."""
+    from src.parser import record_from_html
+    return record_from_html(html)
+
+
+def _worker_render_state(state: Dict) -> Tuple[bytes, List[str]]:
+    """State lengkap -> (pdf_bytes, pesan error)."""
+    from src.render import render_spj_pdf
+
+    errors: List[str] = []
+    pdf_bytes = render_spj_pdf(state, _worker_plan(), on_error=errors.append)
+    return pdf_bytes, errors
+
+
+def _worker_render_items(items_per_page: List[List[Dict]]) -> Tuple[bytes, List[str]]:
+    """Item overlay yang sudah di-resolve (lihat `plan_items_all`) -> (pdf_bytes, pesan error)."""
+    from src.layout import plan_templates
+    from src.render import build_pdf_multi_pages
+
+    errors: List[str] = []
+    pdf_bytes = build_pdf_multi_pages(plan_templates(_worker_plan()), items_per_page, on_error=errors.append)
+    return pdf_bytes, errors
+
+
+def _worker_render_record(record: Dict) -> Tuple[bytes, List[str]]:
+    """Record sederhana (boleh berisi 'html' mentah) -> (pdf_bytes, pesan error)."""
+    from src.parser import record_from_html
+    from src.state import state_from_record
+
+    record = dict(record)
+    if record.get("html") and not record.get("parsed_AK"):
+        # sama dengan render/batch/recap: reimburse dari tabel transaksi bila tidak diberikan
+        parsed = record_from_html(record["html"])
+        record["parsed_AK"] = parsed["parsed_AK"]
+        record.setdefault("reimburse_rows", parsed["reimburse_rows"])
+    return _worker_render_state(state_from_record(record, nik=record.get("nik")))
+
+
+def _worker_profiled(label: str, fn, args: Tuple, meta: Dict) -> Tuple[object, str]:
+    """Job yang dibungkus cProfile + tracemalloc (src.profiling) -> (hasil, folder capture)."""
+    from src.profiling import profile_run
+    with profile_run(label, meta) as capture:
+        result = fn(*args)
+    return result, capture["dir"]
+
+
+def _worker_call(fn, args: Tuple) -> Tuple[object, List]:
+    """Jalankan job + kumpulkan span metrics-nya untuk digabung di proses pemanggil."""
+    from src.metrics import collect
+    with collect() as samples:
+        result = fn(*args)
+    return result, samples
+
+
+def snapshot_state(state: Mapping) -> Dict:
+    """Salin key yang dibutuhkan render dari state (mis. st.session_state) ke dict biasa."""
+    return {k: state.get(k) for k in STATE_KEYS}
+
+
+# =========================
+# Pool
+# =========================
+class RenderPool:
+    """ProcessPoolExecutor ter-warm + admission queue berbatas."""
+
+    def __init__(self, workers: int = 2, max_pending: int = 8,
+                 layout_path: Optional[str] = None, template_paths: Sequence[Optional[str]] = ()):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.warmup_reports: Dict[int, List] = {}
+        # spawn: aman dipakai dari proses ber-thread (server Streamlit / ThreadingHTTPServer)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(layout_path, tuple(template_paths)),
+        )
+
+    def warm_up(self) -> bool:
+        """Paksa semua worker start (pre-fork) & pastikan semua template terbaca.
+
+        Laporan warm-up tiap worker yang menjawab disimpan di `warmup_reports` (pid -> steps).
+        """
+        ok = True
+        for pid, templates_ok, steps in self.executor.map(_worker_ping, range(self.workers)):
+            self.warmup_reports[pid] = steps
+            ok = ok and templates_ok
+        return ok
+
+    def depth(self) -> int:
+        """Jumlah job yang sedang berjalan + antre."""
+        with self._lock:
+            return self._pending
+
+    def _done(self, _fut: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args) -> Future:
+        """Future -> hasil `fn(*args)`; span metrics dari worker digabung ke agregat proses ini."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Antrian render penuh ({self._pending}/{self.max_pending}).")
+            self._pending += 1
+        try:
+            inner = self.executor.submit(_worker_call, fn, args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        outer: Future = Future()
+        outer.set_running_or_notify_cancel()
+
+        def relay(f: Future) -> None:
+            from src.metrics import merge
+            self._done(f)
+            try:
+                result, samples = f.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            merge(samples)
+            outer.set_result(result)
+
+        inner.add_done_callback(relay)
+        return outer
+
+    def submit_parse(self, html: str) -> Future:
+        return self.submit(_worker_parse, html)
+
+    def submit_parse_record(self, html: str) -> Future:
+        """Future -> record {"parsed_AK", "reimburse_rows"} (lihat `src.parser.record_from_html`)."""
+        return self.submit(_worker_parse_record, html)
+
+    def submit_render_state(self, state: Mapping) -> Future:
+        """Future -> (pdf_bytes, errors). `state` boleh st.session_state (di-snapshot dulu)."""
+        return self.submit(_worker_render_state, snapshot_state(state))
+
+    def submit_render_state_profiled(self, state: Mapping, meta: Optional[Dict] = None) -> Future:
+        """Seperti `submit_render_state`, diprofil di worker. Future -> ((pdf_bytes, errors), folder capture)."""
+        return self.submit(_worker_profiled, "generate", _worker_render_state, (snapshot_state(state),), meta or {})
+
+    def submit_render_items(self, items_per_page: List[List[Dict]]) -> Future:
+        """Future -> (pdf_bytes, errors) untuk item yang sudah di-resolve di proses pemanggil."""
+        return self.submit(_worker_render_items, items_per_page)
+
+    def submit_render_record(self, record: Dict) -> Future:
+        """Future -> (pdf_bytes, errors)."""
+        return self.submit(_worker_render_record, record)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
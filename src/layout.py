@@ -0,0 +1,233 @@
+"""
+Layout overlay deklaratif (JSON per template) -> render plan yang sudah dikompilasi.
+
+File layout (mis. `assets/layouts/spj_v1.json`):
+
+    {"name": "spj", "version": 1,
+     "pages": [{"template": "assets/spj_blank.pdf", "template_env": "SPJ_BG_PATH",
+                "template_fallback": "...",           (opsional)
+                "items": [{"id": "A", "source": "A_NIK", "x": 190, "y": 666, "size": 9,
+                           "bold": false, "underline": false, "align": "left",
+                           "from_right": false, "max_width": 0, "fmt": "raw",
+                           "font": "Helvetica", "show_if": "SHOW_RS_PAGE1",
+                           "layer": "static"}, ...]}]}     (layer opsional, default: dari source)
+
+Kompilasi dilakukan sekali per proses (cache: path + mtime layout & template):
+font sudah dipilih, anchor `from_right` sudah dikonversi ke x absolut memakai
+lebar mediabox template, item tanpa posisi (x = y = 0) dibuang. Render tinggal
+mengisi nilai (`plan_items`). Template baru cukup ditambah file layout baru.
+"""
+import io
+import json
+import os
+import threading
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from src.templates import file_mtime, read_template, resolve_path
+from src.values import ValueGraph, is_known_source, source_inputs
+
+DEFAULT_LAYOUT_PATH = os.environ.get("SPJ_LAYOUT_PATH", "assets/layouts/spj_v1.json")
+
+# Default flag `show_if` bila belum ada di state
+_SHOW_IF_DEFAULTS = {"SHOW_RS_PAGE1": True, "SHOW_RS_PAGE2": False}
+
+
+class PlanItem(NamedTuple):
+    id: str
+    source: str
+    fmt: Optional[str]
+    x: float                 # anchor absolut (from_right sudah di-resolve bila lebar halaman diketahui)
+    y: float
+    size: int
+    font: str
+    underline: bool
+    align: str
+    from_right: bool         # True hanya jika lebar halaman tidak diketahui saat kompilasi
+    max_width: float
+    show_if: Optional[str]
+    layer: str = "trip"      # lihat LAYERS
+    raw_x: Optional[float] = None   # x & from_right persis seperti di JSON layout (label kalibrasi)
+    raw_from_right: bool = False
+
+
+class PagePlan(NamedTuple):
+    template_path: Optional[str]
+    page_size: Optional[Tuple[float, float]]
+    items: Tuple[PlanItem, ...]
+
+
+class RenderPlan(NamedTuple):
+    name: str
+    version: int
+    pages: Tuple[PagePlan, ...]
+
+
+class LayoutError(ValueError):
+    pass
+
+
+# Layer item menurut seberapa sering nilainya berubah (dari yang paling jarang):
+# - static   : sama untuk satu departemen / satu hari (R/S atasan, CITY_TODAY)
+# - employee : sama untuk semua trip satu karyawan (A, G, NIK)
+# - trip     : berubah tiap trip (tanggal, tujuan, nominal, ...)
+# Layer selain "trip" di-render sekali lalu di-cache (lihat src.render.layer_form).
+LAYERS = ("static", "employee", "trip")
+_LAYER_INPUTS = {
+    "static": frozenset({"ak:R", "ak:S", "ov:R", "ov:S", "today"}),
+    "employee": frozenset({"ak:A", "ak:G", "ak:NIK", "ov:A", "ov:G"}),
+}
+
+
+def classify_layer(source: str, fmt: Optional[str] = None) -> str:
+    """Layer paling sempit yang mencakup semua input nilai `source`."""
+    inputs = source_inputs(source, fmt)
+    allowed = frozenset()
+    for layer in LAYERS[:-1]:
+        allowed = allowed | _LAYER_INPUTS[layer]
+        if inputs <= allowed:
+            return layer
+    return "trip"
+
+
+# (layout_path, template_paths) -> (layout_mtime, template_mtimes, plan)
+_PLAN_CACHE: Dict[tuple, tuple] = {}
+_PLAN_LOCK = threading.Lock()
+
+
+def _page_size(pdf_bytes: Optional[bytes]) -> Optional[Tuple[float, float]]:
+    if not pdf_bytes:
+        return None
+    try:
+        from PyPDF2 import PdfReader
+        page = PdfReader(io.BytesIO(pdf_bytes)).pages[0]
+        return float(page.mediabox.width), float(page.mediabox.height)
+    except Exception:
+        return None
+
+
+def _page_template_path(page: Mapping, override: Optional[str]) -> Optional[str]:
+    """Urutan: argumen override -> env (template_env) -> template -> template_fallback."""
+    if override:
+        return override
+    env_name = page.get("template_env")
+    if env_name and os.environ.get(env_name):
+        return os.environ[env_name]
+    candidates = [page.get("template"), page.get("template_fallback")]
+    for cand in candidates:
+        if cand and os.path.exists(resolve_path(cand)):
+            return cand
+    return page.get("template")
+
+
+def _compile_item(raw: Mapping, page_w: Optional[float]) -> Optional[PlanItem]:
+    source = str(raw.get("source") or raw.get("id") or "")
+    if not is_known_source(source):
+        raise LayoutError(f"source tidak dikenal: {source!r} (item {raw.get('id')!r})")
+    x = float(raw.get("x", 0.0))
+    y = float(raw.get("y", 0.0))
+    if x == 0.0 and y == 0.0:
+        return None  # belum diposisikan
+    bold = bool(raw.get("bold", False))
+    layer = str(raw.get("layer") or classify_layer(source, raw.get("fmt")))
+    if layer not in LAYERS:
+        raise LayoutError(f"layer tidak dikenal: {layer!r} (item {raw.get('id')!r}; pilih: {', '.join(LAYERS)})")
+    raw_x = x
+    raw_from_right = from_right = bool(raw.get("from_right", False))
+    if from_right and page_w is not None:
+        x = page_w - x
+        from_right = False
+    return PlanItem(
+        id=str(raw.get("id") or source),
+        source=source,
+        fmt=raw.get("fmt"),
+        x=x,
+        y=y,
+        size=int(raw.get("size", 10)),
+        font=str(raw.get("font") or ("Helvetica-Bold" if bold else "Helvetica")),
+        underline=bool(raw.get("underline", False)),
+        align=str(raw.get("align") or "left").lower(),
+        from_right=from_right,
+        max_width=float(raw.get("max_width", 0.0) or 0.0),
+        show_if=raw.get("show_if"),
+        layer=layer,
+        raw_x=raw_x,
+        raw_from_right=raw_from_right,
+    )
+
+
+def compile_layout(layout: Mapping, template_paths: Sequence[Optional[str]] = ()) -> RenderPlan:
+    """Layout (dict hasil JSON) -> RenderPlan immutable."""
+    pages = []
+    for idx, page in enumerate(layout.get("pages") or []):
+        override = template_paths[idx] if idx < len(template_paths) else None
+        path = _page_template_path(page, override)
+        size = _page_size(read_template(path)) if path else None
+        items = []
+        for raw in page.get("items") or []:
+            item = _compile_item(raw, size[0] if size else None)
+            if item is not None:
+                items.append(item)
+        pages.append(PagePlan(template_path=path, page_size=size, items=tuple(items)))
+    if not pages:
+        raise LayoutError("layout tidak punya halaman")
+    return RenderPlan(name=str(layout.get("name") or ""), version=int(layout.get("version") or 1), pages=tuple(pages))
+
+
+def load_plan(layout_path: Optional[str] = None, template_paths: Sequence[Optional[str]] = ()) -> RenderPlan:
+    """RenderPlan dari file layout, di-cache per (layout, template) dan dikompilasi ulang bila mtime berubah."""
+    path = os.path.abspath(resolve_path(layout_path or DEFAULT_LAYOUT_PATH))
+    key = (path, tuple(template_paths))
+    layout_mtime = file_mtime(path)
+    with _PLAN_LOCK:
+        hit = _PLAN_CACHE.get(key)
+    if hit and hit[0] == layout_mtime and hit[1] == tuple(file_mtime(p.template_path) for p in hit[2].pages):
+        return hit[2]
+
+    with open(path, "r", encoding="utf-8") as f:
+        layout = json.load(f)
+    plan = compile_layout(layout, template_paths)
+    with _PLAN_LOCK:
+        _PLAN_CACHE[key] = (layout_mtime, tuple(file_mtime(p.template_path) for p in plan.pages), plan)
+    return plan
+
+
+def plan_templates(plan: RenderPlan) -> List[Optional[bytes]]:
+    """Bytes template tiap halaman (dari cache template per proses)."""
+    return [read_template(p.template_path) if p.template_path else None for p in plan.pages]
+
+
+# =========================
+# Isi nilai
+# =========================
+def plan_items(plan: RenderPlan, page_idx: int, state: Mapping,
+               graph: Optional[ValueGraph] = None) -> List[Dict[str, object]]:
+    """Item overlay siap render untuk satu halaman (hanya nilai yang dihitung di sini)."""
+    graph = graph or ValueGraph(state)
+    items: List[Dict[str, object]] = []
+    for it in plan.pages[page_idx].items:
+        if it.show_if and not state.get(it.show_if, _SHOW_IF_DEFAULTS.get(it.show_if, True)):
+            continue
+        text = graph.resolve(it.source, it.fmt)
+        if not text:
+            continue
+        items.append({
+            "key": it.id,
+            "text": text,
+            "x": it.x,
+            "y": it.y,
+            "size": it.size,
+            "font": it.font,
+            "underline": it.underline,
+            "from_right": it.from_right,
+            "align": it.align,
+            "max_width": it.max_width,
+            "layer": it.layer,
+        })
+    return items
+
+
+def plan_items_all(plan: RenderPlan, state: Mapping,
+                   graph: Optional[ValueGraph] = None) -> List[List[Dict[str, object]]]:
+    """Item semua halaman; satu ValueGraph dipakai bersama sehingga tiap nilai dihitung sekali."""
+    graph = graph or ValueGraph(state)
+    return [plan_items(plan, idx, state, graph) for idx in range(len(plan.pages))]
@@ -0,0 +1,192 @@
+"""
+Ledger reimburse inkremental.
+
+Baris disimpan ringkas (kode jenis di `bytearray`, nominal di `array('q')`) dan
+total per jenis (L–P) diperbarui langsung saat tambah/ubah/hapus, jadi total L–Q
+tidak perlu memindai ulang semua baris. Impor CSV dibaca baris per baris
+(streaming) dengan validasi per baris.
+"""
+import csv
+import io
+import math
+import numbers
+from array import array
+from collections import Counter
+from typing import Dict, IO, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from src.formatting import idr_to_int
+
+KIND_TO_LETTER = {"bensin": "L", "hotel": "M", "toll": "N", "transportasi": "O", "parkir": "P"}
+KINDS = tuple(KIND_TO_LETTER)
+_KIND_CODE = {k: i for i, k in enumerate(KINDS)}
+_MAX_NOMINAL = 2 ** 63 - 1
+
+
+def _nominal_int(nominal) -> int:
+    """Nominal dari teks IDR, int, atau float bulat (data_editor/pandas) -> int."""
+    if isinstance(nominal, bool):
+        raise ValueError(f"nominal tidak valid: {nominal!r}")
+    if isinstance(nominal, numbers.Integral):
+        return int(nominal)
+    if isinstance(nominal, numbers.Real):
+        f = float(nominal)
+        if math.isnan(f):
+            raise ValueError("nominal kosong")
+        if not f.is_integer():
+            raise ValueError(f"nominal harus bilangan bulat: {nominal!r}")
+        return int(f)
+    return idr_to_int(nominal)
+
+
+def validate_row(jenis, nominal) -> Tuple[str, int]:
+    """(jenis, nominal) mentah -> (jenis, nominal int); ValueError bila tidak valid."""
+    j = str(jenis or "").strip().lower()
+    if j not in _KIND_CODE:
+        raise ValueError(f"jenis tidak dikenal: {jenis!r} (pilihan: {', '.join(KINDS)})")
+    n = _nominal_int(nominal)
+    if n <= 0:
+        raise ValueError("nominal harus lebih dari 0")
+    if n > _MAX_NOMINAL:
+        raise ValueError("nominal terlalu besar")
+    return j, n
+
+
+class ReimburseLedger:
+    """Daftar baris reimburse + total berjalan per jenis."""
+
+    __slots__ = ("_kinds", "_amounts", "_totals")
+
+    def __init__(self, rows: Iterable[Mapping] = ()):
+        self._kinds = bytearray()
+        self._amounts = array("q")
+        self._totals = [0] * len(KINDS)
+        for row in rows:
+            self.add(row["jenis"], row["nominal"])
+
+    # ---- mutasi ----
+    def add(self, jenis, nominal) -> None:
+        j, n = validate_row(jenis, nominal)
+        code = _KIND_CODE[j]
+        self._kinds.append(code)
+        self._amounts.append(n)
+        self._totals[code] += n
+
+    def update(self, pos: int, jenis=None, nominal=None) -> None:
+        old_code, old_n = self._kinds[pos], self._amounts[pos]
+        j, n = validate_row(KINDS[old_code] if jenis is None else jenis,
+                            old_n if nominal is None else nominal)
+        code = _KIND_CODE[j]
+        self._totals[old_code] -= old_n
+        self._totals[code] += n
+        self._kinds[pos] = code
+        self._amounts[pos] = n
+
+    def delete(self, pos: int) -> None:
+        code = self._kinds.pop(pos)
+        n = self._amounts.pop(pos)
+        self._totals[code] -= n
+
+    def clear(self) -> None:
+        self.__init__()
+
+    # ---- baca ----
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def __iter__(self) -> Iterator[Dict[str, object]]:
+        for code, n in zip(self._kinds, self._amounts):
+            yield {"jenis": KINDS[code], "nominal": n}
+
+    def __getitem__(self, pos: int) -> Dict[str, object]:
+        return {"jenis": KINDS[self._kinds[pos]], "nominal": self._amounts[pos]}
+
+    def rows(self) -> List[Dict[str, object]]:
+        return list(self)
+
+    def totals_LQ(self) -> Dict[str, int]:
+        LQ = {KIND_TO_LETTER[k]: self._totals[i] for i, k in enumerate(KINDS)}
+        LQ["Q"] = sum(self._totals)
+        return LQ
+
+    # ---- data editor ----
+    def apply_editor_delta(self, delta: Mapping) -> List[str]:
+        """
+        Terapkan delta `st.data_editor` (edited_rows / deleted_rows / added_rows)
+        yang relatif terhadap isi ledger saat editor dirender. Return pesan error.
+        """
+        errors: List[str] = []
+        for pos, changes in sorted((delta.get("edited_rows") or {}).items(), key=lambda kv: int(kv[0])):
+            pos = int(pos)
+            try:
+                self.update(pos, changes.get("jenis"), changes.get("nominal"))
+            except (ValueError, IndexError) as e:
+                errors.append(f"Baris {pos + 1}: {e}")
+        for pos in sorted((int(p) for p in delta.get("deleted_rows") or []), reverse=True):
+            if 0 <= pos < len(self):
+                self.delete(pos)
+        for row in delta.get("added_rows") or []:
+            try:
+                self.add(row.get("jenis"), row.get("nominal"))
+            except ValueError as e:
+                errors.append(f"Baris baru: {e}")
+        return errors
+
+
+def merge_auto_rows(current: Iterable[Mapping], previous_auto: Iterable[Mapping],
+                    new_auto: Iterable[Mapping]) -> List[Dict[str, object]]:
+    """
+    Baris otomatis (tabel transaksi) baru + baris manual yang sudah ada.
+    Baris manual = isi ledger dikurangi baris otomatis sebelumnya (per pasangan jenis/nominal),
+    jadi parse ulang trip yang sama tidak menggandakan baris dan tidak membuang input user.
+    """
+    pending = Counter((str(r["jenis"]), int(r["nominal"])) for r in previous_auto)
+    manual: List[Dict[str, object]] = []
+    for r in current:
+        key = (str(r["jenis"]), int(r["nominal"]))
+        if pending[key] > 0:
+            pending[key] -= 1
+            continue
+        manual.append({"jenis": key[0], "nominal": key[1]})
+    return [{"jenis": r["jenis"], "nominal": int(r["nominal"])} for r in new_auto] + manual
+
+
+# =========================
+# Impor CSV (streaming)
+# =========================
+def iter_csv_rows(stream: IO) -> Iterator[Tuple[int, Optional[Tuple[str, int]], Optional[str]]]:
+    """
+    Baca CSV `jenis,nominal` baris per baris (header opsional).
+    Yield (nomor_baris, (jenis, nominal) | None, pesan_error | None).
+    `stream` boleh file teks atau biner (dibaca sebagai UTF-8).
+    """
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(stream, "mode", ""):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    for line_no, rec in enumerate(csv.reader(stream), start=1):
+        if not rec or all(not c.strip() for c in rec):
+            continue
+        if line_no == 1 and rec[0].strip().lower() in ("jenis", "kategori", "category"):
+            continue  # header
+        if len(rec) < 2:
+            yield line_no, None, "kolom kurang (butuh: jenis,nominal)"
+            continue
+        if sum(1 for c in rec if c.strip()) > 2:
+            yield line_no, None, "kolom berlebih (nominal berisi koma? kutip nilainya)"
+            continue
+        try:
+            yield line_no, validate_row(rec[0], rec[1]), None
+        except ValueError as e:
+            yield line_no, None, str(e)
+
+
+def import_csv(ledger: ReimburseLedger, stream: IO, max_errors: int = 50) -> Tuple[int, List[str]]:
+    """Tambahkan semua baris valid dari CSV ke ledger. Return (jumlah_ditambah, error)."""
+    added = 0
+    errors: List[str] = []
+    for line_no, row, err in iter_csv_rows(stream):
+        if err:
+            if len(errors) < max_errors:
+                errors.append(f"Baris {line_no}: {err}")
+            continue
+        ledger.add(*row)
+        added += 1
+    return added, errors
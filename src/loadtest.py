@@ -0,0 +1,274 @@
+"""
+Load test headless app Streamlit (streamlit AppTest), sesi dibagi ke beberapa proses:
+
+    python stm.py loadtest --sessions 20 --concurrency 4 -o load.json
+
+Tiap sesi: paste HTML -> parse -> NIK -> 2 baris reimburse -> generate. Fixture default
+`assets/samples/*.html` (lokal, tanpa jaringan).
+
+AppTest tidak thread-safe (runtime tiruannya global per proses), jadi `--concurrency`
+= jumlah subprocess Python independen (`python -m src.loadtest`), bukan sesi bersamaan
+di satu server. Tiap proses punya cache_resource & pool render sendiri dan menjalankan
+bagian sesinya satu per satu; yang paralel hanya antar proses. Semua sesi tetap hidup
+sampai akhir (seperti tab yang masih terbuka), jadi pertumbuhan RSS per sesi = memori
+yang ditahan per sesi.
+
+Store SQLite app opt-in (`STM_APP_STORE=1`, diwarisi dari environment); tanpa itu tidak
+ada cache render store yang ikut terukur. Bila diaktifkan, semua proses memakai satu
+SQLite sementara (`STM_DB_PATH`) dan NIK unik per sesi mencegah render kena cache store.
+
+Laporan: latensi per langkah (p50/p95/p99/max), sesi gagal, RSS proses app & worker
+render sebelum/sesudah dan pertumbuhan per sesi (rata-rata antar proses).
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+SAMPLES_GLOB = os.path.join(ROOT, "assets", "samples", "*.html")
+STEPS = ("load", "paste", "parse", "nik", "reimburse", "generate")
+REIMBURSE_ROWS = (("bensin", "150000"), ("toll", "IDR 45.000"))
+
+
+# =========================
+# RSS (Linux /proc; fallback ru_maxrss)
+# =========================
+def _rss_bytes(pid: Optional[int] = None) -> int:
+    try:
+        with open(f"/proc/{pid or 'self'}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid is None:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+def _child_pids() -> List[int]:
+    pids: List[int] = []
+    for path in glob.glob("/proc/self/task/*/children"):
+        try:
+            with open(path, "r") as f:
+                pids.extend(int(p) for p in f.read().split())
+        except OSError:
+            continue
+    return sorted(set(pids))
+
+
+def _rss_snapshot() -> Dict[str, int]:
+    children = _child_pids()
+    return {"app": _rss_bytes(), "workers": sum(_rss_bytes(p) for p in children), "worker_count": len(children)}
+
+
+# =========================
+# Satu sesi
+# =========================
+def _by_label(widgets, prefix: str):
+    for w in widgets:
+        if str(w.label).startswith(prefix):
+            return w
+    raise LookupError(f"widget '{prefix}' tidak ditemukan")
+
+
+def run_session(idx: int, html: str, timeout: float = 120.0):
+    """Jalankan satu alur sesi -> (AppTest, {langkah: detik}, error atau None)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings: Dict[str, float] = {}
+
+    def nik():
+        _by_label(at.text_input, "NIK").input(f"108{idx:06d}")
+        at.button(key="FormSubmitter:nik_form-💾 Simpan NIK").click().run()
+
+    def reimburse():
+        for jenis, nominal in REIMBURSE_ROWS:
+            _by_label(at.selectbox, "Jenis biaya").select(jenis)
+            _by_label(at.text_input, "Nominal").input(nominal)
+            at.button(key="FormSubmitter:reimburse_form-➕ Tambah").click().run()
+
+    actions = {
+        "load": at.run,
+        "paste": lambda: at.text_area[0].input(html).run(),
+        "parse": lambda: at.button(key="btn_parse_html").click().run(),
+        "nik": nik,
+        "reimburse": reimburse,
+        "generate": lambda: at.button(key="btn_generate_pdf").click().run(),
+    }
+    try:
+        for name in STEPS:
+            t0 = time.perf_counter()
+            actions[name]()
+            timings[name] = time.perf_counter() - t0
+            if at.exception:
+                raise RuntimeError(f"{name}: {at.exception[0].message}")
+        if not at.session_state["preview_pdf_handle"]:
+            raise RuntimeError("generate: PDF tidak dihasilkan")
+    except Exception as e:
+        return at, timings, f"sesi {idx}: {e}"
+    return at, timings, None
+
+
+# =========================
+# Runner
+# =========================
+def _percentile(sorted_vals: Sequence[float], q: float) -> float:
+    return sorted_vals[max(0, min(len(sorted_vals) - 1, math.ceil(q / 100.0 * len(sorted_vals)) - 1))]
+
+
+def _prepare_env() -> None:
+    """Store & output ke folder sementara (tidak mengotori data/), sebelum app diimpor."""
+    tmp = tempfile.mkdtemp(prefix="stm-loadtest-")
+    os.environ.setdefault("STM_DB_PATH", os.path.join(tmp, "stm.sqlite3"))
+    os.environ.setdefault("STM_OUTPUT_DIR", os.path.join(tmp, "outputs"))
+
+
+def _run_batch(indices: Sequence[int], htmls: Sequence[str], timeout: float) -> Dict[str, object]:
+    """Satu proses load test: sesi pemanasan, lalu sesi `indices` berurutan (semua tetap hidup)."""
+    _, _, warm_err = run_session(0, htmls[0], timeout)
+    if warm_err:
+        return {"timings": [], "errors": [f"sesi pemanasan gagal: {warm_err}"],
+                "rss_before": _rss_snapshot(), "rss_after": _rss_snapshot(), "sessions": 0}
+    rss_before = _rss_snapshot()
+    alive, timings, errors = [], [], []
+    for i in indices:
+        at, t, err = run_session(i, htmls[(i - 1) % len(htmls)], timeout)
+        alive.append(at)
+        timings.append(t)
+        if err:
+            errors.append(err)
+    return {"timings": timings, "errors": errors, "rss_before": rss_before,
+            "rss_after": _rss_snapshot(), "sessions": len(indices)}
+
+
+def _read_fixtures(paths: Sequence[str]) -> List[str]:
+    htmls = []
+    for p in paths:
+        with open(p, "rb") as f:
+            htmls.append(f.read().decode("utf-8", errors="ignore"))
+    return htmls
+
+
+def run_loadtest(sessions: int = 20, concurrency: int = 4, html_paths: Sequence[str] = (),
+                 timeout: float = 120.0) -> Dict[str, object]:
+    _prepare_env()
+    paths = list(html_paths) or sorted(glob.glob(SAMPLES_GLOB))
+    if not paths:
+        raise FileNotFoundError("Fixture HTML tidak ditemukan (assets/samples/*.html).")
+
+    procs = max(1, min(concurrency, sessions))
+    batches = [list(range(1 + k, sessions + 1, procs)) for k in range(procs)]
+    out_dir = tempfile.mkdtemp(prefix="stm-loadtest-out-")
+    t0 = time.perf_counter()
+    running = []
+    for k, batch in enumerate(batches):
+        out_path = os.path.join(out_dir, f"batch{k}.json")
+        cmd = [sys.executable, "-m", "src.loadtest", "--out", out_path, "--timeout", str(timeout),
+               "--sessions", ",".join(map(str, batch))]
+        for p in paths:
+            cmd += ["--html", p]
+        running.append((out_path, subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL,
+                                                   stderr=subprocess.DEVNULL)))
+    batch_results = []
+    for out_path, proc in running:
+        proc.wait()
+        try:
+            with open(out_path, "r", encoding="utf-8") as f:
+                batch_results.append(json.load(f))
+        except (OSError, ValueError):
+            batch_results.append({"timings": [], "errors": [f"proses load test gagal (exit {proc.returncode})"],
+                                  "rss_before": _rss_snapshot(), "rss_after": _rss_snapshot(), "sessions": 0})
+    wall = time.perf_counter() - t0
+
+    per_step: Dict[str, List[float]] = {name: [] for name in STEPS}
+    errors: List[str] = []
+    for br in batch_results:
+        for timings in br["timings"]:
+            for name, secs in timings.items():
+                per_step[name].append(secs * 1000.0)
+        errors.extend(br["errors"])
+
+    steps = {}
+    for name, vals in per_step.items():
+        if not vals:
+            continue
+        vals.sort()
+        steps[name] = {"count": len(vals), "p50": round(_percentile(vals, 50), 1),
+                       "p95": round(_percentile(vals, 95), 1), "p99": round(_percentile(vals, 99), 1),
+                       "max": round(vals[-1], 1)}
+
+    def avg(key: str, field: str) -> int:
+        return int(sum(br[key][field] for br in batch_results) / len(batch_results))
+
+    rss_before = {f: avg("rss_before", f) for f in ("app", "workers", "worker_count")}
+    rss_after = {f: avg("rss_after", f) for f in ("app", "workers", "worker_count")}
+    growth = {}
+    for f in ("app", "workers"):
+        per_proc = [(br["rss_after"][f] - br["rss_before"][f]) / max(1, br["sessions"]) for br in batch_results]
+        growth[f] = round(sum(per_proc) / len(per_proc) / 1024.0, 1)
+
+    return {
+        "sessions": sessions,
+        "concurrency": procs,
+        "fixtures": [os.path.relpath(p, ROOT) for p in paths],
+        "wall_s": round(wall, 2),
+        "failed": len(errors),
+        "errors": errors[:20],
+        "steps_ms": steps,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "rss_growth_per_session_kib": growth,
+    }
+
+
+def format_report(report: Dict[str, object]) -> str:
+    mib = 1024.0 * 1024.0
+    lines = [f"{report['sessions']} sesi, {report['concurrency']} proses paralel, "
+             f"{report['wall_s']} s, gagal {report['failed']}"]
+    lines.append(f"  {'langkah':<10} {'n':>4} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for name, st in report["steps_ms"].items():
+        lines.append(f"  {name:<10} {st['count']:>4} {st['p50']:>9.1f} {st['p95']:>9.1f} "
+                     f"{st['p99']:>9.1f} {st['max']:>9.1f}")
+    before, after = report["rss_before"], report["rss_after"]
+    growth = report["rss_growth_per_session_kib"]
+    lines.append(f"  RSS app     {before['app'] / mib:8.1f} -> {after['app'] / mib:8.1f} MiB per proses "
+                 f"({growth['app']:+.1f} KiB/sesi)")
+    lines.append(f"  RSS worker  {before['workers'] / mib:8.1f} -> {after['workers'] / mib:8.1f} MiB "
+                 f"({after['worker_count']} proses, {growth['workers']:+.1f} KiB/sesi)")
+    for err in report["errors"]:
+        lines.append(f"  ! {err}")
+    return "\n".join(lines)
+
+
+def main(sessions: int, concurrency: int, html_paths: Sequence[str], output: Optional[str],
+         timeout: float) -> int:
+    report = run_loadtest(sessions, concurrency, html_paths, timeout)
+    print(format_report(report))
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    # Mode subprocess: satu batch sesi -> file JSON (dipanggil oleh run_loadtest)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", required=True, help="indeks sesi, dipisah koma")
+    ap.add_argument("--html", action="append", required=True)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--out", required=True)
+    a = ap.parse_args()
+    result = _run_batch([int(i) for i in a.sessions.split(",")], _read_fixtures(a.html), a.timeout)
+    with open(a.out, "w", encoding="utf-8") as f:
+        json.dump(result, f)
@@ -0,0 +1,144 @@
+"""
+Instrumentasi waktu per tahap (span) yang ringan, tanpa dependency.
+
+    with span("parse.vp"):
+        ...
+    record_bytes("pdf_out", len(pdf))
+
+Setiap span / ukuran:
+- ditulis ke logger "stm.metrics" sebagai satu baris JSON. Tanpa konfigurasi
+  logging baris ini tidak tampil; `STM_METRICS_LOG=<file.jsonl>` atau `=-` (stderr),
+  atau `python stm.py --metrics-log ...`, memasang handler-nya (`enable_log`);
+- masuk agregat bergulir per tahap (STM_METRICS_WINDOW sampel terakhir), dibaca
+  lewat `summary()` -> count / p50 / p95 / p99 / max.
+
+Di proses worker render, span dikumpulkan per job dengan `collect()` lalu digabung
+ke agregat proses pemanggil (`merge()`), jadi panel admin app melihat semuanya.
+"""
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+WINDOW = int(os.environ.get("STM_METRICS_WINDOW", "500"))
+METRICS_LOG_PATH = os.environ.get("STM_METRICS_LOG", "")
+
+logger = logging.getLogger("stm.metrics")
+
+# (jenis, nama, nilai, field tambahan); jenis: "ms" atau "bytes"
+Sample = Tuple[str, str, float, Dict[str, object]]
+
+_lock = threading.Lock()
+_series: Dict[Tuple[str, str], Deque[float]] = {}
+_local = threading.local()
+_log_handler: Optional[logging.Handler] = None
+
+
+def enable_log(target: str) -> None:
+    """Tulis satu baris JSON per sampel ke `target`: '-' = stderr, selain itu file JSONL (append).
+    Dipanggil ulang dengan target lain mengganti handler sebelumnya."""
+    global _log_handler
+    handler = (logging.StreamHandler(sys.stderr) if target == "-"
+               else logging.FileHandler(target, encoding="utf-8"))
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    with _lock:
+        old, _log_handler = _log_handler, handler
+    if old is not None:
+        logger.removeHandler(old)
+        old.close()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False   # jangan dobel lewat root logger (Streamlit / basicConfig)
+
+
+def _ensure_file_log() -> None:
+    if _log_handler is None and METRICS_LOG_PATH:
+        enable_log(METRICS_LOG_PATH)
+
+
+def _emit(sample: Sample) -> None:
+    kind, name, value, fields = sample
+    with _lock:
+        series = _series.get((kind, name))
+        if series is None:
+            series = _series[(kind, name)] = deque(maxlen=WINDOW)
+        series.append(value)
+    _ensure_file_log()
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "kind": kind, "name": name,
+                                "value": round(value, 3), **fields}, ensure_ascii=False, default=str))
+
+
+def _record(sample: Sample) -> None:
+    sink: Optional[List[Sample]] = getattr(_local, "sink", None)
+    if sink is not None:
+        sink.append(sample)
+    else:
+        _emit(sample)
+
+
+def record_ms(name: str, ms: float, **fields) -> None:
+    _record(("ms", name, float(ms), fields))
+
+
+def record_bytes(name: str, n: int, **fields) -> None:
+    _record(("bytes", name, float(n), fields))
+
+
+@contextmanager
+def span(name: str, **fields) -> Iterator[None]:
+    """Ukur durasi blok (ms) ke tahap `name`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_ms(name, (time.perf_counter() - t0) * 1000.0, **fields)
+
+
+@contextmanager
+def collect() -> Iterator[List[Sample]]:
+    """Tahan sampel di thread ini ke list (dipakai worker; kirim balik lalu `merge`)."""
+    prev = getattr(_local, "sink", None)
+    _local.sink = sink = []
+    try:
+        yield sink
+    finally:
+        _local.sink = prev
+
+
+def merge(samples: List[Sample]) -> None:
+    for s in samples or ():
+        _record(s)
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    # nearest-rank
+    idx = max(0, min(len(sorted_vals) - 1, math.ceil(q / 100.0 * len(sorted_vals)) - 1))
+    return sorted_vals[idx]
+
+
+def summary() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """{"ms": {tahap: {count, p50, p95, p99, max}}, "bytes": {...}} dari jendela bergulir."""
+    with _lock:
+        snap = {key: sorted(vals) for key, vals in _series.items() if vals}
+    out: Dict[str, Dict[str, Dict[str, float]]] = {"ms": {}, "bytes": {}}
+    for (kind, name), vals in sorted(snap.items()):
+        out[kind][name] = {
+            "count": len(vals),
+            "p50": round(_percentile(vals, 50), 3),
+            "p95": round(_percentile(vals, 95), 3),
+            "p99": round(_percentile(vals, 99), 3),
+            "max": round(vals[-1], 3),
+        }
+    return out
+
+
+def reset() -> None:
+    with _lock:
+        _series.clear()
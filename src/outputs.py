@@ -0,0 +1,135 @@
+"""
+Penyimpanan PDF hasil generate di file sementara, dengan budget memori per proses.
+
+Sesi hanya memegang handle (string). Bytes disimpan di disk; salinan "panas"
+di memori dibatasi `mem_budget` byte (LRU), dan file yang tidak disentuh lebih
+dari `ttl` detik dihapus oleh `cleanup()` (dipanggil berkala saat `put`).
+Dengan begitu RSS server dibatasi budget, bukan oleh jumlah tab yang terbuka.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+DEFAULT_OUTPUT_DIR = os.environ.get("STM_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "stm-outputs"))
+DEFAULT_MEM_BUDGET = int(float(os.environ.get("STM_OUTPUT_MEM_MB", "64")) * 1024 * 1024)
+DEFAULT_TTL = float(os.environ.get("STM_OUTPUT_TTL", str(6 * 3600)))
+
+_CLEANUP_EVERY = 60.0  # detik
+
+
+class OutputStore:
+    """Temp-file store content-addressed + cache memori LRU berbatas."""
+
+    def __init__(self, directory: Optional[str] = None, mem_budget: int = DEFAULT_MEM_BUDGET,
+                 ttl: float = DEFAULT_TTL):
+        self.directory = directory or DEFAULT_OUTPUT_DIR
+        self.mem_budget = max(0, int(mem_budget))
+        self.ttl = float(ttl)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self._last_cleanup = 0.0
+
+    def _path(self, handle: str) -> str:
+        if not handle.isalnum():
+            raise ValueError(f"handle tidak valid: {handle!r}")
+        return os.path.join(self.directory, f"{handle}.pdf")
+
+    def _remember(self, handle: str, data: bytes) -> None:
+        """Masukkan ke LRU memori lalu evict sampai di bawah budget (lock sudah dipegang)."""
+        if len(data) > self.mem_budget:
+            return
+        old = self._mem.pop(handle, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[handle] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.mem_budget and self._mem:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+
+    def put(self, data: bytes) -> str:
+        """Simpan bytes; return handle (sha256, jadi output identik berbagi file)."""
+        handle = hashlib.sha256(data).hexdigest()[:32]
+        path = self._path(handle)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            self._remember(handle, data)
+        self.maybe_cleanup()
+        return handle
+
+    def get(self, handle: Optional[str]) -> Optional[bytes]:
+        if not handle:
+            return None
+        with self._lock:
+            data = self._mem.get(handle)
+            if data is not None:
+                self._mem.move_to_end(handle)
+                return data
+        try:
+            path = self._path(handle)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._remember(handle, data)
+        return data
+
+    def exists(self, handle: Optional[str]) -> bool:
+        try:
+            return bool(handle) and os.path.exists(self._path(handle))
+        except ValueError:
+            return False
+
+    def reader(self, handle: str) -> Callable[[], bytes]:
+        """Callable untuk `st.download_button(data=...)`: file baru dibaca saat tombol diklik."""
+        return lambda: self.get(handle) or b""
+
+    def maybe_cleanup(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_cleanup < _CLEANUP_EVERY:
+                return
+            self._last_cleanup = now
+        self.cleanup()
+
+    def cleanup(self) -> int:
+        """Hapus file yang tidak disentuh lebih dari TTL; return jumlah file terhapus."""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        for entry in entries:
+            if not entry.name.endswith((".pdf", ".tmp")):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+                    handle = entry.name[:-4]
+                    with self._lock:
+                        old = self._mem.pop(handle, None)
+                        if old is not None:
+                            self._mem_bytes -= len(old)
+            except OSError:
+                continue
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"mem_items": len(self._mem), "mem_bytes": self._mem_bytes, "mem_budget": self.mem_budget}
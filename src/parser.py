@@ -2,6 +2,9 @@ import re
 from bs4 import BeautifulSoup, NavigableString, Tag
 from typing import Optional, Tuple, Dict, List
 
+from src.formatting import idr_to_int
+from src.metrics import span
+
 # ---------- Utilities ----------
 def _clean(txt: Optional[str]) -> Optional[str]:
     if txt is None:
@@ -206,51 +209,137 @@ def _extract_vp_from_timeline_soup(soup: BeautifulSoup) -> Tuple[Optional[str],
 
     return (jabatan, nama_vp)
 
-# ---------- Daily Allowance ----------
-def _daily_allowance_row(soup: BeautifulSoup) -> Tuple[Optional[str], Optional[str]]:
+# ---------- Tabel transaksi ----------
+# Label baris transaksi -> jenis ledger reimburse (src.ledger.KINDS); dicocokkan berurutan.
+# Daily Allowance (J/K) dan tiket pesawat tidak masuk ledger.
+TRANSACTION_KINDS: List[Tuple[str, str]] = [
+    (r"\b(fuel|gasoline|petrol|bbm|bensin)\b", "bensin"),
+    (r"\b(hotel|lodging|accommodation|penginapan)\b", "hotel"),
+    (r"\b(toll?|e-?toll)\b", "toll"),
+    (r"\b(parking|parkir)\b", "parkir"),
+    (r"\b(transport\w*|taxi|taksi|train|kereta|bus|ojek|car rental|sewa mobil)\b", "transportasi"),
+]
+_TRANSACTION_KIND_RES = [(re.compile(p, re.I), kind) for p, kind in TRANSACTION_KINDS]
+
+
+def transaction_kind(label: Optional[str]) -> Optional[str]:
+    """Label transaksi ('Local Transportation', ...) -> jenis ledger, None bila bukan reimburse."""
+    if not label or "daily allowance" in label.lower():
+        return None
+    for rx, kind in _TRANSACTION_KIND_RES:
+        if rx.search(label):
+            return kind
+    return None
+
+
+def _is_transaction_header(ths: List[str]) -> bool:
+    """Header tabel transaksi: ada kolom 'Transaction...' dan 'Total...' (mis. 'Total (IDR)')."""
+    return any(th.startswith("transaction") for th in ths) and any(th.startswith("total") for th in ths)
+
+
+def _transaction_rows(soup: BeautifulSoup) -> List[Dict[str, object]]:
     """
-    Temukan baris 'Daily Allowance' pada tabel transaksi:
-    - Ambil '(3 Day)' -> '3'
-    - Ambil kolom 'Total' (IDR …)
+    Semua baris tabel transaksi (header Transaction | Currency | Qty | Total) dalam satu pass:
+    [{"label", "currency", "qty", "total", "nominal", "jenis"}, ...].
+    Tanpa header yang cocok hanya baris 'Daily Allowance' yang diambil (untuk J/K), dengan
+    jenis None: baris lain di halaman (timeline, aktivitas, ...) bukan transaksi.
     """
-    for tr in soup.find_all("tr"):
+    table_rows: Optional[List[Tag]] = None
+    for t in soup.find_all("table"):
+        ths = [th.get_text(" ", strip=True).lower() for th in t.find_all("th")]
+        if _is_transaction_header(ths):
+            table_rows = t.find_all("tr")
+            break
+
+    out: List[Dict[str, object]] = []
+    for tr in table_rows if table_rows is not None else soup.find_all("tr"):
         tds = tr.find_all("td")
-        if not tds:
+        if len(tds) < 2:
+            continue
+        label = _clean(tds[0].get_text(" ", strip=True))
+        total = _clean(tds[-1].get_text(" ", strip=True))
+        if not label or not total or not re.search(r"\d", total):
             continue
-        first = tds[0].get_text(" ", strip=True).lower()
-        if "daily allowance" in first:
-            days_text = tds[2].get_text(" ", strip=True) if len(tds) >= 3 else ""
-            m = re.search(r"\((\d+)\s*Day", days_text, re.I)
-            days = m.group(1) if m else None
-            total = tds[-1].get_text(" ", strip=True)
-            return (_clean(days), _clean(total))
+        if table_rows is None and "daily allowance" not in label.lower():
+            continue
+        out.append({
+            "label": label,
+            "currency": _clean(tds[1].get_text(" ", strip=True)) if len(tds) >= 4 else None,
+            "qty": _clean(tds[2].get_text(" ", strip=True)) if len(tds) >= 3 else None,
+            "total": total,
+            "nominal": idr_to_int(total),
+            "jenis": transaction_kind(label) if table_rows is not None else None,
+        })
+    return out
+
+
+def _daily_allowance_row(transactions: List[Dict[str, object]]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Baris 'Daily Allowance' dari tabel transaksi:
+    - Ambil '(3 Day)' -> '3'
+    - Ambil kolom 'Total' (IDR …)
+    """
+    for row in transactions:
+        if "daily allowance" in str(row["label"]).lower():
+            m = re.search(r"\((\d+)\s*Day", row["qty"] or "", re.I)
+            return (m.group(1) if m else None, row["total"])
     return (None, None)
 
+
+def ledger_rows(transactions: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    """Transaksi yang masuk reimburse -> baris ledger [{"jenis", "nominal"}, ...]."""
+    return [{"jenis": row["jenis"], "nominal": row["nominal"]}
+            for row in transactions if row["jenis"] and row["nominal"] > 0]
+
+
 # ---------- Entry point ----------
-def parse_html_to_A_to_K(html: str) -> Dict[str, Optional[str]]:
-    soup = BeautifulSoup(html, "lxml")
+def parse_html_trip(html: str) -> Dict[str, object]:
+    """HTML Trip Detail -> {"parsed_AK": {A..K}, "transactions": [...]} (satu kali parse)."""
+    with span("parse.soup", html_chars=len(html)):
+        soup = BeautifulSoup(html, "lxml")
 
-    A = _employee_name_from_top_right(soup)
+    with span("parse.employee"):
+        A = _employee_name_from_top_right(soup)
 
     # B & C dari h5.my-0.text-primary (mengabaikan ikon)
-    B, C = _trip_from_to_via_primary_h5(soup)
+    with span("parse.route"):
+        B, C = _trip_from_to_via_primary_h5(soup)
 
     # D & E tetap via label span
-    D = _text_after_label(soup, "Depart Date")
-    E = _text_after_label(soup, "Return Date")
+    with span("parse.dates"):
+        D = _text_after_label(soup, "Depart Date")
+        E = _text_after_label(soup, "Return Date")
 
-    F = _purpose_from_first_table(soup)
-    G = _position_from_activity_table(soup)
+    with span("parse.purpose"):
+        F = _purpose_from_first_table(soup)
+    with span("parse.position"):
+        G = _position_from_activity_table(soup)
 
     # H & I: robust selection (hindari selalu ambil yang pertama)
-    H, I = _extract_vp_from_timeline_soup(soup)
-    if not H and not I:
-        # fallback lama supaya tetap dapat value kalau struktur berbeda
-        H, I = _timeline_fixed_role_and_name(soup)
+    with span("parse.vp"):
+        H, I = _extract_vp_from_timeline_soup(soup)
+        if not H and not I:
+            # fallback lama supaya tetap dapat value kalau struktur berbeda
+            H, I = _timeline_fixed_role_and_name(soup)
 
-    J, K = _daily_allowance_row(soup)
+    with span("parse.transactions"):
+        transactions = _transaction_rows(soup)
+        J, K = _daily_allowance_row(transactions)
 
     return {
-        "A": A, "B": B, "C": C, "D": D, "E": E,
-        "F": F, "G": G, "H": H, "I": I, "J": J, "K": K
+        "parsed_AK": {
+            "A": A, "B": B, "C": C, "D": D, "E": E,
+            "F": F, "G": G, "H": H, "I": I, "J": J, "K": K
+        },
+        "transactions": transactions,
     }
+
+
+def parse_html_to_A_to_K(html: str) -> Dict[str, Optional[str]]:
+    return parse_html_trip(html)["parsed_AK"]
+
+
+def record_from_html(html: str) -> Dict[str, object]:
+    """HTML -> record `state_from_record`: A–K + reimburse dari tabel transaksi (total L–Q)."""
+    result = parse_html_trip(html)
+    return {"parsed_AK": result["parsed_AK"], "reimburse_rows": ledger_rows(result["transactions"])}
@@ -0,0 +1,212 @@
+"""
+Optimasi PDF keluaran (satu dokumen, tanpa Streamlit):
+
+- content stream tiap halaman digabung & dikompres Flate (merge PyPDF2 menulis
+  stream hasil merge tanpa kompresi);
+- objek identik (font standard overlay yang sama di tiap halaman, font file /
+  ExtGState yang sama antar template) disatukan menjadi satu objek;
+- resource (font, XObject, ExtGState) yang tidak dirujuk content stream dibuang.
+
+`optimize_pdf(bytes)` mengembalikan bytes baru + statistik sebelum/sesudah.
+Helper `prune_resources` juga dipakai compiler template (src.template_compiler).
+"""
+import hashlib
+import io
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Kategori resource yang dipangkas bila namanya tidak muncul di content stream
+PRUNABLE_RESOURCES = ("/Font", "/XObject", "/ExtGState")
+
+
+class OptimizeStats(NamedTuple):
+    bytes_before: int
+    bytes_after: int
+    streams_compressed: int
+    objects_deduplicated: int
+    resources_removed: int
+
+    @property
+    def saved_pct(self) -> float:
+        return (1 - self.bytes_after / self.bytes_before) * 100 if self.bytes_before else 0.0
+
+
+def name_used(content: bytes, name: str) -> bool:
+    """Nama resource dirujuk content? ("/F1" tidak boleh cocok dengan "/F10")."""
+    return re.search(re.escape(name.encode("latin-1")) + rb"(?![A-Za-z0-9_.\-])", content) is not None
+
+
+def prune_resources(resources, content: bytes) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Buang resource tak terpakai (in-place) -> (yang dibuang, sisa per kategori)."""
+    removed: List[str] = []
+    kept: Dict[str, List[str]] = {}
+    for cat in list(resources.keys()):
+        entries = resources[cat].get_object()
+        if cat in PRUNABLE_RESOURCES and hasattr(entries, "keys"):
+            for name in list(entries.keys()):
+                if not name_used(content, name):
+                    del entries[name]
+                    removed.append(f"{cat}{name}")
+        kept[cat] = sorted(entries.keys()) if hasattr(entries, "keys") else [str(x) for x in entries]
+    return removed, kept
+
+
+def content_data(page) -> bytes:
+    """Content halaman ter-decode; /Contents berupa array digabung berurutan."""
+    from PyPDF2.generic import ArrayObject
+
+    content = page.get_contents()
+    if content is None:
+        return b""
+    if isinstance(content, ArrayObject):
+        return b"\n".join(part.get_object().get_data() for part in content)
+    return content.get_data()
+
+
+def compressed_contents(writer, page) -> Tuple[bytes, object]:
+    """Content halaman (gabungan) -> (bytes ter-decode, referensi stream Flate baru milik `writer`)."""
+    from PyPDF2.generic import DecodedStreamObject
+
+    data = content_data(page)
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return data, writer._add_object(stream.flate_encode())
+
+
+# =========================
+# Dedup objek identik
+# =========================
+def _dedup(reader, pages) -> int:
+    """Arahkan referensi ke objek identik (di bawah /Resources tiap halaman) ke satu objek kanonik."""
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+    canon_of: Dict[int, int] = {}     # idnum -> idnum kanonik
+    by_key: Dict[bytes, int] = {}     # hash isi -> idnum kanonik
+    visiting = set()
+
+    def digest(obj) -> bytes:
+        h = hashlib.sha1()
+
+        def feed(o) -> None:
+            if isinstance(o, IndirectObject):
+                h.update(b"R%d;" % canon(o.idnum))
+            elif isinstance(o, DictionaryObject):
+                h.update(b"<<")
+                for k in sorted(o.keys()):
+                    if k == "/Parent":
+                        continue
+                    h.update(k.encode("latin-1"))
+                    feed(o.raw_get(k))
+                h.update(b">>")
+                if isinstance(o, StreamObject):
+                    h.update(b"stream%d:" % len(o._data))
+                    h.update(o._data)
+            elif isinstance(o, ArrayObject):
+                h.update(b"[")
+                for v in o:
+                    feed(v)
+                h.update(b"]")
+            else:
+                h.update(repr(o).encode("utf-8", "replace") + b";")
+
+        feed(obj)
+        return h.digest()
+
+    def canon(idnum: int) -> int:
+        if idnum in canon_of:
+            return canon_of[idnum]
+        if idnum in visiting:   # siklus: jangan disatukan
+            return idnum
+        visiting.add(idnum)
+        key = digest(reader.get_object(idnum))
+        visiting.discard(idnum)
+        canon_of[idnum] = by_key.setdefault(key, idnum)
+        return canon_of[idnum]
+
+    replaced = 0
+
+    def rewrite(o) -> None:
+        nonlocal replaced
+        items = o.items() if isinstance(o, DictionaryObject) else enumerate(o)
+        for k, _ in list(items):
+            v = o.raw_get(k) if isinstance(o, DictionaryObject) else o[k]
+            if isinstance(v, IndirectObject):
+                c = canon(v.idnum)
+                if c != v.idnum:
+                    o[k] = IndirectObject(c, 0, reader)
+                    replaced += 1
+                target = reader.get_object(c)
+                if isinstance(target, (DictionaryObject, ArrayObject)) and c not in seen:
+                    seen.add(c)
+                    rewrite(target)
+            elif isinstance(v, (DictionaryObject, ArrayObject)):
+                rewrite(v)
+
+    seen = set()
+    for page in pages:
+        res = page.raw_get("/Resources") if "/Resources" in page else None
+        if isinstance(res, IndirectObject):
+            c = canon(res.idnum)
+            if c != res.idnum:
+                page[NameObject("/Resources")] = IndirectObject(c, 0, reader)
+                replaced += 1
+            if c not in seen:
+                seen.add(c)
+                rewrite(reader.get_object(c))
+        elif res is not None:
+            rewrite(res)
+    return len({i for i, c in canon_of.items() if c != i})
+
+
+def _prune_shared(pages, datas: List[bytes]) -> int:
+    """Pangkas resource tak terpakai; dict yang dipakai bersama (warisan /Pages, /Font indirect
+    yang sama, hasil dedup) dicek terhadap gabungan content semua halaman pemakainya."""
+    users: Dict[int, Tuple[str, object, List[bytes]]] = {}
+    for page, data in zip(pages, datas):
+        if "/Resources" not in page:
+            continue
+        resources = page["/Resources"].get_object()
+        for cat in PRUNABLE_RESOURCES:
+            if cat in resources:
+                entries = resources[cat].get_object()
+                if hasattr(entries, "keys"):
+                    users.setdefault(id(entries), (cat, entries, []))[2].append(data)
+    removed = 0
+    for cat, entries, used_by in users.values():
+        content = b"\n".join(used_by)
+        for name in list(entries.keys()):
+            if not name_used(content, name):
+                del entries[name]
+                removed += 1
+    return removed
+
+
+def optimize_pdf(pdf_bytes: bytes, dedup: bool = True, prune: bool = True) -> Tuple[bytes, Optional[OptimizeStats]]:
+    """PDF -> (PDF teroptimasi, statistik); input tidak valid dikembalikan apa adanya (stats None)."""
+    try:
+        from PyPDF2 import PdfReader, PdfWriter
+        from PyPDF2.generic import NameObject
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        pages = list(reader.pages)
+    except Exception:
+        return pdf_bytes, None
+
+    writer = PdfWriter()
+    contents = []
+    datas = []
+    for page in pages:
+        data, ref = compressed_contents(writer, page)
+        contents.append(ref)
+        datas.append(data)
+    deduped = _dedup(reader, pages) if dedup else 0
+    removed = _prune_shared(pages, datas) if prune else 0
+    for page, ref in zip(pages, contents):
+        page[NameObject("/Contents")] = ref
+        writer.add_page(page)
+    buf = io.BytesIO()
+    writer.write(buf)
+    out = buf.getvalue()
+    stats = OptimizeStats(len(pdf_bytes), len(out), len(contents), deduped, removed)
+    if len(out) >= len(pdf_bytes):
+        return pdf_bytes, stats._replace(bytes_after=len(pdf_bytes))
+    return out, stats
@@ -0,0 +1,225 @@
+"""
+Pipeline batch asyncio: baca HTML -> parse -> resolusi nilai -> render/merge -> tulis PDF.
+
+    python stm.py batch trips/*.html -o out/ --workers 4 --recap out/rekap.csv
+
+Antar tahap ada asyncio.Queue berbatas, jadi dokumen berbeda diproses bersamaan
+di tahap yang berbeda (baca file ke-n+1 sementara file ke-n dirender) dan memori
+tetap dibatasi ukuran antrian. Tahap I/O (baca/dekompresi .gz, tulis) jalan di
+thread lewat asyncio.to_thread; parse & render di RenderPool (proses ter-warm).
+Resolusi nilai cukup murah untuk jalan langsung di event loop.
+
+Per tahap dicatat: jumlah dokumen, waktu sibuk, throughput, utilisasi
+(sibuk / (wall x worker); parse & render termasuk menunggu proses pool) dan
+kedalaman antrian masuk; tahap dengan utilisasi tertinggi adalah tempat menambah worker.
+"""
+import asyncio
+import gzip
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from src.metrics import record_ms
+
+# Sinyal akhir antrian
+_DONE = object()
+
+
+class StageStats(NamedTuple):
+    name: str
+    workers: int
+    items: int
+    busy_s: float
+    throughput: float      # dokumen/detik (wall)
+    utilization: float     # busy / (wall * workers)
+    queue_mean: float      # rata-rata antrian masuk saat diambil
+    queue_max: int
+
+
+class PipelineReport(NamedTuple):
+    documents: int
+    written: int
+    wall_s: float
+    stages: List[StageStats]
+    errors: List[str]
+
+
+class _Stage:
+    """Satu tahap: `workers` task membaca `inq`, menjalankan `fn(doc)`, menaruh hasil ke `outq`."""
+
+    def __init__(self, name: str, fn, workers: int, inq: asyncio.Queue, outq: Optional[asyncio.Queue],
+                 errors: List[str]):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.inq = inq
+        self.outq = outq
+        self.errors = errors
+        self.items = 0
+        self.busy = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+    async def _worker(self) -> None:
+        while True:
+            depth = self.inq.qsize()
+            doc = await self.inq.get()
+            if doc is _DONE:
+                return
+            self.depth_sum += depth
+            self.depth_max = max(self.depth_max, depth)
+            t0 = time.perf_counter()
+            try:
+                out = await self.fn(doc)
+            except Exception as e:
+                self.errors.append(f"{doc.get('path')}: {self.name}: {e}")
+                out = None
+            dt = time.perf_counter() - t0
+            self.busy += dt
+            self.items += 1
+            record_ms(f"pipeline.{self.name}", dt * 1000.0)
+            if out is not None and self.outq is not None:
+                await self.outq.put(out)
+
+    async def run(self, downstream_workers: int) -> None:
+        await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+        if self.outq is not None:
+            for _ in range(downstream_workers):
+                await self.outq.put(_DONE)
+
+    def stats(self, wall: float) -> StageStats:
+        wall = max(wall, 1e-9)
+        return StageStats(
+            name=self.name, workers=self.workers, items=self.items, busy_s=self.busy,
+            throughput=self.items / wall, utilization=self.busy / (wall * self.workers),
+            queue_mean=self.depth_sum / self.items if self.items else 0.0, queue_max=self.depth_max,
+        )
+
+
+def _read_html_file(path: str) -> str:
+    """Baca file HTML (boleh .gz) -> teks."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read().decode("utf-8", errors="ignore")
+
+
+def _output_path(out_dir: str, path: str) -> str:
+    base = os.path.basename(path)
+    for ext in (".gz", ".html", ".htm"):
+        if base.lower().endswith(ext):
+            base = base[: -len(ext)]
+    return os.path.join(out_dir, f"{base}.pdf")
+
+
+async def run_pipeline(paths: Sequence[str], out_dir: str, workers: int = 2, queue_size: int = 8,
+                       io_workers: int = 2, nik: Optional[str] = None, layout_path: Optional[str] = None,
+                       template_paths: Sequence[Optional[str]] = (), recap_path: Optional[str] = None,
+                       pool=None) -> PipelineReport:
+    """Jalankan pipeline untuk semua `paths`; PDF ditulis ke `out_dir/<nama>.pdf`."""
+    from src.jobs import RenderPool
+    from src.layout import load_plan, plan_items_all
+    from src.state import state_from_record
+
+    workers = max(1, int(workers))
+    os.makedirs(out_dir, exist_ok=True)
+    own_pool = pool is None
+    if own_pool:
+        # parse + render berbagi pool: batas admission = jumlah task yang bisa submit bersamaan
+        pool = RenderPool(workers=workers, max_pending=2 * workers,
+                          layout_path=layout_path, template_paths=template_paths)
+        await asyncio.to_thread(pool.warm_up)
+    plan = load_plan(layout_path, template_paths)
+
+    recap = None
+    if recap_path:
+        from src.recap import RecapWriter, guess_format, recap_row
+        recap = RecapWriter(recap_path, guess_format(recap_path))
+
+    errors: List[str] = []
+    written = 0
+
+    async def read(doc: Dict) -> Dict:
+        doc["html"] = await asyncio.to_thread(_read_html_file, doc["path"])
+        return doc
+
+    async def parse(doc: Dict) -> Dict:
+        doc["record"] = await asyncio.wrap_future(pool.submit_parse_record(doc.pop("html")))
+        return doc
+
+    async def resolve(doc: Dict) -> Dict:
+        doc["state"] = state_from_record(doc.pop("record"), nik=nik)
+        doc["items"] = plan_items_all(plan, doc["state"])
+        return doc
+
+    async def render(doc: Dict) -> Dict:
+        pdf_bytes, errs = await asyncio.wrap_future(pool.submit_render_items(doc.pop("items")))
+        if not pdf_bytes:
+            raise RuntimeError("; ".join(errs) or "Gagal membuat PDF.")
+        doc["pdf"] = pdf_bytes
+        return doc
+
+    async def write(doc: Dict) -> None:
+        nonlocal written
+        out = _output_path(out_dir, doc["path"])
+
+        def _write() -> None:
+            with open(out, "wb") as f:
+                f.write(doc["pdf"])
+
+        await asyncio.to_thread(_write)
+        if recap is not None:
+            recap.write(recap_row(doc["state"], pdf_bytes=doc["pdf"], source=doc["path"]))
+        written += 1
+
+    specs = [("read", read, io_workers), ("parse", parse, workers), ("resolve", resolve, 1),
+             ("render", render, workers), ("write", write, io_workers)]
+    queues = [asyncio.Queue(maxsize=max(1, int(queue_size))) for _ in specs]
+    stages = [
+        _Stage(name, fn, n, queues[i], queues[i + 1] if i + 1 < len(specs) else None, errors)
+        for i, (name, fn, n) in enumerate(specs)
+    ]
+
+    async def feed() -> None:
+        for path in paths:
+            await queues[0].put({"path": path})
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(
+            feed(),
+            *(st.run(stages[i + 1].workers if i + 1 < len(stages) else 0) for i, st in enumerate(stages)),
+        )
+    finally:
+        if recap is not None:
+            recap.close()
+        if own_pool:
+            pool.shutdown()
+    wall = time.perf_counter() - t0
+    return PipelineReport(documents=len(paths), written=written, wall_s=wall,
+                          stages=[st.stats(wall) for st in stages], errors=errors)
+
+
+def format_report(report: PipelineReport) -> str:
+    lines = [f"{report.written}/{report.documents} PDF dalam {report.wall_s:.2f} s "
+             f"({report.written / max(report.wall_s, 1e-9):.1f} dok/s)"]
+    lines.append(f"  {'tahap':<8} {'worker':>6} {'dok':>6} {'dok/s':>8} {'utilisasi':>9} {'antrian':>12}")
+    for s in report.stages:
+        lines.append(f"  {s.name:<8} {s.workers:>6} {s.items:>6} {s.throughput:>8.1f} "
+                     f"{s.utilization * 100:>8.0f}% {s.queue_mean:>6.1f} / {s.queue_max:<3}")
+    busiest = max(report.stages, key=lambda s: s.utilization, default=None)
+    if busiest is not None and busiest.items:
+        lines.append(f"  tahap tersibuk: {busiest.name} (tambah worker di sini)")
+    for msg in report.errors:
+        lines.append(f"  ! {msg}")
+    return "\n".join(lines)
+
+
+def main(paths: List[str], out_dir: str, workers: int, queue_size: int, nik: Optional[str],
+         layout_path: Optional[str], template_paths: Sequence[Optional[str]], recap_path: Optional[str]) -> int:
+    report = asyncio.run(run_pipeline(paths, out_dir, workers=workers, queue_size=queue_size, nik=nik,
+                                      layout_path=layout_path, template_paths=template_paths,
+                                      recap_path=recap_path))
+    print(format_report(report))
+    return 0 if not report.errors else 1
@@ -0,0 +1,115 @@
+"""
+Profil on-demand untuk satu run Parse / Generate (cProfile + tracemalloc).
+
+Aktif lewat env STM_PROFILE=1 (semua run) atau per sesi (app: `?profile=1`).
+Setiap capture disimpan di STM_PROFILE_DIR/<waktu>-<label>-<pid>-<id>/:
+
+    meta.json     label, durasi, peak memori (peak_shared: ada run lain bersamaan), ukuran & sha256 HTML
+    profile.pstats / profile.txt   cProfile (top fungsi per cumulative time)
+    alloc.txt     tracemalloc: lokasi alokasi terbesar
+
+`bundle()` mengemas satu capture jadi zip untuk di-download.
+"""
+import cProfile
+import hashlib
+import io
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+import zipfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
+
+PROFILE_DIR = os.environ.get("STM_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "stm-profiles"))
+PROFILE_ENABLED = os.environ.get("STM_PROFILE", "0") == "1"
+TOP_N = 30
+
+# tracemalloc global per proses, sedangkan profile_run bisa jalan bersamaan di beberapa sesi:
+# start/stop dan reset_peak hanya oleh run pertama/terakhir (refcount di bawah lock).
+_TRACE_LOCK = threading.Lock()
+_trace_users = 0
+_trace_owned = False   # tracemalloc di-start oleh profile_run (bukan sudah aktif dari luar)
+_trace_runs = 0        # jumlah run yang pernah mulai (untuk mendeteksi run yang tumpang tindih)
+
+
+def html_meta(html: Optional[Union[str, bytes]]) -> Dict[str, object]:
+    """Ukuran + sha256 HTML (isi HTML sendiri tidak ikut disimpan)."""
+    if not html:
+        return {}
+    raw = html.encode("utf-8") if isinstance(html, str) else html
+    return {"html_bytes": len(raw), "html_sha256": hashlib.sha256(raw).hexdigest()}
+
+
+def _write_capture(path: str, prof: cProfile.Profile, snapshot: tracemalloc.Snapshot,
+                   meta: Dict[str, object]) -> None:
+    prof.dump_stats(os.path.join(path, "profile.pstats"))
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(TOP_N)
+    with open(os.path.join(path, "profile.txt"), "w", encoding="utf-8") as f:
+        f.write(buf.getvalue())
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    with open(os.path.join(path, "alloc.txt"), "w", encoding="utf-8") as f:
+        for i, stat in enumerate(snapshot.statistics("lineno")[:TOP_N], 1):
+            f.write(f"#{i}: {stat}\n")
+
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+@contextmanager
+def profile_run(label: str, meta: Optional[Dict[str, object]] = None,
+                directory: Optional[str] = None) -> Iterator[Dict[str, object]]:
+    """Profil blok `with`; yield dict capture (key "dir" = folder hasil)."""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory or PROFILE_DIR, f"{stamp}-{label}-{os.getpid()}-{uuid.uuid4().hex[:6]}")
+    os.makedirs(path, exist_ok=True)
+    capture: Dict[str, object] = {"label": label, "dir": path, "pid": os.getpid(), **(meta or {})}
+
+    global _trace_users, _trace_owned, _trace_runs
+    with _TRACE_LOCK:
+        if _trace_users == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                _trace_owned = True
+            tracemalloc.reset_peak()
+        overlapped = _trace_users > 0
+        _trace_users += 1
+        _trace_runs += 1
+        run_no = _trace_runs
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    prof.enable()
+    try:
+        yield capture
+    finally:
+        prof.disable()
+        capture["wall_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        with _TRACE_LOCK:
+            snapshot = tracemalloc.take_snapshot()
+            _, capture["peak_traced_bytes"] = tracemalloc.get_traced_memory()
+            # peak & alokasi ikut run lain yang berjalan bersamaan
+            capture["peak_shared"] = overlapped or _trace_runs != run_no
+            _trace_users -= 1
+            if _trace_users == 0 and _trace_owned:
+                tracemalloc.stop()
+                _trace_owned = False
+        _write_capture(path, prof, snapshot, capture)
+
+
+def bundle(capture_dir: str) -> bytes:
+    """Zip isi satu folder capture."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in sorted(os.listdir(capture_dir)):
+            zf.write(os.path.join(capture_dir, name), arcname=f"{os.path.basename(capture_dir)}/{name}")
+    return buf.getvalue()
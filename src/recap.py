@@ -0,0 +1,204 @@
+"""
+Ekspor rekap trip untuk rekonsiliasi finance (tanpa Streamlit):
+
+    python stm.py recap trips/*.html -o rekap.csv            # parse HTML, baris per file
+    python stm.py recap --from-store -o rekap.parquet         # semua trip di store SQLite
+
+Satu baris per trip: A–K, NIK, R/S, total L–Q, Q+K dan sha256 PDF. Baris
+ditulis satu per satu dari generator (HTML diparse / baris SQLite dibaca saat
+itu juga), jadi memori tetap konstan untuk ribuan trip. Format:
+- csv     : satu baris per trip, flush langsung;
+- parquet : kolumnar (pyarrow), buffer maksimal `row_group` baris.
+"""
+import csv
+import hashlib
+import io
+import os
+import sys
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from src.dates import parse_date_or_none
+from src.formatting import idr_to_int
+
+TEXT_KEYS = "ABCDEFGHIJ"
+AMOUNT_KEYS = "KLMNOPQ"
+RECAP_COLUMNS: List[str] = (
+    ["source"] + list(TEXT_KEYS) + ["D_ISO", "E_ISO", "K", "NIK", "R", "S"]
+    + list("LMNOPQ") + ["QK_TOTAL", "pdf_sha256"]
+)
+_INT_COLUMNS = frozenset(list(AMOUNT_KEYS) + ["QK_TOTAL"])
+FORMATS = ("csv", "parquet")
+DEFAULT_ROW_GROUP = 1000
+
+
+# =========================
+# Baris rekap
+# =========================
+def _amount(g, key: str) -> int:
+    """Angka K–Q seperti tercetak di PDF: override (teks IDR, '-'/0 -> 0) bila ada, selain itu nilai state."""
+    ov = g.get(f"ov:{key}")
+    if ov not in (None, ""):
+        return idr_to_int(str(ov))
+    return int(g.get(f"num:{key}") or 0)
+
+
+def recap_row(state: Mapping, pdf_bytes: Optional[bytes] = None, pdf_sha256: Optional[str] = None,
+              source: str = "", graph=None) -> Dict[str, object]:
+    """State (dengan totals_LQ) -> satu baris rekap dengan nilai yang sama seperti di PDF:
+    A–J, R, S dan K–Q memakai val_overrides; QK_TOTAL dihitung dari K+Q sebelum override
+    (sama dengan field QK di PDF).
+    `graph`: ValueGraph yang sudah sinkron dengan `state` (mis. `session_graph`) untuk dipakai ulang."""
+    from src.values import ValueGraph
+
+    g = graph or ValueGraph(state)
+    row: Dict[str, object] = {"source": source}
+    for k in TEXT_KEYS + "RS":
+        row[k] = str(g.get(f"key:{k}@raw") or "").strip()
+    for k, col in (("D", "D_ISO"), ("E", "E_ISO")):
+        d = parse_date_or_none(row[k])
+        row[col] = d.date().isoformat() if d else ""
+    for k in AMOUNT_KEYS:
+        row[k] = _amount(g, k)
+    row["NIK"] = str(g.get("ak:NIK") or "").strip()
+    row["QK_TOTAL"] = int(g.get("QK_TOTAL") or 0)
+    if pdf_sha256 is None and pdf_bytes:
+        pdf_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    row["pdf_sha256"] = pdf_sha256 or ""
+    return row
+
+
+# =========================
+# Writer streaming
+# =========================
+class RecapWriter:
+    """Tulis baris rekap satu per satu ke CSV / Parquet; pakai sebagai context manager."""
+
+    def __init__(self, out, fmt: str = "csv", row_group: int = DEFAULT_ROW_GROUP):
+        if fmt not in FORMATS:
+            raise ValueError(f"format rekap tidak dikenal: {fmt!r} (pilih: {', '.join(FORMATS)})")
+        self.fmt = fmt
+        self.rows = 0
+        self._row_group = max(1, int(row_group))
+        self._buffer: List[Dict[str, object]] = []
+        self._owns = isinstance(out, str)
+        if fmt == "csv":
+            self._f = open(out, "w", encoding="utf-8", newline="") if self._owns else out
+            self._csv = csv.DictWriter(self._f, fieldnames=RECAP_COLUMNS, extrasaction="ignore")
+            self._csv.writeheader()
+        else:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except Exception as e:
+                raise RuntimeError(f"Format parquet butuh pyarrow: {e}")
+            self._pa = pa
+            self._schema = pa.schema([(c, pa.int64() if c in _INT_COLUMNS else pa.string()) for c in RECAP_COLUMNS])
+            self._pq = pq.ParquetWriter(out, self._schema, compression="zstd")
+
+    def write(self, row: Mapping[str, object]) -> None:
+        self.rows += 1
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+            return
+        self._buffer.append(dict(row))
+        if len(self._buffer) >= self._row_group:
+            self._flush_group()
+
+    def _flush_group(self) -> None:
+        if not self._buffer:
+            return
+        columns = {c: [r.get(c) for r in self._buffer] for c in RECAP_COLUMNS}
+        self._pq.write_table(self._pa.table(columns, schema=self._schema))
+        self._buffer = []
+
+    def close(self) -> None:
+        if self.fmt == "csv":
+            self._f.flush()
+            if self._owns:
+                self._f.close()
+        else:
+            self._flush_group()
+            self._pq.close()
+
+    def __enter__(self) -> "RecapWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def export_rows(rows: Iterable[Mapping[str, object]], out, fmt: str = "csv",
+                row_group: int = DEFAULT_ROW_GROUP) -> int:
+    """Tulis semua baris (streaming) -> jumlah baris."""
+    with RecapWriter(out, fmt, row_group) as w:
+        for row in rows:
+            w.write(row)
+        return w.rows
+
+
+def recap_csv_bytes(rows: Iterable[Mapping[str, object]]) -> bytes:
+    """Rekap kecil (mis. satu sesi app) sebagai bytes CSV (UTF-8 BOM agar rapi di Excel)."""
+    buf = io.StringIO()
+    export_rows(rows, buf, "csv")
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def guess_format(path: str) -> str:
+    return "parquet" if os.path.splitext(path)[1].lower() in (".parquet", ".pq") else "csv"
+
+
+# =========================
+# Sumber baris
+# =========================
+def rows_from_html(paths: Iterable[str], nik: Optional[str] = None, render: bool = False,
+                   layout_path: Optional[str] = None,
+                   on_error=None) -> Iterator[Dict[str, object]]:
+    """Parse tiap file HTML (satu per satu) -> baris rekap; render=True ikut menghitung sha256 PDF."""
+    from src.parser import record_from_html
+    from src.state import state_from_record
+
+    plan = None
+    if render:
+        from src.layout import load_plan
+        from src.render import render_spj_pdf
+        plan = load_plan(layout_path)
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                html = f.read().decode("utf-8", errors="ignore")
+            state = state_from_record(record_from_html(html), nik=nik)
+        except Exception as e:
+            if on_error is not None:
+                on_error(f"{path}: {e}")
+            continue
+        pdf = render_spj_pdf(state, plan, on_error=on_error) if plan is not None else None
+        yield recap_row(state, pdf_bytes=pdf, source=path)
+
+
+def rows_from_store(store) -> Iterator[Dict[str, object]]:
+    """Semua trip di TripStore (cursor, bukan list) -> baris rekap + sha256 PDF terakhir."""
+    from src.state import state_from_record
+
+    for trip_id, record, sha in store.iter_trips():
+        yield recap_row(state_from_record(record), pdf_sha256=sha, source=f"trip:{trip_id}")
+
+
+def main(inputs: List[str], output: str, fmt: Optional[str], from_store: bool, db: Optional[str],
+         nik: Optional[str], render: bool, layout_path: Optional[str]) -> int:
+    fmt = fmt or guess_format(output)
+    errors: List[str] = []
+    if from_store:
+        from src.store import TripStore
+        rows = rows_from_store(TripStore(db))
+    else:
+        rows = rows_from_html(inputs, nik=nik, render=render, layout_path=layout_path, on_error=errors.append)
+    if output == "-":
+        if fmt != "csv":
+            raise SystemExit("Output ke stdout hanya untuk CSV.")
+        n = export_rows(rows, sys.stdout, fmt)
+    else:
+        n = export_rows(rows, output, fmt)
+    for msg in errors:
+        print(msg, file=sys.stderr)
+    print(f"{n} baris rekap ditulis ({fmt})", file=sys.stderr)
+    return 0 if not errors else 1
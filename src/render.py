@@ -0,0 +1,377 @@
+"""
+PDF rendering utils (reportlab + PyPDF2), tanpa Streamlit.
+
+Error tidak dilempar: sama seperti versi UI, fungsi mengembalikan b"" dan
+melaporkan pesan lewat `on_error` (default: logging). App Streamlit cukup
+mengoper `st.error`.
+"""
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.fonts import font_for_text
+from src.metrics import record_bytes, record_ms, span
+from src.pdf_optimize import content_data, optimize_pdf
+
+logger = logging.getLogger(__name__)
+
+ErrorCallback = Optional[Callable[[str], None]]
+
+# Kompres content stream + dedup objek + buang resource tak terpakai (src.pdf_optimize)
+OPTIMIZE_OUTPUT = os.environ.get("STM_PDF_OPTIMIZE", "1") != "0"
+
+# Layer item yang jarang berubah (lihat src.layout.LAYERS): Form XObject-nya dibuat sekali dan
+# di-cache per isi layer; tiap layer ditumpuk ke template sebagai Form XObject.
+CACHED_LAYERS = ("static", "employee")
+LAYER_CACHE_SIZE = int(os.environ.get("STM_LAYER_CACHE", "64"))
+# (lebar, tinggi, signature layer) -> Form XObject (objek PyPDF2, di-clone ke tiap writer)
+_LAYER_CACHE: "OrderedDict[tuple, object]" = OrderedDict()
+_FORM_NAME = "STMLayer"
+_LAYER_LOCK = threading.Lock()
+
+
+def _report(on_error: ErrorCallback, msg: str) -> None:
+    if on_error is not None:
+        on_error(msg)
+    else:
+        logger.error(msg)
+
+
+def wrap_text_by_space(text: str, font_name: str, font_size: float, max_width: float) -> List[str]:
+    """Bungkus teks per spasi agar tiap baris <= max_width."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    words = text.split()
+    if not words:
+        return []
+    lines: List[str] = []
+    current = ""
+
+    def w(s: str) -> float:
+        return stringWidth(s, font_name, font_size)
+
+    for word in words:
+        candidate = word if not current else f"{current} {word}"
+        if w(candidate) <= max_width:
+            current = candidate
+        else:
+            if current:
+                lines.append(current)
+                current = word
+                while w(current) > max_width and len(current) > 1:
+                    cut = len(current)
+                    while cut > 1 and w(current[:cut]) > max_width:
+                        cut -= 1
+                    lines.append(current[:cut])
+                    current = current[cut:]
+            else:
+                tmp = word
+                while w(tmp) > max_width and len(tmp) > 1:
+                    cut = len(tmp)
+                    while cut > 1 and w(tmp[:cut]) > max_width:
+                        cut -= 1
+                    lines.append(tmp[:cut])
+                    tmp = tmp[cut:]
+                current = tmp
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _draw_overlay(items: List[Dict[str, object]], page_w: float, page_h: float,
+                  as_form: bool = False) -> bytes:
+    """Gambar item ke halaman overlay kosong (reportlab) -> bytes PDF satu halaman.
+    `as_form`: item digambar di Form XObject (seukuran halaman) yang dipanggil halaman itu."""
+    from reportlab.pdfgen import canvas
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    t_overlay = time.perf_counter()
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(page_w, page_h))
+    if as_form:
+        c.beginForm(_FORM_NAME)
+
+    def draw_underlined_text(text: str, x_anchor: float, y: float, align: str, font_name: str, font_size: float):
+        """Garis underline di bawah teks sesuai alignment."""
+        width = stringWidth(text, font_name, font_size)
+        if align == "right":
+            x0 = x_anchor - width
+        elif align == "center":
+            x0 = x_anchor - width / 2.0
+        else:
+            x0 = x_anchor
+        y_line = y - max(1.0, font_size * 0.15)
+        c.setLineWidth(0.6)
+        c.line(x0, y_line, x0 + width, y_line)
+
+    for it in items:
+        text = str(it.get("text") or "").strip()
+        if not text:
+            continue
+
+        x_in = float(it.get("x", 0))  # untuk from_right=True, ini jarak dari sisi kanan
+        y = float(it.get("y", 0))
+        size = int(it.get("size", 10))
+        bold = bool(it.get("bold", False))
+        underline = bool(it.get("underline", False))
+        from_right = bool(it.get("from_right", False))
+        align = (it.get("align") or "left").lower()
+        max_width = float(it.get("max_width", 0.0))
+
+        font = str(it.get("font") or ("Helvetica-Bold" if bold else "Helvetica"))
+        resolved = font_for_text(font, text)
+        if resolved is None:
+            logger.warning("Font %s tidak tersedia untuk item %s, pakai Helvetica 10", font, it.get("id"))
+            resolved, size = "Helvetica", 10
+        font = resolved
+        c.setFont(font, size)
+
+        # Anchor X
+        x_anchor = (page_w - x_in) if from_right else x_in
+
+        # Wrapping generic
+        if max_width > 0:
+            lines = wrap_text_by_space(text, font, size, max_width)
+            line_height = size * 1.2
+            y_cursor = y
+            for ln in lines:
+                if align == "right":
+                    c.drawRightString(x_anchor, y_cursor, ln)
+                    if underline:
+                        draw_underlined_text(ln, x_anchor, y_cursor, "right", font, size)
+                elif align == "center":
+                    c.drawCentredString(x_anchor, y_cursor, ln)
+                    if underline:
+                        draw_underlined_text(ln, x_anchor, y_cursor, "center", font, size)
+                else:
+                    c.drawString(x_anchor, y_cursor, ln)
+                    if underline:
+                        draw_underlined_text(ln, x_anchor, y_cursor, "left", font, size)
+                y_cursor -= line_height
+        else:
+            if align == "right":
+                c.drawRightString(x_anchor, y, text)
+            elif align == "center":
+                c.drawCentredString(x_anchor, y, text)
+            else:
+                c.drawString(x_anchor, y, text)
+            if underline:
+                draw_underlined_text(text, x_anchor, y, align, font, size)
+
+    if as_form:
+        c.endForm()
+        c.doForm(_FORM_NAME)
+    c.showPage()
+    c.save()
+    overlay_pdf = buf.getvalue()
+    record_ms("render.overlay", (time.perf_counter() - t_overlay) * 1000.0, items=len(items))
+    return overlay_pdf
+
+
+def _overlay_form(overlay_pdf: bytes, shared: bool = False) -> object:
+    """PDF overlay dari `_draw_overlay(..., as_form=True)` -> Form XObject-nya (objek PyPDF2).
+
+    `shared`: form akan di-cache; objeknya di-resolve penuh sekali di sini (clone ke writer
+    buangan), jadi `clone` berikutnya hanya membaca cache reader dan aman dari banyak thread.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(overlay_pdf))
+    xobjects = reader.pages[0]["/Resources"]["/XObject"]
+    form = next(iter(xobjects.values())).get_object()
+    if shared:
+        form.clone(PdfWriter())
+    return form
+
+
+def _stack_layers(writer, base_page, forms: List[object], keep: List[object]) -> None:
+    """Tambahkan `base_page` ke `writer` lalu tumpuk tiap Form XObject (`_overlay_form`).
+
+    Content template tidak di-parse ulang (beda dengan `merge_page`): cukup dibungkus
+    q/Q dan diikuti `Do` per layer, jadi biaya per halaman tidak ikut ukuran template.
+    Form masuk ke writer lewat `clone` (form yang sama di halaman lain dipakai ulang).
+    `keep` menahan objek sumber sampai `writer.write` (PyPDF2 memetakan objek eksternal
+    per id(reader); reader yang sudah di-GC bisa tertukar dengan reader baru).
+    """
+    from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
+
+    page = writer.add_page(base_page)
+    if not forms:
+        return
+    keep.extend(forms)
+    resources = page.get("/Resources")
+    if resources is None:
+        resources = DictionaryObject()
+        page[NameObject("/Resources")] = resources
+    resources = resources.get_object()
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        xobjects = DictionaryObject()
+        resources[NameObject("/XObject")] = xobjects
+    xobjects = xobjects.get_object()
+
+    ops = [b"Q\n"]
+    for i, form in enumerate(forms):
+        name = f"/{_FORM_NAME}{i}"
+        xobjects[NameObject(name)] = form.clone(writer).indirect_reference
+        ops.append(b"q %s Do Q\n" % name.encode("ascii"))
+
+    def stream(data: bytes):
+        # stream langsung; PdfWriter menjadikannya objek indirect saat write
+        obj = DecodedStreamObject()
+        obj.set_data(data)
+        return obj
+
+    contents = ArrayObject([stream(b"q\n")])
+    current = page.get("/Contents")
+    if current is not None:
+        resolved = current.get_object()
+        contents.extend(resolved if isinstance(resolved, ArrayObject) else [current])
+    contents.append(stream(b"".join(ops)))
+    page[NameObject("/Contents")] = contents
+
+
+def render_one_page(background_pdf_bytes: bytes, items: List[Dict[str, object]],
+                    on_error: ErrorCallback = None) -> bytes:
+    """Render satu halaman overlay + merge dengan background."""
+    if not background_pdf_bytes:
+        return b""
+
+    try:
+        import reportlab.pdfgen.canvas  # noqa: F401  (dipakai _draw_overlay)
+        from PyPDF2 import PdfReader, PdfWriter
+    except Exception as e:
+        _report(on_error, f"Dependency PDF belum terpasang: {e}")
+        return b""
+
+    # Baca ukuran halaman template
+    try:
+        base_reader = PdfReader(io.BytesIO(background_pdf_bytes))
+        base_page = base_reader.pages[0]
+        page_w = float(base_page.mediabox.width)
+        page_h = float(base_page.mediabox.height)
+    except Exception as e:
+        _report(on_error, f"Gagal membaca template PDF: {e}")
+        return b""
+
+    overlay_pdf = _draw_overlay(items, page_w, page_h, as_form=True)
+
+    # Merge overlay ke base
+    t_merge = time.perf_counter()
+    writer = PdfWriter()
+    try:
+        _stack_layers(writer, base_page, [_overlay_form(overlay_pdf)], [base_reader])
+        out_buf = io.BytesIO()
+        writer.write(out_buf)
+    except Exception as e:
+        _report(on_error, f"Gagal merge overlay: {e}")
+        return overlay_pdf
+    record_ms("render.merge", (time.perf_counter() - t_merge) * 1000.0)
+    return out_buf.getvalue()
+
+
+# =========================
+# Layer overlay ter-cache
+# =========================
+def _layer_signature(items: List[Dict[str, object]]) -> tuple:
+    return tuple(tuple(sorted((k, str(v)) for k, v in it.items())) for it in items)
+
+
+def split_layers(items: List[Dict[str, object]]) -> Tuple[List[List[Dict[str, object]]], List[Dict[str, object]]]:
+    """Item -> ([layer ter-cache, dari yang paling jarang berubah], item dinamis per trip)."""
+    cached = [[it for it in items if it.get("layer") == layer] for layer in CACHED_LAYERS]
+    dynamic = [it for it in items if it.get("layer") not in CACHED_LAYERS]
+    return cached, dynamic
+
+
+def layer_form(items: List[Dict[str, object]], page_w: float, page_h: float) -> object:
+    """Form XObject satu layer; di-cache LRU per ukuran halaman & isi layer (gambar + parse sekali)."""
+    if LAYER_CACHE_SIZE <= 0:
+        return _overlay_form(_draw_overlay(items, page_w, page_h, as_form=True))
+    key = (page_w, page_h, _layer_signature(items))
+    with _LAYER_LOCK:
+        hit = _LAYER_CACHE.get(key)
+        if hit is not None:
+            _LAYER_CACHE.move_to_end(key)
+            return hit
+    form = _overlay_form(_draw_overlay(items, page_w, page_h, as_form=True), shared=True)
+    with _LAYER_LOCK:
+        _LAYER_CACHE[key] = form
+        while len(_LAYER_CACHE) > LAYER_CACHE_SIZE:
+            _LAYER_CACHE.popitem(last=False)
+    return form
+
+
+def clear_layer_cache() -> None:
+    with _LAYER_LOCK:
+        _LAYER_CACHE.clear()
+
+
+def build_pdf_multi_pages(background_pages: List[bytes], items_per_page: List[List[Dict[str, object]]],
+                          on_error: ErrorCallback = None) -> bytes:
+    """Render tiap halaman (layer ter-cache + layer dinamis) dan gabungkan ke satu PDF."""
+    try:
+        import reportlab.pdfgen.canvas  # noqa: F401  (dipakai _draw_overlay)
+        from PyPDF2 import PdfReader, PdfWriter
+    except Exception as e:
+        _report(on_error, f"Dependency PDF belum terpasang: {e}")
+        return b""
+
+    writer = PdfWriter()
+    readers: List[object] = []
+    any_page = False
+    for idx, bg in enumerate(background_pages):
+        if not bg:
+            continue
+        items = items_per_page[idx] if idx < len(items_per_page) else []
+        try:
+            readers.append(PdfReader(io.BytesIO(bg)))
+            base_page = readers[-1].pages[0]
+            page_w = float(base_page.mediabox.width)
+            page_h = float(base_page.mediabox.height)
+        except Exception as e:
+            _report(on_error, f"Gagal membaca template halaman #{idx+1}: {e}")
+            continue
+
+        layers, dynamic = split_layers(items)
+        forms = [layer_form(layer, page_w, page_h) for layer in layers if layer]
+        if dynamic:
+            forms.append(_overlay_form(_draw_overlay(dynamic, page_w, page_h, as_form=True)))
+        t_merge = time.perf_counter()
+        try:
+            _stack_layers(writer, base_page, forms, readers)
+            any_page = True
+        except Exception as e:
+            _report(on_error, f"Gagal merakit halaman #{idx+1}: {e}")
+        record_ms("render.merge", (time.perf_counter() - t_merge) * 1000.0)
+
+    if not any_page:
+        return b""
+
+    with span("render.serialize"):
+        out = io.BytesIO()
+        writer.write(out)
+        pdf_bytes = out.getvalue()
+    if OPTIMIZE_OUTPUT:
+        with span("render.optimize"):
+            pdf_bytes, stats = optimize_pdf(pdf_bytes)
+        if stats is not None:
+            record_bytes("pdf_raw", stats.bytes_before)
+            logger.debug("PDF dioptimasi: %d -> %d B (%.0f%%, %d objek identik disatukan)",
+                         stats.bytes_before, stats.bytes_after, stats.saved_pct, stats.objects_deduplicated)
+    record_bytes("pdf_out", len(pdf_bytes))
+    return pdf_bytes
+
+
+def render_spj_pdf(state, plan=None, on_error: ErrorCallback = None) -> bytes:
+    """State (lihat `src.state`) + render plan (default: layout SPJ) -> PDF multi halaman."""
+    from src.layout import load_plan, plan_items_all, plan_templates
+    plan = plan or load_plan()
+    with span("values"):
+        items = plan_items_all(plan, state)
+    with span("render.total"):
+        return build_pdf_multi_pages(plan_templates(plan), items, on_error=on_error)
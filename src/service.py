@@ -0,0 +1,186 @@
+"""
+HTTP render service lokal (stdlib saja):
+
+    POST /parse   body: HTML                       -> JSON A–K
+    POST /render  body: JSON record (lihat bawah)  -> application/pdf
+    GET  /healthz                                  -> status pool & antrian
+    GET  /metrics                                  -> p50/p95/p99 per tahap (src.metrics)
+
+Record /render:
+    {"html": "...", atau "parsed_AK": {...},
+     "nik": "...", "reimburse_rows": [{"jenis": "bensin", "nominal": 150000}],
+     "val_overrides": {...}, "SHOW_RS_PAGE1": true, "SHOW_RS_PAGE2": false}
+Dengan "html" tanpa "reimburse_rows", reimburse diisi dari tabel transaksi HTML.
+
+Pekerjaan CPU dijalankan di pool proses yang sudah di-warm (reportlab/PyPDF2/lxml
+terimpor, render plan & template sudah dimuat) saat server start. Request diantrikan dengan
+batas konkurensi + timeout: slot penuh terlalu lama -> 503, render terlalu lama -> 504.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence
+
+from src.jobs import QueueFullError, RenderPool
+from src.metrics import record_bytes, span, summary
+
+logger = logging.getLogger(__name__)
+
+
+class RenderService:
+    """RenderPool + admission blocking (batas konkurensi & timeout)."""
+
+    def __init__(self, workers: int = 2, max_concurrency: int = 4, timeout: float = 30.0,
+                 layout_path: Optional[str] = None, template_paths: Sequence[Optional[str]] = ()):
+        self.workers = max(1, int(workers))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = float(timeout)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.pool = RenderPool(workers=self.workers, max_pending=self.max_concurrency,
+                               layout_path=layout_path, template_paths=template_paths)
+
+    def warm_up(self) -> bool:
+        from src.warmup import format_report
+        ok = self.pool.warm_up()
+        for pid, steps in sorted(self.pool.warmup_reports.items()):
+            logger.info("%s", format_report(steps, title=f"warm-up worker {pid}"))
+        return ok
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            waiting = self._waiting
+        return {"workers": self.workers, "max_concurrency": self.max_concurrency,
+                "running": self.pool.depth(), "waiting": waiting}
+
+    def _run(self, submit, *args):
+        """Tunggu slot lalu hasil; QueueFullError / TimeoutError bila melewati batas waktu.
+        Satu deadline untuk seluruh request: waktu menunggu slot mengurangi waktu menunggu hasil."""
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self._waiting -= 1
+        if not acquired:
+            raise QueueFullError("Antrian penuh, coba lagi.")
+        try:
+            future = submit(*args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Slot dilepas saat job benar-benar selesai, bukan saat request timeout (504): job yang
+        # masih jalan tetap memakai worker & antrian pool, jadi harus tetap terhitung di admission.
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+
+    def parse(self, html: str) -> Dict[str, Optional[str]]:
+        return self._run(self.pool.submit_parse, html)
+
+    def render(self, record: Dict) -> bytes:
+        pdf_bytes, errors = self._run(self.pool.submit_render_record, record)
+        if not pdf_bytes:
+            raise RuntimeError("; ".join(errors) or "Gagal membuat PDF.")
+        return pdf_bytes
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+
+# =========================
+# HTTP
+# =========================
+def _make_handler(service: RenderService, max_body: int):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "STMRender/1.0"
+
+        def log_message(self, fmt, *args):
+            logger.info("%s - %s", self.address_string(), fmt % args)
+
+        def _send(self, code: int, body: bytes, ctype: str) -> None:
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, code: int, obj) -> None:
+            self._send(code, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+        def _read_body(self) -> Optional[bytes]:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0:
+                self._send_json(400, {"error": "Body kosong."})
+                return None
+            if length > max_body:
+                self._send_json(413, {"error": f"Body terlalu besar (> {max_body} byte)."})
+                return None
+            return self.rfile.read(length)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._send_json(200, {"ok": True, **service.stats()})
+            elif self.path == "/metrics":
+                self._send_json(200, summary())
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path not in ("/parse", "/render"):
+                self._send_json(404, {"error": "Not found"})
+                return
+            body = self._read_body()
+            if body is None:
+                return
+            try:
+                if self.path == "/parse":
+                    record_bytes("html_in", len(body))
+                    with span("html.decode"):
+                        html = body.decode("utf-8", errors="ignore")
+                    with span("request.parse"):
+                        parsed = service.parse(html)
+                    self._send_json(200, parsed)
+                else:
+                    try:
+                        record = json.loads(body.decode("utf-8"))
+                    except ValueError as e:
+                        self._send_json(400, {"error": f"JSON tidak valid: {e}"})
+                        return
+                    if not isinstance(record, dict):
+                        self._send_json(400, {"error": "Record harus berupa objek JSON."})
+                        return
+                    with span("request.render"):
+                        pdf_bytes = service.render(record)
+                    self._send(200, pdf_bytes, "application/pdf")
+            except QueueFullError as e:
+                self._send_json(503, {"error": str(e)})
+            except FutureTimeout:
+                self._send_json(504, {"error": "Timeout saat memproses request."})
+            except Exception as e:
+                logger.exception("Gagal memproses %s", self.path)
+                self._send_json(500, {"error": str(e)})
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = 2, max_concurrency: int = 4,
+          timeout: float = 30.0, max_body: int = 10 * 1024 * 1024,
+          layout_path: Optional[str] = None, template_paths: Sequence[Optional[str]] = ()) -> None:
+    """Jalankan server sampai Ctrl+C."""
+    service = RenderService(workers=workers, max_concurrency=max_concurrency, timeout=timeout,
+                            layout_path=layout_path, template_paths=template_paths)
+    if not service.warm_up():
+        logger.warning("Template PDF tidak ditemukan; /render akan gagal.")
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service, max_body))
+    logger.info("STM render service di http://%s:%d (%d worker)", host, port, service.workers)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
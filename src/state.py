@@ -0,0 +1,68 @@
+"""
+State SPJ tanpa Streamlit.
+
+"State" di sini cukup berupa mapping dengan key yang sama seperti
+`st.session_state` (parsed_AK, reimburse_rows, totals_LQ, val_overrides, ...),
+sehingga app Streamlit bisa langsung mengoper `st.session_state`, sementara
+CLI/worker cukup memakai dict biasa dari `default_state()`. Koordinat overlay
+tidak lagi disimpan di state; lihat `src.layout`.
+"""
+from typing import Dict, Iterable, Optional, Mapping, MutableMapping
+
+from src.ledger import KIND_TO_LETTER, ReimburseLedger
+
+
+def default_state() -> Dict[str, object]:
+    """State awal lengkap (dict baru setiap dipanggil)."""
+    return {
+        "parsed_AK": {},
+        "reimburse_rows": ReimburseLedger(),
+        "totals_LQ": {k: 0 for k in list("LMNOPQ")},
+        "val_overrides": {},
+        # Kontrol tampil R & S per halaman
+        "SHOW_RS_PAGE1": True,   # default ON Halaman 1
+        "SHOW_RS_PAGE2": False,  # default OFF Halaman 2
+    }
+
+
+# =========================
+# Total reimburse (L–Q)
+# =========================
+def compute_totals_LQ(rows: Iterable[Dict]) -> Dict[str, int]:
+    """Hitung total per jenis dan map ke L..Q"""
+    totals = {k: 0 for k in KIND_TO_LETTER.keys()}
+    for row in rows:
+        j = row["jenis"].lower()
+        totals[j] = totals.get(j, 0) + int(row["nominal"])
+    LQ = {letter: totals.get(jenis, 0) for jenis, letter in KIND_TO_LETTER.items()}
+    LQ["Q"] = sum(LQ.values())
+    return LQ
+
+
+def recompute_totals(state: MutableMapping) -> None:
+    """Simpan total per jenis ke state['totals_LQ'] (ledger: O(1), list lama: scan)."""
+    rows = state.get("reimburse_rows")
+    if isinstance(rows, ReimburseLedger):
+        state["totals_LQ"] = rows.totals_LQ()
+    else:
+        state["totals_LQ"] = compute_totals_LQ(rows or [])
+
+
+def state_from_record(record: Mapping, nik: Optional[str] = None) -> Dict[str, object]:
+    """
+    Bangun state lengkap dari record sederhana (dipakai CLI/worker):
+    {"parsed_AK": {...}, "reimburse_rows": [...], "val_overrides": {...},
+     "SHOW_RS_PAGE1": bool, "SHOW_RS_PAGE2": bool}
+    Key yang tidak ada memakai default.
+    """
+    state = default_state()
+    for k in ("parsed_AK", "reimburse_rows", "val_overrides", "SHOW_RS_PAGE1", "SHOW_RS_PAGE2"):
+        if k in record and record[k] is not None:
+            state[k] = record[k]
+    state["parsed_AK"] = dict(state["parsed_AK"])
+    if not isinstance(state["reimburse_rows"], ReimburseLedger):
+        state["reimburse_rows"] = ReimburseLedger(state["reimburse_rows"])
+    if nik is not None:
+        state["parsed_AK"]["NIK"] = nik
+    recompute_totals(state)
+    return state
@@ -0,0 +1,272 @@
+"""
+Penyimpanan lokal (SQLite, offline) untuk trip, override, dan PDF hasil generate.
+
+- trips       : record trip ternormalisasi (A–K, NIK, R/S, override, reimburse, flag R/S)
+                dengan index NIK, nama karyawan, dan tanggal berangkat/pulang (ISO).
+- documents   : PDF content-addressed (sha256 -> bytes).
+- renders     : render_key (hash input render) -> sha256 PDF, jadi generate ulang
+                data yang sama cukup satu query. Dibatasi umur & jumlah (`prune`).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from src.dates import parse_date_or_none
+
+DEFAULT_DB_PATH = os.environ.get("STM_DB_PATH", "data/stm.sqlite3")
+# Retensi PDF: render_key memuat tanggal hari ini, jadi tiap hari menambah PDF baru per trip.
+# Render lebih tua dari N hari / di luar N render terbaru dibuang (0 = tanpa batas);
+# dokumen yang tidak dirujuk render lagi ikut dihapus.
+RETENTION_DAYS = float(os.environ.get("STM_DB_RETENTION_DAYS", "30"))
+MAX_RENDERS = int(os.environ.get("STM_DB_MAX_RENDERS", "2000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trips (
+    id              INTEGER PRIMARY KEY,
+    trip_key        TEXT NOT NULL UNIQUE,
+    nik             TEXT,
+    employee_name   TEXT,
+    trip_from       TEXT,
+    trip_to         TEXT,
+    depart_date     TEXT,
+    return_date     TEXT,
+    purpose         TEXT,
+    parsed_json     TEXT NOT NULL,
+    overrides_json  TEXT NOT NULL DEFAULT '{}',
+    reimburse_json  TEXT NOT NULL DEFAULT '[]',
+    show_rs_page1   INTEGER NOT NULL DEFAULT 1,
+    show_rs_page2   INTEGER NOT NULL DEFAULT 0,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trips_nik ON trips(nik);
+CREATE INDEX IF NOT EXISTS idx_trips_employee ON trips(employee_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_trips_dates ON trips(depart_date, return_date);
+
+CREATE TABLE IF NOT EXISTS documents (
+    sha256      TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    data        BLOB NOT NULL,
+    created_at  REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS renders (
+    render_key  TEXT PRIMARY KEY,
+    trip_id     INTEGER REFERENCES trips(id) ON DELETE SET NULL,
+    sha256      TEXT NOT NULL REFERENCES documents(sha256),
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_renders_trip ON renders(trip_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_renders_created ON renders(created_at);
+"""
+
+# Field A–K yang membentuk identitas trip (NIK/R/S/override boleh berubah tanpa membuat trip baru)
+_TRIP_IDENTITY = ("A", "B", "C", "D", "E", "F")
+
+
+def _iso_date(s: Optional[str]) -> Optional[str]:
+    d = parse_date_or_none(s)
+    return d.date().isoformat() if d else None
+
+
+def _json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def trip_key(parsed_AK: Mapping) -> str:
+    return hashlib.sha256(_json([parsed_AK.get(k) for k in _TRIP_IDENTITY]).encode("utf-8")).hexdigest()
+
+
+def render_key(state: Mapping, plan) -> str:
+    """Hash semua input render: data state + render plan (koordinat & template) + tanggal hari ini."""
+    from src.dates import today_id_str
+    from src.templates import template_version
+
+    payload = {
+        "parsed_AK": dict(state.get("parsed_AK") or {}),
+        "reimburse": list(state.get("reimburse_rows") or []),
+        "overrides": dict(state.get("val_overrides") or {}),
+        "rs": [bool(state.get("SHOW_RS_PAGE1", True)), bool(state.get("SHOW_RS_PAGE2", False))],
+        "plan": repr(plan),
+        "templates": [template_version(p.template_path) for p in plan.pages],
+        "today": today_id_str("Jakarta"),
+    }
+    return hashlib.sha256(_json(payload).encode("utf-8")).hexdigest()
+
+
+def _record(r: sqlite3.Row) -> Dict:
+    """Baris tabel trips -> record (format `state_from_record`)."""
+    return {
+        "parsed_AK": json.loads(r["parsed_json"]),
+        "val_overrides": json.loads(r["overrides_json"]),
+        "reimburse_rows": json.loads(r["reimburse_json"]),
+        "SHOW_RS_PAGE1": bool(r["show_rs_page1"]),
+        "SHOW_RS_PAGE2": bool(r["show_rs_page2"]),
+    }
+
+
+class TripStore:
+    """Akses SQLite thread-safe (satu koneksi per thread)."""
+
+    def __init__(self, path: Optional[str] = None, retention_days: Optional[float] = None,
+                 max_renders: Optional[int] = None):
+        path = path or DEFAULT_DB_PATH
+        self.path = path
+        self.retention_days = RETENTION_DAYS if retention_days is None else float(retention_days)
+        self.max_renders = MAX_RENDERS if max_renders is None else int(max_renders)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # ---- trips ----
+    def save_trip(self, state: Mapping) -> int:
+        """Insert/update trip dari state; return id trip."""
+        ak = dict(state.get("parsed_AK") or {})
+        now = time.time()
+        row = {
+            "trip_key": trip_key(ak),
+            "nik": (str(ak.get("NIK") or "").strip() or None),
+            "employee_name": ak.get("A"),
+            "trip_from": ak.get("B"),
+            "trip_to": ak.get("C"),
+            "depart_date": _iso_date(ak.get("D")),
+            "return_date": _iso_date(ak.get("E")),
+            "purpose": ak.get("F"),
+            "parsed_json": _json(ak),
+            "overrides_json": _json(dict(state.get("val_overrides") or {})),
+            "reimburse_json": _json(list(state.get("reimburse_rows") or [])),
+            "show_rs_page1": int(bool(state.get("SHOW_RS_PAGE1", True))),
+            "show_rs_page2": int(bool(state.get("SHOW_RS_PAGE2", False))),
+            "now": now,
+        }
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO trips (trip_key, nik, employee_name, trip_from, trip_to, depart_date, return_date,
+                                   purpose, parsed_json, overrides_json, reimburse_json, show_rs_page1,
+                                   show_rs_page2, created_at, updated_at)
+                VALUES (:trip_key, :nik, :employee_name, :trip_from, :trip_to, :depart_date, :return_date,
+                        :purpose, :parsed_json, :overrides_json, :reimburse_json, :show_rs_page1,
+                        :show_rs_page2, :now, :now)
+                ON CONFLICT(trip_key) DO UPDATE SET
+                    nik = excluded.nik, parsed_json = excluded.parsed_json,
+                    overrides_json = excluded.overrides_json, reimburse_json = excluded.reimburse_json,
+                    show_rs_page1 = excluded.show_rs_page1, show_rs_page2 = excluded.show_rs_page2,
+                    updated_at = excluded.updated_at
+                """,
+                row,
+            )
+            return conn.execute("SELECT id FROM trips WHERE trip_key = ?", (row["trip_key"],)).fetchone()[0]
+
+    def find_trips(self, nik: Optional[str] = None, employee_name: Optional[str] = None,
+                   date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Cari trip (semua filter opsional; tanggal ISO YYYY-MM-DD, dicocokkan ke tanggal berangkat)."""
+        where, args = [], []
+        if nik:
+            where.append("nik = ?"); args.append(nik.strip())
+        if employee_name:
+            where.append("employee_name LIKE ? COLLATE NOCASE"); args.append(employee_name.strip() + "%")
+        if date_from:
+            where.append("depart_date >= ?"); args.append(date_from)
+        if date_to:
+            where.append("depart_date <= ?"); args.append(date_to)
+        sql = ("SELECT id, nik, employee_name, trip_from, trip_to, depart_date, return_date, purpose, updated_at "
+               "FROM trips")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY depart_date DESC, updated_at DESC LIMIT ?"
+        args.append(int(limit))
+        return [dict(r) for r in self._conn().execute(sql, args)]
+
+    def load_trip(self, trip_id: int) -> Optional[Dict]:
+        """Record trip (format `state_from_record`) atau None."""
+        r = self._conn().execute("SELECT * FROM trips WHERE id = ?", (trip_id,)).fetchone()
+        return _record(r) if r is not None else None
+
+    def iter_trips(self) -> Iterator[Tuple[int, Dict, Optional[str]]]:
+        """(id, record, sha256 PDF terakhir) untuk semua trip, dibaca bertahap lewat cursor."""
+        cur = self._conn().execute(
+            "SELECT t.*, (SELECT r.sha256 FROM renders r WHERE r.trip_id = t.id "
+            "ORDER BY r.created_at DESC LIMIT 1) AS pdf_sha256 FROM trips t ORDER BY t.id")
+        for r in cur:
+            yield r["id"], _record(r), r["pdf_sha256"]
+
+    def nik_for_employee(self, employee_name: Optional[str]) -> Optional[str]:
+        """NIK terakhir yang tersimpan untuk nama karyawan (agar tidak perlu diketik ulang)."""
+        if not employee_name:
+            return None
+        r = self._conn().execute(
+            "SELECT nik FROM trips WHERE employee_name = ? COLLATE NOCASE AND nik IS NOT NULL "
+            "ORDER BY updated_at DESC LIMIT 1", (employee_name.strip(),)).fetchone()
+        return r[0] if r else None
+
+    # ---- dokumen ----
+    def put_document(self, pdf_bytes: bytes) -> str:
+        sha = hashlib.sha256(pdf_bytes).hexdigest()
+        with self._conn() as conn:
+            conn.execute("INSERT OR IGNORE INTO documents (sha256, size, data, created_at) VALUES (?, ?, ?, ?)",
+                         (sha, len(pdf_bytes), sqlite3.Binary(pdf_bytes), time.time()))
+        return sha
+
+    def get_document(self, sha256: str) -> Optional[bytes]:
+        r = self._conn().execute("SELECT data FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+        return bytes(r[0]) if r else None
+
+    def save_render(self, key: str, pdf_bytes: bytes, trip_id: Optional[int] = None) -> str:
+        """Simpan PDF (content-addressed) + kaitkan ke render_key; return sha256."""
+        sha = self.put_document(pdf_bytes)
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO renders (render_key, trip_id, sha256, created_at) VALUES (?, ?, ?, ?)",
+                         (key, trip_id, sha, time.time()))
+        self.prune()
+        return sha
+
+    def prune(self, now: Optional[float] = None) -> Tuple[int, int]:
+        """Terapkan retensi (umur & jumlah render) -> (render dihapus, dokumen dihapus)."""
+        now = time.time() if now is None else now
+        renders = 0
+        with self._conn() as conn:
+            if self.retention_days > 0:
+                renders += conn.execute("DELETE FROM renders WHERE created_at < ?",
+                                        (now - self.retention_days * 86400,)).rowcount
+            if self.max_renders > 0:
+                renders += conn.execute(
+                    "DELETE FROM renders WHERE render_key NOT IN "
+                    "(SELECT render_key FROM renders ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_renders,)).rowcount
+            documents = conn.execute(
+                "DELETE FROM documents WHERE sha256 NOT IN (SELECT sha256 FROM renders)").rowcount
+        return renders, documents
+
+    def cached_render(self, key: str) -> Optional[bytes]:
+        """PDF untuk render_key yang sama persis (tanpa parse/render ulang), atau None."""
+        r = self._conn().execute(
+            "SELECT d.data FROM renders r JOIN documents d ON d.sha256 = r.sha256 WHERE r.render_key = ?",
+            (key,)).fetchone()
+        return bytes(r[0]) if r else None
+
+    def has_document(self, trip_id: int) -> bool:
+        r = self._conn().execute("SELECT 1 FROM renders WHERE trip_id = ? LIMIT 1", (trip_id,)).fetchone()
+        return r is not None
+
+    def latest_document(self, trip_id: int) -> Optional[bytes]:
+        r = self._conn().execute(
+            "SELECT d.data FROM renders r JOIN documents d ON d.sha256 = r.sha256 "
+            "WHERE r.trip_id = ? ORDER BY r.created_at DESC LIMIT 1", (trip_id,)).fetchone()
+        return bytes(r[0]) if r else None
@@ -0,0 +1,154 @@
+"""
+Kompilasi offline template PDF (background SPJ) menjadi artefak yang lebih ringan:
+
+    python stm.py compile-templates          -> assets/compiled/<nama>-<hash>.pdf + manifest.json
+
+Per template (halaman pertama saja, yang dipakai overlay):
+- salin halaman ke dokumen baru: Info/XMP metadata, struktur tag (StructTreeRoot),
+  /StructParents & /Tabs tidak ikut;
+- buang resource (font, XObject, ExtGState) yang tidak dirujuk content stream;
+- gabung & kompres content stream (Flate);
+- tulis /MediaBox eksplisit (hasil resolve warisan dari /Pages).
+
+Nama artefak diturunkan dari path relatif sumber (+ hash pendek), jadi dua
+sumber dengan nama file sama (mis. `assets/spj_blank2` vs `assets/spj_blank2.pdf`)
+tidak saling menimpa; bentrok nama tetap ditolak.
+
+Manifest mencatat sha256 sumber & artefak, ukuran, page size dan resource yang
+tersisa. `src.templates.read_template` memakai artefak bila sha256 sumber masih
+cocok; sumber yang berubah otomatis kembali ke file asli sampai dikompilasi ulang.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.pdf_optimize import compressed_contents, prune_resources
+from src.templates import _REPO_ROOT, COMPILED_DIR, MANIFEST_NAME, resolve_path
+
+MANIFEST_VERSION = 1
+
+# Key halaman yang hanya relevan untuk PDF ber-tag / navigasi
+_DROP_PAGE_KEYS = ("/StructParents", "/Tabs", "/PieceInfo", "/Metadata", "/Thumb")
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _source_key(src: str) -> str:
+    """Path sumber ternormalisasi (relatif ke root repo bila di dalamnya, pemisah '/')."""
+    path = os.path.normpath(src)
+    if os.path.isabs(path):
+        rel = os.path.relpath(path, _REPO_ROOT)
+        if not rel.startswith(os.pardir):
+            path = rel
+    return path.replace(os.sep, "/")
+
+
+def artifact_name(src: str) -> str:
+    """Nama artefak unik per path sumber: `<stem>-<sha1 path[:8]>.pdf`."""
+    key = _source_key(src)
+    stem = os.path.splitext(os.path.basename(key))[0] or "template"
+    return f"{stem}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}.pdf"
+
+
+def compile_template(pdf_bytes: bytes) -> Tuple[bytes, Dict[str, object]]:
+    """Bytes template -> (bytes artefak, info untuk manifest)."""
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.generic import DictionaryObject, NameObject, RectangleObject
+
+    page = PdfReader(io.BytesIO(pdf_bytes)).pages[0]
+    width, height = float(page.mediabox.width), float(page.mediabox.height)
+    writer = PdfWriter()
+    content_data, content_ref = compressed_contents(writer, page)
+
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else DictionaryObject()
+    removed, kept = prune_resources(resources, content_data)
+
+    for key in _DROP_PAGE_KEYS:
+        if key in page:
+            del page[NameObject(key)]
+    page[NameObject("/MediaBox")] = RectangleObject([0, 0, width, height])
+    for box in ("/CropBox", "/TrimBox", "/BleedBox", "/ArtBox"):
+        if box in page and [float(v) for v in page[box]] == [0.0, 0.0, width, height]:
+            del page[NameObject(box)]
+
+    page[NameObject("/Contents")] = content_ref
+    writer.add_page(page)
+    buf = io.BytesIO()
+    writer.write(buf)
+    data = buf.getvalue()
+    return data, {
+        "page_size": [width, height],
+        "resources": kept,
+        "removed_resources": removed,
+    }
+
+
+def _layout_templates(layout_path: Optional[str]) -> List[str]:
+    """Semua path template (template + template_fallback) di file layout."""
+    from src.layout import DEFAULT_LAYOUT_PATH
+    with open(resolve_path(layout_path or DEFAULT_LAYOUT_PATH), "r", encoding="utf-8") as f:
+        layout = json.load(f)
+    paths: List[str] = []
+    for page in layout.get("pages", []):
+        for key in ("template", "template_fallback"):
+            if page.get(key) and page[key] not in paths:
+                paths.append(page[key])
+    return paths
+
+
+def compile_all(layout_path: Optional[str] = None, sources: Optional[List[str]] = None,
+                out_dir: str = COMPILED_DIR) -> Dict[str, object]:
+    """Kompilasi template dari layout (atau `sources`) -> manifest (juga ditulis ke out_dir)."""
+    out_abs = resolve_path(out_dir)
+    os.makedirs(out_abs, exist_ok=True)
+    manifest: Dict[str, object] = {"version": MANIFEST_VERSION,
+                                   "compiled_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                   "templates": {}, "missing": []}
+    owners: Dict[str, str] = {}
+    for src in sources or _layout_templates(layout_path):
+        key = _source_key(src)
+        name = artifact_name(src)
+        if owners.get(name, key) != key:
+            raise ValueError(f"Template {owners[name]!r} dan {key!r} memetakan ke artefak yang sama: {name}")
+        if name in owners:
+            continue
+        owners[name] = key
+        src_abs = resolve_path(src)
+        if not os.path.isfile(src_abs):
+            manifest["missing"].append(src)
+            continue
+        with open(src_abs, "rb") as f:
+            raw = f.read()
+        data, info = compile_template(raw)
+        artifact = os.path.join(out_dir, name)
+        with open(resolve_path(artifact), "wb") as f:
+            f.write(data)
+        manifest["templates"][src] = {
+            "artifact": artifact,
+            "source_sha256": _sha256(raw),
+            "source_bytes": len(raw),
+            "sha256": _sha256(data),
+            "bytes": len(data),
+            **info,
+        }
+    with open(os.path.join(out_abs, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def format_manifest(manifest: Dict[str, object]) -> str:
+    lines = []
+    for src, e in manifest["templates"].items():
+        w, h = e["page_size"]
+        lines.append(f"{src} -> {e['artifact']}: {e['source_bytes']} -> {e['bytes']} B "
+                     f"({(1 - e['bytes'] / e['source_bytes']) * 100:.0f}% lebih kecil), {w:g}x{h:g} pt, "
+                     f"{len(e['removed_resources'])} resource dibuang")
+    for src in manifest["missing"]:
+        lines.append(f"{src}: tidak ada (dilewati)")
+    return "\n".join(lines)
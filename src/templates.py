@@ -0,0 +1,122 @@
+"""
+Template PDF (background overlay): loader tanpa Streamlit. Path template per
+halaman ditentukan oleh file layout (lihat `src.layout`).
+
+Template dibaca sekali per proses dan disimpan di cache bersama, dengan key
+path + mtime/size: file yang berubah otomatis dibaca ulang, sesi/worker hanya
+memegang referensi ke bytes yang sama.
+
+Bila ada artefak hasil `python stm.py compile-templates` (assets/compiled, lihat
+`src.template_compiler`) dan sha256 sumbernya masih cocok, artefak itu yang dipakai.
+Matikan dengan STM_TEMPLATE_COMPILED=0.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+# Root repo: path relatif dicoba dari CWD dulu, lalu dari sini (CLI/cron bisa jalan dari mana saja)
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPILED_DIR = "assets/compiled"
+MANIFEST_NAME = "manifest.json"
+USE_COMPILED = os.environ.get("STM_TEMPLATE_COMPILED", "1") != "0"
+
+# abs_path -> (mtime_ns, size, mtime manifest, bytes yang dipakai)
+_CACHE: Dict[str, Tuple[int, int, Optional[int], bytes]] = {}
+_CACHE_LOCK = threading.Lock()
+# manifest compiled: (mtime_ns, {abs_path sumber: entry})
+_MANIFEST: Dict[str, object] = {"mtime": None, "entries": {}}
+
+
+def resolve_path(path: str) -> str:
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+    return os.path.join(_REPO_ROOT, path)
+
+
+def file_mtime(path: Optional[str]) -> Optional[int]:
+    """mtime_ns file (path relatif di-resolve seperti template); None bila tidak ada."""
+    if not path:
+        return None
+    try:
+        return os.stat(resolve_path(path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _manifest_path() -> str:
+    return os.path.join(resolve_path(COMPILED_DIR), MANIFEST_NAME)
+
+
+def _compiled_entries(manifest_mtime: int) -> Dict[str, Dict]:
+    """Entry manifest per abs path sumber (dibaca ulang hanya bila manifest berubah)."""
+    with _CACHE_LOCK:
+        if _MANIFEST["mtime"] == manifest_mtime:
+            return _MANIFEST["entries"]
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        entries = {os.path.abspath(resolve_path(src)): e for src, e in raw.get("templates", {}).items()}
+    except (OSError, ValueError):
+        entries = {}
+    with _CACHE_LOCK:
+        _MANIFEST.update(mtime=manifest_mtime, entries=entries)
+    return entries
+
+
+def _compiled_for(path: str, source: bytes, manifest_mtime: int) -> Optional[bytes]:
+    """Bytes artefak bila sumber belum berubah sejak dikompilasi (sha256 sumber & artefak cocok)."""
+    entry = _compiled_entries(manifest_mtime).get(path)
+    if not entry or entry.get("source_sha256") != hashlib.sha256(source).hexdigest():
+        return None
+    try:
+        with open(resolve_path(entry["artifact"]), "rb") as f:
+            data = f.read()
+    except (OSError, KeyError):
+        return None
+    return data if hashlib.sha256(data).hexdigest() == entry.get("sha256") else None
+
+
+def read_template(path: str) -> Optional[bytes]:
+    """Bytes template (artefak compiled bila valid; dari cache bila mtime & size belum berubah); None bila tidak ada."""
+    path = os.path.abspath(resolve_path(path))
+    try:
+        st = os.stat(path)
+    except OSError:
+        with _CACHE_LOCK:
+            _CACHE.pop(path, None)
+        return None
+    manifest_mtime = file_mtime(_manifest_path()) if USE_COMPILED else None
+
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size and hit[2] == manifest_mtime:
+            return hit[3]
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except Exception:
+        return None
+    if manifest_mtime is not None:
+        data = _compiled_for(path, data, manifest_mtime) or data
+    with _CACHE_LOCK:
+        _CACHE[path] = (st.st_mtime_ns, st.st_size, manifest_mtime, data)
+    return data
+
+
+def template_version(path: Optional[str]) -> Optional[str]:
+    """Penanda versi template untuk key cache render: mtime sumber + manifest compiled."""
+    mtime = file_mtime(path)
+    if mtime is None:
+        return None
+    manifest_mtime = file_mtime(_manifest_path()) if USE_COMPILED else None
+    return f"{mtime}:{manifest_mtime or 0}"
+
+
+def clear_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _MANIFEST.update(mtime=None, entries={})
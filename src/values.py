@@ -0,0 +1,282 @@
+"""
+Resolusi nilai overlay dari state (parsed_AK, totals_LQ, val_overrides, NIK).
+
+Sumber nilai (`source` pada item layout):
+- "A".."S"      -> nilai key (override -> parsed/total, + format)
+- "parsed:X"    -> parsed_AK[X] apa adanya (tanpa override)
+- nama turunan  -> DERIVED_SOURCES (A_NIK, J_DAYS, QK, DESC2, ...)
+
+Semua nilai dihitung lewat `ValueGraph`: tiap node (key, angka, turunan) punya
+daftar dependensi eksplisit, dihitung sekali per snapshot lalu di-cache.
+`ValueGraph.update(state)` hanya meng-invalidate node yang bergantung pada
+input yang berubah (override, total reimburse, NIK, ...); `session_graph(state)`
+menyimpan satu graph per sesi (app) dan memanggil `update` tiap kali dipakai.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, List, Mapping, MutableMapping, Optional, Set, Tuple
+
+from src.dates import day_diff_inclusive, today_id_str
+from src.formatting import idr_to_int, fmt_n, terbilang_rupiah
+
+# Format default per key (dulu field 'fmt' di coord_style)
+DEFAULT_FIELD_FMT = {k: "number" for k in "KLMNOPQ"}
+
+AK_KEYS = "ABCDEFGHIJKRS"
+LQ_KEYS = "LMNOPQ"
+
+
+# =========================
+# Helper murni (tanpa cache)
+# =========================
+def _format_key_value(key: str, ov, raw, fmt: Optional[str]) -> str:
+    """Override (0 -> '-') atau nilai mentah + formatting per 'fmt' (0 -> '-')."""
+    if ov not in (None, ""):
+        if ov.strip().isdigit() and int(ov.strip()) == 0:
+            return "-"
+        return str(ov)
+
+    if key == "J" and raw:
+        digits = "".join(ch for ch in str(raw) if ch.isdigit())
+        raw = digits or raw
+
+    fmt_mode = fmt or DEFAULT_FIELD_FMT.get(key, "raw")
+
+    if fmt_mode == "number":
+        try:
+            val = idr_to_int(raw) if isinstance(raw, str) else int(raw)
+        except Exception:
+            val = 0
+        return "-" if val == 0 else fmt_n(int(val))
+
+    if fmt_mode == "auto":
+        try:
+            val = idr_to_int(raw) if isinstance(raw, str) else int(raw)
+            return "-" if val == 0 else fmt_n(int(val))
+        except Exception:
+            pass
+        return str(raw or "")
+
+    return str(raw or "")
+
+
+def _numeric(key: str, raw) -> int:
+    if key in LQ_KEYS:
+        try:
+            return int(raw or 0)
+        except Exception:
+            return 0
+    try:
+        return idr_to_int(raw if key == "K" else str(raw if raw is not None else ""))
+    except Exception:
+        return 0
+
+
+def _raw_input(key: str) -> str:
+    """Nama input mentah untuk key: total L–Q atau field parsed_AK."""
+    if key in LQ_KEYS:
+        return f"lq:{key}"
+    if key in AK_KEYS:
+        return f"ak:{key}"
+    return ""
+
+
+# =========================
+# Nilai turunan (node graph)
+# =========================
+def _a_with_nik(g: "ValueGraph") -> str:
+    """A + NIK: 'Nama    (NIK)'."""
+    base_a = (g.get("key:A") or "").strip()
+    nik_text = str(g.get("ak:NIK") or "").strip()  # tampilkan apa adanya
+    if not base_a and not nik_text:
+        return ""  # keduanya kosong: jangan cetak apa-apa
+    text = f"{base_a}  "
+    if nik_text:
+        text += f"  ({nik_text})"
+    return text
+
+
+def _j_days(g: "ValueGraph") -> str:
+    """Lama hari dari D..E (inklusif); fallback digit J."""
+    val = day_diff_inclusive(g.get("ak:D"), g.get("ak:E"))
+    if val is None or val <= 0:
+        digits = "".join(ch for ch in str(g.get("ak:J") or "") if ch.isdigit())
+        val = int(digits) if digits else ""
+    return "-" if (isinstance(val, int) and val == 0) or str(val).strip() == "" else str(val)
+
+
+def _j_digits(g: "ValueGraph") -> str:
+    j_digits = "".join(ch for ch in str(g.get("ak:J") or "") if ch.isdigit())
+    return "-" if (j_digits == "" or int(j_digits) == 0) else j_digits
+
+
+def _qk(g: "ValueGraph") -> str:
+    total = g.get("QK_TOTAL")
+    return "-" if total == 0 else fmt_n(total)
+
+
+def _qk_terbilang(g: "ValueGraph") -> str:
+    total = g.get("QK_TOTAL")
+    return terbilang_rupiah(total) if total != 0 else "nol rupiah"
+
+
+def _desc2(g: "ValueGraph") -> str:
+    C, D, E, F = ((g.get(f"key:{k}") or "").strip() for k in "CDEF")
+    return f"Telah sesuai sebagaimana adanya digunakan dalam rangka keperluan perjalanan dinas ke {C}, tanggal {D} s/d {E} dalam rangka {F}."
+
+
+# nama -> (dependensi, fungsi)
+DERIVED_SOURCES: Dict[str, Tuple[Tuple[str, ...], Callable[["ValueGraph"], object]]] = {
+    "A_NIK": (("key:A", "ak:NIK"), _a_with_nik),
+    "J_DAYS": (("ak:D", "ak:E", "ak:J"), _j_days),
+    "J_DIGITS": (("ak:J",), _j_digits),
+    # Total Q (reimburse) + K (uang harian)
+    "QK_TOTAL": (("num:Q", "num:K"), lambda g: int(g.get("num:Q")) + int(g.get("num:K"))),
+    "QK": (("QK_TOTAL",), _qk),
+    "QK_TERBILANG": (("QK_TOTAL",), _qk_terbilang),
+    "DESC2": (("key:C", "key:D", "key:E", "key:F"), _desc2),
+    "CITY_TODAY": (("today",), lambda g: g.get("today")),
+    "NIK_UPPER": (("ak:NIK",), lambda g: str(g.get("ak:NIK") or "").strip().upper()),  # tampilkan apa adanya
+}
+
+
+def _node_def(node: str) -> Tuple[Tuple[str, ...], Callable[["ValueGraph"], object]]:
+    """Dependensi + fungsi hitung untuk node non-input."""
+    if node in DERIVED_SOURCES:
+        return DERIVED_SOURCES[node]
+    kind, _, rest = node.partition(":")
+    if kind == "key":
+        key, _, fmt = rest.partition("@")
+        raw_in = _raw_input(key)
+        deps = (f"ov:{key}", raw_in) if raw_in else (f"ov:{key}",)
+        return deps, lambda g: _format_key_value(key, g.get(f"ov:{key}"), g.get(raw_in) if raw_in else "", fmt or None)
+    if kind == "num":
+        raw_in = f"lq:{rest}" if rest in LQ_KEYS else f"ak:{rest}"
+        return (raw_in,), lambda g: _numeric(rest, g.get(raw_in))
+    if kind == "parsed":
+        return (f"ak:{rest}",), lambda g: g.get(f"ak:{rest}") or ""
+    raise KeyError(f"node nilai tidak dikenal: {node!r}")
+
+
+def _is_input(node: str) -> bool:
+    return node == "today" or node[:3] in ("ak:", "ov:", "lq:")
+
+
+def read_inputs(state: Mapping) -> Dict[str, object]:
+    """Semua input graph dari state (parsed_AK, val_overrides, totals_LQ, tanggal hari ini)."""
+    inputs: Dict[str, object] = {}
+    for k, v in (state.get("parsed_AK") or {}).items():
+        inputs[f"ak:{k}"] = v
+    for k, v in (state.get("val_overrides") or {}).items():
+        inputs[f"ov:{k}"] = v
+    for k, v in (state.get("totals_LQ") or {}).items():
+        inputs[f"lq:{k}"] = v
+    inputs["today"] = today_id_str("Jakarta")
+    return inputs
+
+
+class ValueGraph:
+    """Cache nilai per snapshot state dengan invalidasi berbasis dependensi."""
+
+    def __init__(self, state: Optional[Mapping] = None):
+        self._inputs: Dict[str, object] = {}
+        self._values: Dict[str, object] = {}
+        self._dependents: Dict[str, Set[str]] = defaultdict(set)
+        if state is not None:
+            self.update(state)
+
+    def update(self, state: Mapping) -> Set[str]:
+        """Ambil input baru dari state; kembalikan node yang di-invalidate."""
+        new_inputs = read_inputs(state)
+        changed = {k for k in set(new_inputs) | set(self._inputs)
+                   if new_inputs.get(k) != self._inputs.get(k)}
+        self._inputs = new_inputs
+        return self._invalidate(changed)
+
+    def _invalidate(self, nodes: Set[str]) -> Set[str]:
+        dropped: Set[str] = set()
+        stack: List[str] = list(nodes)
+        while stack:
+            node = stack.pop()
+            for dep in self._dependents.get(node, ()):
+                if dep not in dropped:
+                    dropped.add(dep)
+                    self._values.pop(dep, None)
+                    stack.append(dep)
+        return dropped
+
+    def get(self, node: str):
+        if _is_input(node):
+            return self._inputs.get(node)
+        try:
+            return self._values[node]
+        except KeyError:
+            pass
+        deps, fn = _node_def(node)
+        for d in deps:
+            self._dependents[d].add(node)
+        val = fn(self)
+        self._values[node] = val
+        return val
+
+    def resolve(self, source: str, fmt: Optional[str] = None) -> str:
+        """Nilai teks untuk satu `source` layout (sudah di-strip)."""
+        if source in DERIVED_SOURCES or source.startswith("parsed:"):
+            node = source
+        else:
+            node = f"key:{source}@{fmt}" if fmt else f"key:{source}"
+        return str(self.get(node) or "").strip()
+
+
+GRAPH_STATE_KEY = "value_graph"
+
+
+def session_graph(state: MutableMapping) -> ValueGraph:
+    """Graph milik `state` (dibuat sekali); tiap panggilan hanya menghitung ulang dependen input yang berubah."""
+    graph = state.get(GRAPH_STATE_KEY)
+    if isinstance(graph, ValueGraph):
+        graph.update(state)
+    else:
+        graph = ValueGraph(state)
+        state[GRAPH_STATE_KEY] = graph
+    return graph
+
+
+# =========================
+# API lama (satu nilai, tanpa cache bersama)
+# =========================
+def get_numeric_value_for_key(state: Mapping, key: str) -> int:
+    """Ambil nilai angka murni untuk key."""
+    return ValueGraph(state).get(f"num:{key}")
+
+
+def get_value_for_key(state: Mapping, key: str, fmt: Optional[str] = None) -> str:
+    """Ambil nilai final untuk key A..Q + formatting per 'fmt' (0 -> '-')."""
+    return ValueGraph(state).get(f"key:{key}@{fmt}" if fmt else f"key:{key}")
+
+
+def resolve_source(state: Mapping, source: str, fmt: Optional[str] = None) -> str:
+    return ValueGraph(state).resolve(source, fmt)
+
+
+def source_inputs(source: str, fmt: Optional[str] = None) -> FrozenSet[str]:
+    """Semua input graph (ak:*, ov:*, lq:*, today) yang memengaruhi nilai `source`."""
+    if source in DERIVED_SOURCES or source.startswith("parsed:"):
+        start = source
+    else:
+        start = f"key:{source}@{fmt}" if fmt else f"key:{source}"
+    inputs: Set[str] = set()
+    stack, seen = [start], set()
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        if _is_input(node):
+            inputs.add(node)
+        else:
+            stack.extend(_node_def(node)[0])
+    return frozenset(inputs)
+
+
+def is_known_source(source: str) -> bool:
+    return source in DERIVED_SOURCES or source.startswith("parsed:") or source in list(AK_KEYS + LQ_KEYS)
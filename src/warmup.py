@@ -0,0 +1,125 @@
+"""
+Warm-up proses: impor modul berat, font, render plan & template sebelum request pertama.
+
+Tanpa warm-up, "Generate PDF" pertama setelah deploy membayar impor reportlab/PyPDF2,
+load metrik Helvetica dan parsing template; parse pertama membayar init bs4/lxml.
+`warm_up_process()` menjalankan semua tahap itu sekali dan mengembalikan durasi per
+tahap (`format_report()` untuk log / CLI `python stm.py warmup`).
+"""
+import io
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+# HTML minimal untuk memicu init parser lxml + jalur ekstraktor
+_WARM_HTML = "<html><body><table><tr><td>Trip Number</td><td>-</td></tr></table></body></html>"
+
+
+class WarmupStep(NamedTuple):
+    name: str
+    seconds: float
+    ok: bool
+    detail: str = ""
+
+
+def _step(steps: List[WarmupStep], name: str, fn: Callable[[], Optional[str]]) -> None:
+    t0 = time.perf_counter()
+    try:
+        detail = fn() or ""
+        ok = True
+    except Exception as e:  # warm-up tidak boleh menggagalkan startup
+        detail, ok = f"{type(e).__name__}: {e}", False
+    steps.append(WarmupStep(name, time.perf_counter() - t0, ok, detail))
+
+
+def warm_up_process(layout_path: Optional[str] = None, template_paths: Sequence[Optional[str]] = (),
+                    render: bool = True) -> List[WarmupStep]:
+    """Prime proses saat ini; `render=True` sekalian satu render kosong (jalur canvas + merge).
+
+    Span metrics dari warm-up dibuang supaya tidak mengotori agregat (lihat src.metrics).
+    """
+    from src.metrics import collect
+    with collect():
+        return _warm_up(layout_path, template_paths, render)
+
+
+def _warm_up(layout_path: Optional[str], template_paths: Sequence[Optional[str]],
+             render: bool) -> List[WarmupStep]:
+    steps: List[WarmupStep] = []
+    ctx = {}
+
+    def imp_reportlab():
+        import reportlab.pdfgen.canvas  # noqa: F401
+        import reportlab.pdfbase.pdfmetrics  # noqa: F401
+
+    def imp_pypdf2():
+        import PyPDF2  # noqa: F401
+
+    def imp_parser():
+        import src.parser  # noqa: F401  (bs4 + lxml)
+
+    def parser_init():
+        from src.parser import parse_html_to_A_to_K
+        parse_html_to_A_to_K(_WARM_HTML)
+
+    def plan():
+        from src.layout import load_plan
+        ctx["plan"] = p = load_plan(layout_path, template_paths)
+        return f"{p.name} v{p.version}, {sum(len(pg.items) for pg in p.pages)} item"
+
+    def fonts():
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from src.fonts import ensure_font, register_all
+        names = {"Helvetica"}
+        for page in getattr(ctx.get("plan"), "pages", ()):
+            names.update(it.font for it in page.items if it.font)
+        names.update(name for name, ok in register_all().items() if ok)
+        for name in sorted(names):
+            if not ensure_font(name):
+                raise RuntimeError(f"font {name} tidak tersedia")
+            stringWidth("0123456789 Rp.,", name, 10)
+        return ", ".join(sorted(names))
+
+    def templates():
+        from PyPDF2 import PdfReader
+        from src.layout import plan_templates
+        bgs = plan_templates(ctx["plan"])
+        for bg in bgs:
+            if bg:
+                PdfReader(io.BytesIO(bg)).pages[0].mediabox
+        missing = sum(1 for bg in bgs if not bg)
+        if missing:
+            raise FileNotFoundError(f"{missing} template tidak ditemukan")
+        return f"{len(bgs)} halaman, {sum(len(bg) for bg in bgs)} B"
+
+    def render_blank():
+        from src.render import render_spj_pdf
+        from src.state import default_state
+        pdf = render_spj_pdf(default_state(), ctx["plan"], on_error=lambda m: None)
+        if not pdf:
+            raise RuntimeError("render kosong gagal")
+        return f"{len(pdf)} B"
+
+    _step(steps, "import reportlab", imp_reportlab)
+    _step(steps, "import PyPDF2", imp_pypdf2)
+    _step(steps, "import parser (bs4/lxml)", imp_parser)
+    _step(steps, "parser init", parser_init)
+    _step(steps, "render plan", plan)
+    _step(steps, "fonts", fonts)
+    _step(steps, "templates", templates)
+    if render and steps[-1].ok:
+        _step(steps, "render kosong", render_blank)
+    return steps
+
+
+def all_ok(steps: Sequence[WarmupStep]) -> bool:
+    return all(s.ok for s in steps)
+
+
+def format_report(steps: Sequence[WarmupStep], title: str = "warm-up") -> str:
+    total = sum(s.seconds for s in steps)
+    lines = [f"{title}: {total * 1000:.0f} ms"]
+    for s in steps:
+        status = "ok" if s.ok else "GAGAL"
+        detail = f"  ({s.detail})" if s.detail else ""
+        lines.append(f"  {s.name:<26} {s.seconds * 1000:8.1f} ms  {status}{detail}")
+    return "\n".join(lines)
@@ -0,0 +1,7 @@
+"""Entry point CLI: `python stm.py render trip.html --nik ... -o out.pdf`."""
+import sys
+
+from src.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
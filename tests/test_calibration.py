@@ -0,0 +1,10 @@
+from src.calibration import marker_ops
+from src.layout import _compile_item
+
+
+def test_marker_label_shows_layout_json_coordinates():
+    item = _compile_item({"id": "K", "source": "K", "x": 260.0, "y": 520.0,
+                          "align": "right", "from_right": True}, page_w=612.0)
+    assert (item.x, item.from_right) == (352.0, False)    # sudah absolut untuk render
+    ops = marker_ops(item, "900.000", 612.0).decode("latin-1")
+    assert "(K \\(260,520\\) R right) Tj" in ops
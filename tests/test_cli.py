@@ -0,0 +1,9 @@
+from src.cli import build_arg_parser
+
+
+def test_render_fills_reimburse_from_html_by_default():
+    # sama dengan batch / recap, yang selalu memakai tabel transaksi
+    ap = build_arg_parser()
+    assert ap.parse_args(["render", "trip.html", "-o", "out.pdf"]).reimburse_from_html is True
+    args = ap.parse_args(["render", "trip.html", "-o", "out.pdf", "--no-reimburse-from-html"])
+    assert args.reimburse_from_html is False
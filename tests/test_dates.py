@@ -0,0 +1,104 @@
+import glob
+from datetime import datetime
+
+import pytest
+
+from src import dates
+from src.dates import day_diff_inclusive, parse_date_or_none, parse_dates
+from src.parser import parse_html_to_A_to_K
+
+
+# =========================
+# Implementasi lama (rantai strptime, sebelum parser satu lintasan) sebagai referensi
+# =========================
+def _old_parse(s):
+    if not s:
+        return None
+    for fmt in ("%d %B, %Y", "%d %b, %Y", "%d %B %Y", "%d %b %Y",
+                "%d/%B/%Y", "%d/%b/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(s.strip(), fmt)
+        except Exception:
+            continue
+    return None
+
+
+def _sample_dates():
+    out = []
+    for path in sorted(glob.glob("assets/samples/*.html")):
+        with open(path, "r", encoding="utf-8") as f:
+            ak = parse_html_to_A_to_K(f.read())
+        out += [ak["D"], ak["E"]]
+    return out
+
+
+@pytest.mark.parametrize("text, expected", [
+    # EN, nama lengkap & singkatan
+    ("19 January, 2026", (2026, 1, 19)),
+    ("19 Jan 2026", (2026, 1, 19)),
+    ("19/Jan/2026", (2026, 1, 19)),
+    ("5 Sept 2026", (2026, 9, 5)),
+    ("Monday, 19 January 2026", (2026, 1, 19)),
+    # ID, nama lengkap & singkatan
+    ("19 Januari 2026", (2026, 1, 19)),
+    ("Senin, 2 Februari 2026", (2026, 2, 2)),
+    ("17 Agustus 2026", (2026, 8, 17)),
+    ("17 Agt 2026", (2026, 8, 17)),
+    ("3 Mei 2026", (2026, 5, 3)),
+    ("10 Okt 2026", (2026, 10, 10)),
+    ("1 Nop 2026", (2026, 11, 1)),
+    ("1 Des 2026", (2026, 12, 1)),
+    ("  19 JANUARY 2026  ", (2026, 1, 19)),
+    # angka
+    ("2026-01-19", (2026, 1, 19)),
+    ("19/01/2026", (2026, 1, 19)),
+    ("19-1-2026", (2026, 1, 19)),
+    ("29 Februari 2028", (2028, 2, 29)),
+])
+def test_parse_known_forms(text, expected):
+    assert parse_date_or_none(text) == datetime(*expected)
+
+
+@pytest.mark.parametrize("text", [
+    "31 Feb 2026",          # hari tidak ada
+    "29 Februari 2026",     # bukan tahun kabisat
+    "2026-02-30",
+    "19/13/2026",           # bulan 13
+    "19/01/26",             # tahun 2 digit tidak ditebak
+    "19 Jan 26",
+    "26-01-19",
+    "19 Foo 2026",
+    "19 January",
+    "",
+    None,
+    "   ",
+])
+def test_parse_rejects(text):
+    assert parse_date_or_none(text) is None
+
+
+def test_parity_with_old_parser_on_sample_html():
+    samples = _sample_dates()
+    assert samples and all(samples)
+    for s in samples:
+        assert parse_date_or_none(s) == _old_parse(s) is not None
+
+
+@pytest.mark.parametrize("text", [
+    "19 January, 2026", "19 Jan, 2026", "19 January 2026", "19 Jan 2026",
+    "19/January/2026", "19/Jan/2026", "2026-01-19", "31 February 2026",
+])
+def test_parity_with_old_parser_on_en_forms(text):
+    assert parse_date_or_none(text) == _old_parse(text)
+
+
+def test_memo_cache_hits():
+    dates._parse.cache_clear()
+    parse_dates(["19 January, 2026"] * 5 + ["21 January, 2026"])
+    info = dates._parse.cache_info()
+    assert (info.misses, info.hits) == (2, 4)
+
+
+def test_day_diff_inclusive_mixed_languages():
+    assert day_diff_inclusive("19 January, 2026", "21 Januari 2026") == 3
+    assert day_diff_inclusive("31 Feb 2026", "2 Mar 2026") is None
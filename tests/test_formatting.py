@@ -0,0 +1,150 @@
+import random
+
+import pytest
+
+from src.formatting import (fmt_idr, fmt_idr_many, fmt_n, idr_to_int, idr_to_int_many,
+                            terbilang_id, terbilang_rupiah, terbilang_rupiah_many)
+
+# =========================
+# Implementasi lama (rekursif, sebelum tabel) sebagai referensi
+# =========================
+_SATUAN = ["", "satu", "dua", "tiga", "empat", "lima", "enam", "tujuh", "delapan", "sembilan"]
+
+
+def _old_lt_1000(n):
+    if n == 0:
+        return ""
+    if n < 10:
+        return _SATUAN[n]
+    if n < 20:
+        if n == 10:
+            return "sepuluh"
+        if n == 11:
+            return "sebelas"
+        return f"{_SATUAN[n - 10]} belas"
+    if n < 100:
+        bagian = f"{_SATUAN[n // 10]} puluh"
+        return bagian + (f" {_SATUAN[n % 10]}" if n % 10 else "")
+    bagian = "seratus" if n // 100 == 1 else f"{_SATUAN[n // 100]} ratus"
+    return bagian + (f" {_old_lt_1000(n % 100)}" if n % 100 else "")
+
+
+def _old_terbilang_id(n):
+    if n == 0:
+        return "nol"
+    if n < 0:
+        return f"minus {_old_terbilang_id(-n)}"
+    bagian = []
+    sisa = n
+    for skala, nama in ((10 ** 12, "triliun"), (10 ** 9, "miliar"), (10 ** 6, "juta"), (1000, "ribu"), (1, "")):
+        if sisa >= skala:
+            hitung, sisa = divmod(sisa, skala)
+            if skala == 1000 and hitung == 1:
+                bagian.append("seribu")
+            else:
+                kata = _old_lt_1000(hitung) if hitung < 1000 else _old_terbilang_id(hitung)
+                if kata:
+                    bagian.append(f"{kata} {nama}" if nama else kata)
+    return " ".join(bagian).strip()
+
+
+# =========================
+# Kata -> angka (untuk round-trip)
+# =========================
+_UNIT = {w: i for i, w in enumerate(_SATUAN) if w}
+_SCALE = {"ribu": 10 ** 3, "juta": 10 ** 6, "miliar": 10 ** 9, "triliun": 10 ** 12}
+
+
+def _lt_1000_to_int(words):
+    total, last = 0, 0
+    for w in words:
+        if w in _UNIT:
+            last = _UNIT[w]
+        elif w in ("sepuluh", "sebelas", "seratus"):
+            total += {"sepuluh": 10, "sebelas": 11, "seratus": 100}[w]
+        elif w == "belas":
+            total, last = total + 10 + last, 0
+        elif w == "puluh":
+            total, last = total + 10 * last, 0
+        elif w == "ratus":
+            total, last = total + 100 * last, 0
+        else:
+            raise ValueError(w)
+    return total + last
+
+
+def _scaled_to_int(words):
+    # skala terbesar dipecah di kemunculan terakhir: "seribu triliun" = (1000) x 10^12
+    for name, value in sorted(_SCALE.items(), key=lambda kv: -kv[1]):
+        if name in words:
+            idx = len(words) - 1 - words[::-1].index(name)
+            left = _scaled_to_int(words[:idx])
+            return left * value + _scaled_to_int(words[idx + 1:])
+    return _lt_1000_to_int(words)
+
+
+def _words_to_int(text):
+    words = text.split()
+    sign = 1
+    if words and words[0] == "minus":
+        sign, words = -1, words[1:]
+    if words == ["nol"]:
+        return 0
+    expanded = []
+    for w in words:
+        expanded.extend(["satu", "ribu"] if w == "seribu" else [w])
+    return sign * _scaled_to_int(expanded)
+
+
+BOUNDARIES = [0, 1, 10, 11, 12, 19, 20, 21, 99, 100, 101, 110, 111, 999, 1000, 1001, 1100, 1999,
+              2000, 10_000, 11_000, 100_000, 999_999, 10 ** 6, 10 ** 6 + 1, 10 ** 9, 10 ** 9 + 1000,
+              10 ** 12, 10 ** 12 + 1, 999 * 10 ** 12, 10 ** 15, 1234 * 10 ** 12 + 567_890]
+
+
+def _samples(seed=20260119, n=3000):
+    rng = random.Random(seed)
+    out = list(BOUNDARIES)
+    for digits in range(1, 17):
+        out.extend(rng.randrange(10 ** (digits - 1), 10 ** digits) for _ in range(n // 16))
+    return out
+
+
+@pytest.mark.parametrize("n", BOUNDARIES + [-n for n in BOUNDARIES if n])
+def test_boundaries_match_old(n):
+    assert terbilang_id(n) == _old_terbilang_id(n)
+
+
+def test_known_words():
+    assert terbilang_id(0) == "nol"
+    assert terbilang_id(11) == "sebelas"
+    assert terbilang_id(100) == "seratus"
+    assert terbilang_id(1000) == "seribu"
+    assert terbilang_id(10 ** 6) == "satu juta"
+    assert terbilang_id(10 ** 9) == "satu miliar"
+    assert terbilang_id(10 ** 12) == "satu triliun"
+    assert terbilang_id(-1500) == "minus seribu lima ratus"
+    assert terbilang_rupiah(1_485_000) == "satu juta empat ratus delapan puluh lima ribu rupiah"
+
+
+def test_random_match_old_and_round_trip():
+    for n in _samples():
+        for v in (n, -n):
+            words = terbilang_id(v)
+            assert words == _old_terbilang_id(v), v
+            assert _words_to_int(words) == v, (v, words)
+
+
+def test_batch_helpers_match_scalar():
+    amounts = _samples(n=200)
+    assert terbilang_rupiah_many(amounts) == [terbilang_rupiah(n) for n in amounts]
+    assert fmt_idr_many(amounts) == [fmt_idr(n) for n in amounts]
+    assert idr_to_int_many(fmt_idr_many(amounts)) == amounts
+
+
+def test_idr_round_trip():
+    for n in _samples(n=500):
+        assert idr_to_int(fmt_n(n)) == n
+        assert idr_to_int(fmt_idr(n)) == n
+    assert idr_to_int(None) == 0
+    assert idr_to_int("IDR 1.200.000") == 1_200_000
+    assert fmt_n(1_200_000) == "1.200.000"
@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+from src.ledger import ReimburseLedger, iter_csv_rows, merge_auto_rows, validate_row
+
+
+def test_merge_keeps_manual_rows_and_replaces_auto_rows():
+    old_auto = [{"jenis": "hotel", "nominal": 1300000}]
+    ledger = ReimburseLedger(old_auto + [{"jenis": "bensin", "nominal": 50000},
+                                         {"jenis": "hotel", "nominal": 200000}])
+    new_auto = [{"jenis": "hotel", "nominal": 1300000}, {"jenis": "toll", "nominal": 185000}]
+    rows = merge_auto_rows(ledger, old_auto, new_auto)
+    assert rows == new_auto + [{"jenis": "bensin", "nominal": 50000},
+                               {"jenis": "hotel", "nominal": 200000}]
+
+
+def test_merge_counts_duplicates():
+    auto = [{"jenis": "toll", "nominal": 10000}]
+    current = auto + [{"jenis": "toll", "nominal": 10000}]   # satu diketik manual
+    assert merge_auto_rows(current, auto, auto) == auto + auto
+
+
+def test_ledger_totals_after_merge():
+    ledger = ReimburseLedger(merge_auto_rows([], [], [{"jenis": "parkir", "nominal": 20000}]))
+    assert ledger.totals_LQ()["P"] == 20000
+    assert ledger.totals_LQ()["Q"] == 20000
+
+
+def test_validate_row_accepts_integral_float():
+    # data_editor / pandas mengirim kolom angka sebagai float
+    assert validate_row("hotel", 150000.0) == ("hotel", 150000)
+    assert validate_row("hotel", "Rp 150.000") == ("hotel", 150000)
+
+
+@pytest.mark.parametrize("bad", [150000.5, float("nan"), True])
+def test_validate_row_rejects_non_integral(bad):
+    with pytest.raises(ValueError):
+        validate_row("hotel", bad)
+
+
+def test_csv_unquoted_comma_amount_is_error():
+    rows = list(iter_csv_rows(io.StringIO('jenis,nominal\nhotel,1,200,000\nhotel,"1,200,000"\ntoll,5000,\n')))
+    assert rows[0][1] is None and "kutip" in rows[0][2]
+    assert rows[1][1] == ("hotel", 1200000)
+    assert rows[2][1] == ("toll", 5000)
@@ -0,0 +1,21 @@
+import json
+
+from src import metrics
+
+
+def test_enable_log_writes_json_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "_log_handler", None)
+    monkeypatch.setattr(metrics.logger, "level", metrics.logger.level)
+    monkeypatch.setattr(metrics.logger, "propagate", metrics.logger.propagate)
+    path = tmp_path / "metrics.jsonl"
+    metrics.enable_log(str(path))
+    try:
+        with metrics.span("uji.span", n=1):
+            pass
+        metrics.record_bytes("uji.bytes", 10)
+    finally:
+        metrics.logger.removeHandler(metrics._log_handler)
+        metrics._log_handler.close()
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(d["kind"], d["name"]) for d in lines] == [("ms", "uji.span"), ("bytes", "uji.bytes")]
+    assert lines[0]["n"] == 1
@@ -0,0 +1,43 @@
+from src.parser import ledger_rows, parse_html_trip
+
+_TIMELINE = """
+<table><tr><th>Activity</th><th>Date</th></tr>
+<tr><td>Check-in Hotel Santika</td><td>Surabaya</td><td>19 Jan 2026</td></tr></table>
+"""
+
+
+def _html(header_total: str, with_table: bool = True) -> str:
+    table = f"""
+<table><thead><tr><th>Transaction</th><th>Currency</th><th>Qty</th><th>{header_total}</th></tr></thead>
+<tbody>
+<tr><td>Daily Allowance</td><td>IDR</td><td>IDR 300.000 (3 Day)</td><td>IDR 900.000</td></tr>
+<tr><td>Hotel</td><td>IDR</td><td>IDR 650.000 (2 Night)</td><td>IDR 1.300.000</td></tr>
+<tr><td>Parking Fee</td><td>IDR</td><td>1</td><td>IDR 20.000</td></tr>
+</tbody></table>"""
+    return "<html><body>" + _TIMELINE + (table if with_table else "") + "</body></html>"
+
+
+def test_header_total_with_suffix():
+    result = parse_html_trip(_html("Total (IDR)"))
+    assert result["parsed_AK"]["J"] == "3"
+    assert result["parsed_AK"]["K"] == "IDR 900.000"
+    assert ledger_rows(result["transactions"]) == [
+        {"jenis": "hotel", "nominal": 1300000},
+        {"jenis": "parkir", "nominal": 20000},
+    ]
+
+
+def test_rows_outside_transaction_table_never_reimbursed():
+    result = parse_html_trip(_html("Total", with_table=False))
+    assert ledger_rows(result["transactions"]) == []
+    assert all(row["label"] != "Check-in Hotel Santika" for row in result["transactions"])
+
+
+def test_sample_fixture():
+    with open("assets/samples/trip_bandung_medan.html", encoding="utf-8") as f:
+        result = parse_html_trip(f.read())
+    assert result["parsed_AK"]["J"] == "5"
+    assert ledger_rows(result["transactions"]) == [
+        {"jenis": "hotel", "nominal": 2800000},
+        {"jenis": "transportasi", "nominal": 400000},
+    ]
@@ -0,0 +1,59 @@
+import io
+
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+from src.pdf_optimize import optimize_pdf
+
+
+def _fonts(page):
+    return sorted(page["/Resources"]["/Font"].keys())
+
+
+def _pdf(fonts_per_page):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pageCompression=0)
+    for fonts in fonts_per_page:
+        for i, font in enumerate(fonts):
+            c.setFont(font, 12)
+            c.drawString(72, 700 - 20 * i, f"teks {font}")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def test_shared_resources_keep_fonts_of_every_page():
+    # reportlab memakai satu /Resources untuk semua halaman
+    src = _pdf([["Helvetica"], ["Courier"]])
+    before = [_fonts(p) for p in PdfReader(io.BytesIO(src)).pages]
+    assert before[0] == before[1] and len(before[0]) == 2
+
+    out, stats = optimize_pdf(src)
+    assert stats is not None
+    for page in PdfReader(io.BytesIO(out)).pages:
+        assert _fonts(page) == before[0]
+
+
+def test_unused_font_still_pruned():
+    from PyPDF2 import PdfWriter
+    from PyPDF2.generic import DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    for page in PdfReader(io.BytesIO(_pdf([["Helvetica"], ["Helvetica"]]))).pages:
+        writer.add_page(page)
+    writer.pages[0]["/Resources"]["/Font"][NameObject("/FUnused")] = DictionaryObject()
+    buf = io.BytesIO()
+    writer.write(buf)
+
+    out, stats = optimize_pdf(buf.getvalue(), dedup=False)
+    assert stats.resources_removed >= 1
+    for page in PdfReader(io.BytesIO(out)).pages:
+        assert "/FUnused" not in _fonts(page)
+
+
+def test_multi_page_text_survives():
+    src = _pdf([["Helvetica"], ["Courier"], ["Times-Roman", "Helvetica"]])
+    out, _ = optimize_pdf(src)
+    texts = [p.extract_text() for p in PdfReader(io.BytesIO(out)).pages]
+    assert "teks Courier" in texts[1]
+    assert "teks Times-Roman" in texts[2]
@@ -0,0 +1,51 @@
+import threading
+import tracemalloc
+
+from src.profiling import profile_run
+
+
+def test_overlapping_runs_share_tracemalloc(tmp_path):
+    first_in = threading.Event()
+    second_done = threading.Event()
+    captures, errors = {}, []
+
+    def long_run():
+        try:
+            with profile_run("lama", directory=str(tmp_path)) as cap:
+                first_in.set()
+                second_done.wait(5)
+                [bytes(1000) for _ in range(100)]
+            captures["lama"] = cap
+        except Exception as e:  # pragma: no cover - justru yang diuji
+            errors.append(e)
+
+    t = threading.Thread(target=long_run)
+    t.start()
+    first_in.wait(5)
+    with profile_run("pendek", directory=str(tmp_path)) as cap:
+        pass
+    captures["pendek"] = cap
+    assert tracemalloc.is_tracing()      # run "lama" masih jalan
+    second_done.set()
+    t.join(5)
+
+    assert not errors
+    assert not tracemalloc.is_tracing()
+    assert captures["lama"]["peak_shared"] and captures["pendek"]["peak_shared"]
+
+
+def test_single_run_owns_peak(tmp_path):
+    with profile_run("tunggal", directory=str(tmp_path)) as cap:
+        pass
+    assert cap["peak_shared"] is False
+    assert not tracemalloc.is_tracing()
+
+
+def test_external_tracing_left_running(tmp_path):
+    tracemalloc.start()
+    try:
+        with profile_run("luar", directory=str(tmp_path)):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
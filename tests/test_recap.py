@@ -0,0 +1,28 @@
+from src.recap import rows_from_html
+
+SAMPLES = ["assets/samples/trip_jakarta_surabaya.html", "assets/samples/trip_bandung_medan.html"]
+
+
+def test_recap_includes_reimburse_totals_from_transactions():
+    rows = {r["source"]: r for r in rows_from_html(SAMPLES, nik="1")}
+    jkt = rows[SAMPLES[0]]
+    assert (jkt["M"], jkt["N"], jkt["Q"]) == (1300000, 185000, 1485000)
+    assert jkt["QK_TOTAL"] == 1485000 + 900000
+    mdn = rows[SAMPLES[1]]
+    assert (mdn["M"], mdn["O"], mdn["Q"]) == (2800000, 400000, 3200000)
+
+
+def test_recap_row_matches_pdf_overrides():
+    from src.recap import recap_row
+    from src.values import ValueGraph
+
+    state = {"parsed_AK": {"A": "Budi", "I": "Rapat", "K": "Rp 900.000"},
+             "totals_LQ": {"M": 1300000, "Q": 1300000},
+             "val_overrides": {"I": "Rapat koordinasi", "K": "750.000", "M": "0"}}
+    row = recap_row(state)
+    g = ValueGraph(state)
+    assert row["I"] == g.resolve("I") == "Rapat koordinasi"
+    assert row["K"] == 750000
+    assert row["M"] == 0 and g.resolve("M") == "-"
+    assert row["Q"] == 1300000
+    assert row["QK_TOTAL"] == 900000 + 1300000   # field QK di PDF memakai nilai sebelum override
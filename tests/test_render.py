@@ -0,0 +1,52 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+from src import render
+
+
+def _blank(w=300, h=200):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(w, h))
+    c.drawString(10, 10, "template")
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _item(text, layer, y):
+    return {"id": text, "text": text, "x": 20, "y": y, "size": 10, "layer": layer}
+
+
+ITEMS = [_item("Kantor Pusat", "static", 150), _item("Budi", "employee", 120), _item("Rp 1.300.000", "trip", 90)]
+
+
+def _texts(pdf):
+    return [p.extract_text() for p in PdfReader(io.BytesIO(pdf)).pages]
+
+
+def test_cached_layer_form_is_reused_across_renders():
+    render.clear_layer_cache()
+    bg = _blank()
+    first = render.build_pdf_multi_pages([bg, bg], [ITEMS, ITEMS])
+    cached = dict(render._LAYER_CACHE)
+    second = render.build_pdf_multi_pages([bg], [ITEMS])
+    assert len(cached) == 2
+    assert all(render._LAYER_CACHE[k] is v for k, v in cached.items())
+    for text in _texts(first) + _texts(second):
+        for item in ITEMS:
+            assert item["text"] in text
+        assert "template" in text
+
+
+def test_cached_forms_are_safe_across_threads():
+    render.clear_layer_cache()
+    bg = _blank()
+    with ThreadPoolExecutor(4) as ex:
+        pdfs = list(ex.map(lambda i: render.build_pdf_multi_pages(
+            [bg], [ITEMS + [_item(f"trip {i}", "trip", 60)]]), range(16)))
+    for i, pdf in enumerate(pdfs):
+        text = _texts(pdf)[0]
+        assert f"trip {i}" in text and "Kantor Pusat" in text and "Budi" in text
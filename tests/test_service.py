@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from src.jobs import QueueFullError
+from src.service import RenderService
+
+
+class _FakePool:
+    def __init__(self):
+        self.futures = []
+
+    def submit_parse(self, html):
+        f = Future()
+        self.futures.append(f)
+        return f
+
+    def depth(self):
+        return sum(not f.done() for f in self.futures)
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def service():
+    svc = RenderService(workers=1, max_concurrency=1, timeout=0.2)
+    svc.pool.shutdown()
+    svc.pool = _FakePool()
+    return svc
+
+
+def test_timed_out_job_keeps_slot_until_done(service):
+    with pytest.raises(FutureTimeout):
+        service.parse("<html/>")
+    # job pertama masih jalan: request berikutnya tidak boleh lolos ke pool
+    with pytest.raises(QueueFullError):
+        service.parse("<html/>")
+    assert len(service.pool.futures) == 1
+
+    service.pool.futures[0].set_result({"A": "lama"})
+    # slot kembali setelah job selesai
+    futures = service.pool.futures
+    threading.Timer(0.05, lambda: futures[-1].set_result({"A": "baru"})).start()
+    assert service.parse("<html/>") == {"A": "baru"}
+    assert service.stats()["waiting"] == 0
+
+
+def test_submit_error_releases_slot(service):
+    def boom(html):
+        raise QueueFullError("penuh")
+
+    service.pool.submit_parse = boom
+    for _ in range(3):
+        with pytest.raises(QueueFullError):
+            service.parse("<html/>")
+
+
+def test_slot_wait_counts_against_timeout():
+    svc = RenderService(workers=1, max_concurrency=1, timeout=0.4)
+    svc.pool.shutdown()
+    svc.pool = _FakePool()
+    svc._slots.acquire()
+    threading.Timer(0.3, svc._slots.release).start()   # slot baru bebas setelah 0.3 s
+    start = time.monotonic()
+    with pytest.raises(FutureTimeout):
+        svc.parse("<html/>")
+    assert time.monotonic() - start < 0.6   # bukan 0.3 + 0.4
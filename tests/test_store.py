@@ -0,0 +1,40 @@
+import time
+
+from src.store import TripStore
+
+
+def _store(tmp_path, **kw):
+    return TripStore(str(tmp_path / "stm.sqlite3"), **kw)
+
+
+def _count(store, table):
+    return store._conn().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_max_renders_keeps_newest(tmp_path):
+    store = _store(tmp_path, retention_days=0, max_renders=2)
+    for i in range(4):
+        store.save_render(f"k{i}", b"%PDF-" + bytes([i]))
+    assert _count(store, "renders") == 2
+    assert _count(store, "documents") == 2
+    assert store.cached_render("k3") == b"%PDF-\x03"
+    assert store.cached_render("k0") is None
+
+
+def test_old_renders_and_orphan_documents_pruned(tmp_path):
+    store = _store(tmp_path, retention_days=30, max_renders=0)
+    store.save_render("lama", b"%PDF-lama")
+    store._conn().execute("UPDATE renders SET created_at = ?", (time.time() - 31 * 86400,))
+    store._conn().commit()
+    store.save_render("baru", b"%PDF-baru")
+    assert store.cached_render("lama") is None
+    assert store.cached_render("baru") == b"%PDF-baru"
+    assert _count(store, "documents") == 1
+
+
+def test_shared_document_kept_while_referenced(tmp_path):
+    store = _store(tmp_path, retention_days=0, max_renders=1)
+    store.save_render("a", b"%PDF-sama")
+    store.save_render("b", b"%PDF-sama")
+    assert _count(store, "documents") == 1
+    assert store.cached_render("b") == b"%PDF-sama"
@@ -0,0 +1,46 @@
+import io
+import os
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from src import template_compiler
+from src.template_compiler import artifact_name, compile_all
+
+
+def _pdf(text):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    c.drawString(72, 700, text)
+    c.save()
+    return buf.getvalue()
+
+
+def test_same_basename_gets_separate_artifacts(tmp_path):
+    a = tmp_path / "spj_blank2"
+    b = tmp_path / "spj_blank2.pdf"
+    a.write_bytes(_pdf("tanpa ekstensi"))
+    b.write_bytes(_pdf("dengan ekstensi"))
+    out = tmp_path / "compiled"
+
+    manifest = compile_all(sources=[str(a), str(b)], out_dir=str(out))
+    artifacts = [e["artifact"] for e in manifest["templates"].values()]
+    assert len(set(artifacts)) == 2
+    for src, e in manifest["templates"].items():
+        with open(e["artifact"], "rb") as f:
+            assert template_compiler._sha256(f.read()) == e["sha256"]
+
+
+def test_artifact_name_is_stable_per_path():
+    assert artifact_name("assets/spj_blank2.pdf") == artifact_name("./assets/spj_blank2.pdf")
+    assert artifact_name("assets/spj_blank2.pdf") != artifact_name("assets/spj_blank2")
+
+
+def test_artifact_collision_raises(tmp_path, monkeypatch):
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.pdf"
+    a.write_bytes(_pdf("a"))
+    b.write_bytes(_pdf("b"))
+    monkeypatch.setattr(template_compiler, "artifact_name", lambda src: "sama.pdf")
+    with pytest.raises(ValueError):
+        compile_all(sources=[str(a), str(b)], out_dir=str(tmp_path / "compiled"))
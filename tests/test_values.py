@@ -0,0 +1,51 @@
+from src.state import state_from_record
+from src.values import GRAPH_STATE_KEY, ValueGraph, session_graph
+
+
+def _state():
+    return state_from_record({
+        "parsed_AK": {"A": "Budi", "K": "IDR 900.000", "D": "19 January, 2026", "E": "21 January, 2026"},
+        "reimburse_rows": [{"jenis": "hotel", "nominal": 100000}],
+    }, nik="123")
+
+
+def test_session_graph_is_reused_and_updated():
+    state = _state()
+    g = session_graph(state)
+    assert state[GRAPH_STATE_KEY] is g
+    assert g.resolve("A_NIK") == "Budi    (123)"
+    assert g.resolve("QK") == "1.000.000"
+
+    state["parsed_AK"]["NIK"] = "456"
+    assert session_graph(state) is g
+    assert g.resolve("A_NIK") == "Budi    (456)"
+
+
+def test_update_invalidates_only_dependents():
+    state = _state()
+    g = ValueGraph(state)
+    g.resolve("A_NIK")
+    g.resolve("QK")
+    g.resolve("DESC2")
+
+    state["val_overrides"] = {"L": "5000"}
+    dropped = g.update(state)
+    assert "A_NIK" not in dropped and "DESC2" not in dropped
+
+    state["parsed_AK"] = dict(state["parsed_AK"], NIK="789")
+    dropped = g.update(state)
+    assert "A_NIK" in dropped
+    assert "QK" not in dropped and "DESC2" not in dropped
+
+
+def test_results_match_fresh_graph_after_edits():
+    state = _state()
+    g = session_graph(state)
+    sources = ("A_NIK", "QK", "QK_TERBILANG", "J_DAYS", "M")
+    [g.resolve(s) for s in sources]
+    state["reimburse_rows"].add("toll", 50000)
+    from src.state import recompute_totals
+    recompute_totals(state)
+    g = session_graph(state)
+    fresh = ValueGraph(state)
+    assert [g.resolve(s) for s in sources] == [fresh.resolve(s) for s in sources]